@@ -64,6 +64,26 @@ DATABASES = {
     }
 }
 
+# Cache. The waiting room keeps its queue counters here and public pages are
+# cached here (events.page_cache), so production must use a backend shared by every worker (e.g. django.core.cache.backends.redis.RedisCache).
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='dopeevents'),
+    }
+}
+
+# Longest time, in seconds, a cached public page is served; 0 turns the page cache off
+PAGE_CACHE_TIMEOUT = config('PAGE_CACHE_TIMEOUT', default=30, cast=int)
+
+# Push live ticket counts to event pages over Server-Sent Events. Only turn this
+# on when /event/<pk>/availability/stream/ is routed to an ASGI server
+# (DopeEvents.DopeEvents.asgi:application); pages poll the JSON API otherwise.
+AVAILABILITY_STREAM = config('AVAILABILITY_STREAM', default=False, cast=bool)
+
+# name,latitude,longitude CSV used to geocode event locations; empty uses events/data/gazetteer.csv
+VENUE_GAZETTEER = config('VENUE_GAZETTEER', default='')
+
 
 STATIC_URL = '/static/'
 MEDIA_URL = '/media/'
@@ -88,9 +108,17 @@ MPESA_PASSKEY = config('PASSKEY', default='')
 MPESA_BASE_URL = config('BASE_URL', default='https://api.safaricom.co.ke')
 MPESA_CALLBACK_URL = config('CALLBACK_URL', default='http://localhost:8000/mpesa/callback')
 
+# Seconds a checkout holds tickets while the payment is in flight
+TICKET_HOLD_TTL = config('TICKET_HOLD_TTL', default=300, cast=int)
+
+# Key for the ticket code permutation. Must never change once tickets exist,
+# or new codes may collide with old ones.
+TICKET_CODE_KEY = config('TICKET_CODE_KEY', default=SECRET_KEY)
+
 # Stripe Configuration
 STRIPE_PUBLISHABLE_KEY = config('STRIPE_PUBLISHABLE_KEY', default='')
 STRIPE_SECRET_KEY = config('STRIPE_SECRET_KEY', default='')
+STRIPE_WEBHOOK_SECRET = config('STRIPE_WEBHOOK_SECRET', default='')
 
 # Twilio Configuration
 TWILIO_ACCOUNT_SID = config('TWILIO_ACCOUNT_SID', default='')
@@ -1,6 +1,6 @@
 from datetime import timezone
 from django.contrib import admin
-from .models import Event, Ticket, Category, TicketCategory
+from .models import Event, Ticket, Category, TicketCategory, TicketHold, FulfillmentJob, Venue, DailySales, OrganizerSummary, SalesForecast
 from django.db import migrations
 from django.contrib.auth.models import Group
 from django.contrib.auth import get_user_model
@@ -43,10 +43,10 @@ class CategoryAdmin(admin.ModelAdmin):
 
 @admin.register(TicketCategory)
 class TicketCategoryAdmin(admin.ModelAdmin):
-    list_display = ['name', 'event', 'category_type', 'price', 'available_tickets', 'sales_status']
+    list_display = ['name', 'event', 'category_type', 'price', 'available_tickets', 'shard_count', 'sales_status']
     list_filter = ['category_type', 'event']
     search_fields = ['name', 'event__title']
-    readonly_fields = ['sales_status']
+    readonly_fields = ['sales_status', 'shard_count']
 
     def sales_status(self, obj):
         if not obj.is_available:
@@ -59,6 +59,40 @@ class TicketCategoryAdmin(admin.ModelAdmin):
         return "Available"
     sales_status.short_description = "Status"
 
+@admin.register(TicketHold)
+class TicketHoldAdmin(admin.ModelAdmin):
+    list_display = ['id', 'ticket_category', 'quantity', 'status', 'created_at', 'expires_at']
+    list_filter = ['status', 'event']
+    readonly_fields = ['created_at', 'converted_at', 'released_at']
+
+@admin.register(Venue)
+class VenueAdmin(admin.ModelAdmin):
+    list_display = ['name', 'latitude', 'longitude', 'geohash', 'created_at']
+    search_fields = ['name', 'key']
+    readonly_fields = ['geohash', 'created_at']
+
+@admin.register(DailySales)
+class DailySalesAdmin(admin.ModelAdmin):
+    list_display = ['day', 'event', 'ticket_category', 'tickets', 'quantity', 'revenue']
+    list_filter = ['day']
+    raw_id_fields = ['event', 'ticket_category']
+
+@admin.register(OrganizerSummary)
+class OrganizerSummaryAdmin(admin.ModelAdmin):
+    list_display = ['organizer', 'events', 'active_events', 'tickets_sold', 'revenue', 'last_sale_at']
+    readonly_fields = ['updated_at']
+
+@admin.register(SalesForecast)
+class SalesForecastAdmin(admin.ModelAdmin):
+    list_display = ['ticket_category', 'moving_average', 'smoothed_rate', 'remaining', 'sellout_on', 'computed_at']
+    raw_id_fields = ['ticket_category']
+
+@admin.register(FulfillmentJob)
+class FulfillmentJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'ticket', 'stripe_event', 'kind', 'status', 'attempts', 'run_after', 'claimed_by']
+    list_filter = ['status', 'kind']
+    readonly_fields = ['created_at', 'completed_at', 'claimed_at', 'last_error']
+
 # Register User model with custom admin
 class CustomUserAdmin(UserAdmin):
     list_display = ('username', 'email', 'first_name', 'last_name', 'is_staff', 'is_active')
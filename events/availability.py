@@ -0,0 +1,126 @@
+"""
+Live ticket availability for event pages.
+
+snapshot() is the tickets left per ticket category of one event, read
+with a single query and cached for CACHE_TTL seconds under the event's
+page cache version (events.page_cache). Every stock change bumps that
+version, so buyers see a sale as soon as it commits, and the short TTL
+picks up sales windows opening and closing.
+
+stream() feeds a Server-Sent Events response. It is async and must be
+served by the ASGI application (DopeEvents/asgi.py), where an idle
+watcher costs a suspended coroutine instead of a worker thread. Each
+process runs one poller task per watched event, however many browsers
+are watching it; the poller checks the snapshot every POLL_INTERVAL
+seconds and wakes the watchers only when it changes. Event pages only
+open a stream when settings.AVAILABILITY_STREAM says that path is served
+by ASGI; otherwise they poll the availability endpoint of the JSON API.
+"""
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import Event, TicketCategory
+from .page_cache import event_version_key
+
+CACHE_TTL = 2
+POLL_INTERVAL = 1
+# A comment line keeps proxies from closing an idle stream
+HEARTBEAT_INTERVAL = 15
+# Streams end after this long and the browser reconnects, so long-lived
+# connections are spread across servers after a deploy
+STREAM_DURATION = 10 * 60
+RECONNECT_MS = 3000
+
+
+def snapshot(event_id):
+    """
+    {'event': id, 'ticket_categories': [...]} with each category's
+    tickets left and whether it is on sale, or None if there is no such
+    active event.
+    """
+    key = f'availability:{event_id}:{cache.get(event_version_key(event_id), 0)}'
+    data = cache.get(key)
+    if data is None:
+        now = timezone.now()
+        categories = TicketCategory.objects.filter(event_id=event_id, event__is_active=True).values(
+            'id', 'available_tickets', 'initial_tickets', 'sold_count', 'sales_start', 'sales_end'
+        )
+        data = {
+            'event': event_id,
+            'ticket_categories': [
+                {
+                    'id': category['id'],
+                    'available': category['available_tickets'],
+                    # As TicketCategory.get_sales_percentage()
+                    'sold_percentage': min(100, category['sold_count'] * 100 // category['initial_tickets'])
+                    if category['initial_tickets'] else 0,
+                    'on_sale': category['available_tickets'] > 0
+                    and category['sales_start'] <= now <= category['sales_end'],
+                }
+                for category in categories
+            ],
+        }
+        if not data['ticket_categories'] and not Event.objects.filter(pk=event_id, is_active=True).exists():
+            # Cached as False, which cache.get() can tell apart from a miss
+            data = False
+        cache.set(key, data, CACHE_TTL)
+    return data or None
+
+
+class _Feed:
+    """The latest snapshot of one event in this process, and the watchers waiting on it"""
+
+    def __init__(self, event_id):
+        self.event_id = event_id
+        self.data = None
+        self.changed = asyncio.Event()
+        self.watchers = 0
+        self.task = asyncio.create_task(self._poll())
+
+    async def _poll(self):
+        while True:
+            data = await sync_to_async(snapshot)(self.event_id)
+            if data != self.data:
+                self.data = data
+                changed, self.changed = self.changed, asyncio.Event()
+                changed.set()
+            await asyncio.sleep(POLL_INTERVAL)
+
+
+_feeds = {}
+
+
+def _frame(data):
+    return f"event: availability\ndata: {json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'))}\n\n"
+
+
+async def stream(event_id, duration=STREAM_DURATION):
+    """Server-Sent Events: the current availability, then each change to it"""
+    feed = _feeds.get(event_id)
+    if feed is None:
+        feed = _feeds[event_id] = _Feed(event_id)
+    feed.watchers += 1
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + duration
+    try:
+        yield f'retry: {RECONNECT_MS}\n\n'
+        sent = None
+        while loop.time() < deadline:
+            changed = feed.changed
+            if feed.data is not None and feed.data is not sent:
+                sent = feed.data
+                yield _frame(sent)
+            try:
+                await asyncio.wait_for(changed.wait(), min(HEARTBEAT_INTERVAL, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+    finally:
+        feed.watchers -= 1
+        if not feed.watchers:
+            feed.task.cancel()
+            del _feeds[event_id]
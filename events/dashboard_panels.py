@@ -0,0 +1,98 @@
+"""
+Lazy panels of the seller dashboard.
+
+The dashboard page itself is a skeleton: the header totals come from the
+organizer's OrganizerSummary row (one primary-key lookup), and each
+panel is fetched as JSON once the page has loaded, all in parallel.
+
+Each panel is cached per organizer under the summary row's updated_at,
+which moves with every sale, every event save or delete and every ticket
+category change. An unchanged portfolio is served from the cache. Stock
+held at checkout moves no sales, so "Sold out" badges can lag by up to
+PANEL_TIMEOUT seconds.
+"""
+from django.core.cache import cache
+from django.db.models import Count, F, Max, Min
+from django.template.loader import render_to_string
+
+from .models import Event, SalesForecast, TicketCategory
+from .sales import organizer_revenue
+
+PANEL_TIMEOUT = 5 * 60
+
+
+def events_panel(organizer):
+    """The events table, rendered"""
+    events = Event.objects.filter(organizer=organizer).with_listing_stats()
+    return {'html': render_to_string('events/dashboard_events.html', {'events': events})}
+
+
+def revenue_panel(organizer):
+    """Revenue and tickets sold per event and ticket category, for the breakdown charts"""
+    revenue = organizer_revenue(organizer)
+    no_sales = {'tickets_sold': 0, 'revenue': 0, 'categories': {}}
+    categories = TicketCategory.objects.filter(event__organizer=organizer).values(
+        'id', 'event_id', 'name', 'price'
+    ).order_by('event_id', 'price')
+
+    events = {}
+    for event_id, title in Event.objects.filter(organizer=organizer).values_list('id', 'title'):
+        events[event_id] = {
+            'id': event_id,
+            'title': title,
+            'category_revenue': {},
+            'total_revenue': float(revenue.get(event_id, no_sales)['revenue']),
+        }
+    for category in categories:
+        category_sales = revenue.get(category['event_id'], no_sales)['categories'].get(category['id'], no_sales)
+        events[category['event_id']]['category_revenue'][category['name']] = {
+            'revenue': float(category_sales['revenue']),
+            'tickets_sold': category_sales['tickets_sold'],
+            'price': float(category['price']) if category['price'] else 0.0,
+        }
+    return {'events': list(events.values())}
+
+
+def categories_panel(organizer):
+    """Ticket prices by category name across the organizer's events"""
+    categories = TicketCategory.objects.filter(
+        event__organizer=organizer
+    ).values(
+        'name', 'price'
+    ).annotate(
+        min_price=Min('price'),
+        max_price=Max('price'),
+        event_count=Count('event', distinct=True)
+    ).order_by('name')
+    return {'categories': list(categories)}
+
+
+def forecasts_panel(organizer):
+    """Sales velocity and projected sell-out per ticket category, as stored by the forecast_sales command"""
+    forecasts = SalesForecast.objects.filter(
+        ticket_category__event__organizer=organizer
+    ).values(
+        'moving_average', 'smoothed_rate', 'remaining', 'sellout_on', 'computed_at',
+        event=F('ticket_category__event__title'),
+        category=F('ticket_category__name'),
+        sales_end=F('ticket_category__sales_end'),
+    ).order_by(F('sellout_on').asc(nulls_last=True), '-smoothed_rate')
+    return {'forecasts': list(forecasts)}
+
+
+PANELS = {
+    'events': events_panel,
+    'revenue': revenue_panel,
+    'categories': categories_panel,
+    'forecasts': forecasts_panel,
+}
+
+
+def get_panel(name, organizer, summary):
+    """A panel's data for `organizer`, from the cache while their OrganizerSummary is unchanged"""
+    key = f'dashboard:{organizer.pk}:{name}:{summary.updated_at.timestamp()}'
+    data = cache.get(key)
+    if data is None:
+        data = PANELS[name](organizer)
+        cache.set(key, data, PANEL_TIMEOUT)
+    return data
@@ -0,0 +1,213 @@
+"""
+Facet counts for the event list sidebar.
+
+Every event falls into one cell per facet: category, price band
+(from its cheapest ticket), whether it is on this weekend / this month,
+and whether tickets are available. One grouped query counts the events
+in each combination of cells, a cube of at most a few hundred rows,
+and that is cached per base filter state (search text and "near me").
+
+Each facet's counts are then worked out from the cube in Python, with
+the other facets' selections applied, so picking a price band narrows
+the category counts without another query. The cache key carries the
+listing version from events.page_cache, so event and ticket category
+changes show up at once. Availability and the date buckets can lag by
+up to PAGE_CACHE_TIMEOUT seconds, as on the cached pages.
+"""
+import hashlib
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, Count, Exists, OuterRef, Q, Subquery, Value, When
+from django.db.models import BooleanField, CharField
+from django.utils import timezone
+
+from .models import Category, TicketCategory
+from .page_cache import LISTING_VERSION_KEY
+
+# (key, label, lowest price from, lowest price below) on the cheapest ticket
+PRICE_BANDS = (
+    ('free', 'Free', None, None),
+    ('under_1000', 'Under Ksh 1,000', 0, 1000),
+    ('1000_2999', 'Ksh 1,000 - 2,999', 1000, 3000),
+    ('3000_4999', 'Ksh 3,000 - 4,999', 3000, 5000),
+    ('5000_up', 'Ksh 5,000 and up', 5000, None),
+)
+WHEN_CHOICES = (
+    ('weekend', 'This weekend'),
+    ('month', 'This month'),
+)
+AVAILABILITY_CHOICES = (
+    ('available', 'Tickets available'),
+    ('sold_out', 'Sold out'),
+)
+
+# Query parameters, in sidebar order
+FACETS = ('category', 'price', 'when', 'availability')
+
+
+def date_ranges(now=None):
+    """{'weekend': (start, end), 'month': (start, end)} in the current timezone"""
+    now = now or timezone.now()
+    if timezone.is_aware(now):
+        now = timezone.localtime(now)
+    today = now.date()
+    # On a Sunday this is yesterday: the weekend under way
+    saturday = today + timedelta(days=5 - today.weekday())
+    monday = saturday + timedelta(days=2)
+    next_month = (today.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+    def midnight(day):
+        value = datetime.combine(day, time.min)
+        return timezone.make_aware(value) if timezone.is_aware(now) else value
+
+    return {
+        'weekend': (max(now, midnight(saturday)), midnight(monday)),
+        'month': (now, midnight(next_month)),
+    }
+
+
+def annotate_facets(queryset, now=None):
+    """Annotate the facet cells of each event: facet_price, facet_weekend, facet_month and facet_available"""
+    now = now or timezone.now()
+    ranges = date_ranges(now)
+    categories = TicketCategory.objects.filter(event=OuterRef('pk'))
+    lowest_price = Subquery(categories.order_by('price').values('price')[:1])
+
+    bands = [When(facet_lowest_price=None, then=Value('free')), When(facet_lowest_price=0, then=Value('free'))]
+    for key, label, low, high in PRICE_BANDS[1:]:
+        condition = Q(facet_lowest_price__gte=low) if low else Q(facet_lowest_price__gt=0)
+        if high is not None:
+            condition &= Q(facet_lowest_price__lt=high)
+        bands.append(When(condition, then=Value(key)))
+
+    on_sale = categories.filter(available_tickets__gt=0, sales_start__lte=now, sales_end__gte=now)
+    return queryset.annotate(facet_lowest_price=lowest_price).annotate(
+        facet_price=Case(*bands, default=Value('free'), output_field=CharField()),
+        facet_weekend=Case(
+            When(date__gte=ranges['weekend'][0], date__lt=ranges['weekend'][1], then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField()
+        ),
+        facet_month=Case(
+            When(date__gte=ranges['month'][0], date__lt=ranges['month'][1], then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField()
+        ),
+        facet_available=Case(
+            When(Exists(on_sale) | ~Exists(categories), then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField()
+        ),
+    )
+
+
+def selected_facets(params):
+    """The valid facet selections in a request's query parameters"""
+    choices = {
+        'price': {key for key, *_ in PRICE_BANDS},
+        'when': {key for key, _ in WHEN_CHOICES},
+        'availability': {key for key, _ in AVAILABILITY_CHOICES},
+    }
+    selected = {}
+    for facet in FACETS:
+        value = params.get(facet, '')
+        if value and (facet == 'category' or value in choices[facet]):
+            selected[facet] = value
+    return selected
+
+
+def _cell_matches(row, facet, value):
+    if facet == 'category':
+        return row['category__slug'] == value
+    if facet == 'price':
+        return row['facet_price'] == value
+    if facet == 'when':
+        return row[f'facet_{value}']
+    return row['facet_available'] == (value == 'available')
+
+
+def apply_facets(queryset, selected, now=None):
+    """Filter an event queryset by the selected facets"""
+    if not selected:
+        return queryset
+    if 'category' in selected:
+        queryset = queryset.filter(category__slug=selected['category'])
+    if set(selected) - {'category'}:
+        queryset = annotate_facets(queryset, now)
+        if 'price' in selected:
+            queryset = queryset.filter(facet_price=selected['price'])
+        if 'when' in selected:
+            queryset = queryset.filter(**{f"facet_{selected['when']}": True})
+        if 'availability' in selected:
+            queryset = queryset.filter(facet_available=selected['availability'] == 'available')
+    return queryset
+
+
+def facet_cube(queryset, state):
+    """
+    Event counts per combination of facet cells for `queryset`, from one
+    grouped query, cached per `state` (whatever besides the facets
+    narrows the queryset) and listing version.
+    """
+    digest = hashlib.md5(repr(state).encode()).hexdigest()
+    key = f'facets:{cache.get(LISTING_VERSION_KEY, 0)}:{digest}'
+    rows = cache.get(key) if settings.PAGE_CACHE_TIMEOUT else None
+    if rows is None:
+        rows = list(
+            annotate_facets(queryset)
+            .values('category__slug', 'facet_price', 'facet_weekend', 'facet_month', 'facet_available')
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+        if settings.PAGE_CACHE_TIMEOUT:
+            cache.set(key, rows, settings.PAGE_CACHE_TIMEOUT)
+    return rows
+
+
+def facet_counts(queryset, state, params, categories=None):
+    """
+    The sidebar: a list of facets, each with its options' counts and the
+    query string that toggles the option. `queryset` is the event list
+    before any facet is applied.
+    """
+    rows = facet_cube(queryset, state)
+    selected = selected_facets(params)
+    categories = Category.objects.all() if categories is None else categories
+    options = {
+        'category': [(category.slug, category.name) for category in categories],
+        'price': [(key, label) for key, label, *_ in PRICE_BANDS],
+        'when': list(WHEN_CHOICES),
+        'availability': list(AVAILABILITY_CHOICES),
+    }
+    labels = {'category': 'Category', 'price': 'Price', 'when': 'When', 'availability': 'Availability'}
+
+    facets = []
+    for facet in FACETS:
+        # Counts for this facet respect every other facet's selection
+        others = [(name, value) for name, value in selected.items() if name != facet]
+        rows_for_facet = [row for row in rows if all(_cell_matches(row, name, value) for name, value in others)]
+
+        facet_options = []
+        for value, label in options[facet]:
+            count = sum(row['count'] for row in rows_for_facet if _cell_matches(row, facet, value))
+            is_selected = selected.get(facet) == value
+            if not count and not is_selected:
+                continue
+            query = params.copy()
+            for name in ('cursor', 'format'):
+                query.pop(name, None)
+            if is_selected:
+                query.pop(facet, None)
+            else:
+                query[facet] = value
+            facet_options.append({
+                'value': value,
+                'label': label,
+                'count': count,
+                'selected': is_selected,
+                'query': query.urlencode(),
+            })
+        facets.append({'name': facet, 'label': labels[facet], 'options': facet_options})
+    return facets
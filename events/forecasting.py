@@ -0,0 +1,144 @@
+"""
+Sales velocity and sell-out forecasts per ticket category.
+
+forecast() reads the last HISTORY_DAYS complete days of the DailySales
+rollup for up to BATCH_SIZE ticket categories with one query, lays them
+out as a NumPy matrix (a row per category, a column per day) and works
+out every category at once:
+
+  * the mean tickets sold per day over the last WINDOW days,
+  * exponentially smoothed tickets per day, weighting the latest day by
+    ALPHA,
+  * the day the remaining stock runs out at the smoothed rate, left
+    empty when nothing is selling or that is after sales end.
+
+Days before a category went on sale are left out of both rates.
+
+The forecast_sales command runs it (nightly from cron) and the results
+are stored as SalesForecast rows, so the dashboard never computes them.
+Only categories on sale with tickets left are forecast; rows of the
+others are deleted.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.utils import timezone
+
+from .models import DailySales, SalesForecast, TicketCategory, sale_day
+
+HISTORY_DAYS = 28
+WINDOW = 7
+ALPHA = 0.3
+BATCH_SIZE = 5000
+
+
+def sales_matrix(category_ids, start, days):
+    """Tickets sold on each of `days` days from `start`, with a row per category in `category_ids`"""
+    matrix = np.zeros((len(category_ids), days))
+    rows = list(DailySales.objects.filter(
+        ticket_category_id__in=category_ids,
+        day__gte=start,
+        day__lt=start + timedelta(days=days)
+    ).values_list('ticket_category_id', 'day', 'quantity'))
+    if rows:
+        position = {category_id: index for index, category_id in enumerate(category_ids)}
+        np.add.at(
+            matrix,
+            (
+                np.array([position[category_id] for category_id, day, quantity in rows]),
+                np.array([(day - start).days for category_id, day, quantity in rows]),
+            ),
+            np.array([quantity for category_id, day, quantity in rows], dtype=float)
+        )
+    return matrix
+
+
+def moving_average(matrix, window=WINDOW):
+    """The mean of each row over every run of `window` days, one column per run"""
+    totals = np.cumsum(matrix, axis=1)
+    totals = np.pad(totals, ((0, 0), (1, 0)))
+    return (totals[:, window:] - totals[:, :-window]) / window
+
+
+def exponential_smoothing(matrix, alpha=ALPHA, first=None):
+    """
+    Each row's smoothed level after its last day. The level starts at the
+    row's value on day `first` (an array, default 0) and earlier days are
+    ignored. Computed as one weighted sum per row rather than a day by
+    day recursion.
+    """
+    days = matrix.shape[1]
+    first = np.zeros(len(matrix), dtype=int) if first is None else first
+    column = np.arange(days)
+    weights = alpha * (1 - alpha) ** (days - 1 - column)
+    weights = np.where(column == first[:, None], (1 - alpha) ** (days - 1 - first[:, None]), weights)
+    weights = np.where(column < first[:, None], 0, weights)
+    return (matrix * weights).sum(axis=1)
+
+
+def sellout_days(remaining, rate):
+    """Days until `remaining` tickets are sold at `rate` a day, inf where nothing is selling"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(rate > 0, np.ceil(remaining / rate), np.inf)
+
+
+def _forecast_batch(categories, today, computed_at):
+    # Today's sales are not all in yet, so the history ends yesterday
+    start = today - timedelta(days=HISTORY_DAYS)
+    category_ids = [category_id for category_id, remaining, sales_start, sales_end in categories]
+    matrix = sales_matrix(category_ids, start, HISTORY_DAYS)
+
+    # The first day of the history each category was on sale, HISTORY_DAYS if not yet
+    first = np.clip(
+        np.array([(sale_day(sales_start) - start).days for _, _, sales_start, _ in categories]),
+        0, HISTORY_DAYS
+    )
+    on_sale = np.clip(HISTORY_DAYS - first, 1, WINDOW)
+    # Rounded as stored, so the projection agrees with the rate shown
+    average = (moving_average(matrix)[:, -1] * WINDOW / on_sale).round(2)
+    rate = exponential_smoothing(matrix, first=first).round(2)
+    remaining = np.array([remaining for _, remaining, _, _ in categories])
+    days_left = sellout_days(remaining, rate)
+    sales_days_left = np.array([(sale_day(sales_end) - today).days for _, _, _, sales_end in categories])
+    sells_out = days_left <= sales_days_left
+
+    return [
+        SalesForecast(
+            ticket_category_id=category_id,
+            moving_average=float(average[index]),
+            smoothed_rate=float(rate[index]),
+            remaining=int(remaining[index]),
+            sellout_on=today + timedelta(days=int(days_left[index])) if sells_out[index] else None,
+            computed_at=computed_at,
+        )
+        for index, category_id in enumerate(category_ids)
+    ]
+
+
+def forecast(now=None, batch_size=BATCH_SIZE):
+    """Recompute the SalesForecast rows. Returns the number written."""
+    now = now or timezone.now()
+    today = sale_day(now)
+    categories = TicketCategory.objects.filter(
+        event__is_active=True,
+        available_tickets__gt=0,
+        sales_end__gte=now
+    ).order_by('pk').values_list('pk', 'available_tickets', 'sales_start', 'sales_end')
+
+    written, last_pk = 0, 0
+    while True:
+        batch = list(categories.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+        forecasts = _forecast_batch(batch, today, now)
+        SalesForecast.objects.bulk_create(
+            forecasts,
+            update_conflicts=True,
+            unique_fields=['ticket_category'],
+            update_fields=['moving_average', 'smoothed_rate', 'remaining', 'sellout_on', 'computed_at']
+        )
+        written += len(forecasts)
+
+    SalesForecast.objects.filter(computed_at__lt=now).delete()
+    return written
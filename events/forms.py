@@ -72,7 +72,10 @@ class EventForm(forms.ModelForm):
 
     class Meta:
         model = Event
-        fields = ['title', 'description', 'category', 'new_category', 'image', 'date', 'location', 'total_tickets']
+        fields = [
+            'title', 'description', 'category', 'new_category', 'image', 'date', 'location', 'total_tickets',
+            'waiting_room_enabled', 'waiting_room_rate'
+        ]
         widgets = {
             'date': forms.DateTimeInput(attrs={
                 'type': 'datetime-local',
@@ -82,6 +85,8 @@ class EventForm(forms.ModelForm):
             'title': forms.TextInput(attrs={'class': 'form-control'}),
             'location': forms.TextInput(attrs={'class': 'form-control'}),
             'total_tickets': forms.NumberInput(attrs={'class': 'form-control'}),
+            'waiting_room_enabled': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+            'waiting_room_rate': forms.NumberInput(attrs={'class': 'form-control', 'min': 1}),
             'image': forms.FileInput(attrs={'class': 'form-control'}),
         }
 
@@ -106,6 +111,11 @@ class TicketPurchaseForm(forms.Form):
         min_value=1,
         widget=forms.NumberInput(attrs={'class': 'form-control'})
     )
+    per_attendee = forms.BooleanField(
+        required=False,
+        label="Issue a separate ticket for each attendee",
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
 
     def __init__(self, event, *args, **kwargs):
         super().__init__(*args, **kwargs)
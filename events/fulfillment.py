@@ -0,0 +1,291 @@
+import io
+import os
+import socket
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.db.models import F, Q
+from django.utils import timezone
+from PIL import Image, ImageDraw, ImageFont
+from twilio.rest import Client
+
+from .models import FulfillmentJob, Ticket
+
+# A running job whose worker has not finished it within this many seconds
+# is assumed dead and handed to another worker.
+JOB_LEASE_SECONDS = 600
+
+
+def enqueue_fulfillment(ticket):
+    """
+    Queue the email (and SMS when there is a phone number) for a ticket.
+    Call inside the transaction that creates the ticket so the jobs only
+    exist if the sale does.
+    """
+    jobs = [FulfillmentJob(ticket=ticket, kind='email')]
+    if ticket.buyer_phone:
+        jobs.append(FulfillmentJob(ticket=ticket, kind='sms'))
+    return FulfillmentJob.objects.bulk_create(jobs)
+
+
+def enqueue_stripe_event(stripe_event):
+    """Queue the ticket issuance for a recorded Stripe webhook event"""
+    return FulfillmentJob.objects.create(stripe_event=stripe_event, kind='stripe')
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim_jobs(worker_id, limit=10):
+    """
+    Claim up to `limit` due jobs for this worker.
+
+    Each job moves from queued to running with a conditional UPDATE, so
+    workers running in parallel never claim the same job twice. A job
+    whose lease ran out on its last attempt is failed, not run again.
+    """
+    now = timezone.now()
+    lease_expired = now - timedelta(seconds=JOB_LEASE_SECONDS)
+    fail_abandoned_jobs(lease_expired)
+    candidates = FulfillmentJob.objects.filter(
+        Q(status='queued', run_after__lte=now) |
+        Q(status='running', claimed_at__lt=lease_expired, attempts__lt=F('max_attempts'))
+    ).values_list('pk', 'status')[:limit]
+
+    claimed = []
+    for pk, status in candidates:
+        taken = FulfillmentJob.objects.filter(pk=pk, status=status).exclude(
+            status='running', claimed_at__gte=lease_expired
+        ).exclude(
+            status='running', attempts__gte=F('max_attempts')
+        ).update(
+            status='running',
+            claimed_by=worker_id,
+            claimed_at=now,
+            attempts=F('attempts') + 1
+        )
+        if taken:
+            claimed.append(pk)
+
+    return list(
+        FulfillmentJob.objects.filter(pk__in=claimed, claimed_by=worker_id)
+        .select_related('ticket__event', 'ticket__ticket_category', 'stripe_event')
+    )
+
+
+def fail_abandoned_jobs(lease_expired):
+    """Fail running jobs whose worker died on their last attempt"""
+    abandoned = FulfillmentJob.objects.filter(
+        status='running', claimed_at__lt=lease_expired, attempts__gte=F('max_attempts')
+    )
+    stripe_event_ids = list(abandoned.exclude(stripe_event=None).values_list('stripe_event_id', flat=True))
+    failed = abandoned.update(status='failed', last_error='The worker stopped before finishing the last attempt.')
+    if stripe_event_ids:
+        # payments imports this module, so import it here
+        from payments.models import StripeEvent
+        StripeEvent.objects.filter(pk__in=stripe_event_ids, status='received').update(
+            status='failed', last_error='The worker stopped before finishing the last attempt.'
+        )
+    return failed
+
+
+def _finish(job, **fields):
+    """
+    Record how a claimed job went. Writes nothing if its lease has since
+    passed to another worker, which now owns the job.
+    """
+    return FulfillmentJob.objects.filter(
+        pk=job.pk, status='running', claimed_by=job.claimed_by, claimed_at=job.claimed_at
+    ).update(**fields)
+
+
+def run_job(job):
+    """Run one claimed job, scheduling a retry with backoff if it fails"""
+    try:
+        if job.kind == 'email':
+            send_ticket_email(job.ticket)
+        elif job.kind == 'sms':
+            send_ticket_sms(job.ticket)
+        elif job.kind == 'stripe':
+            # payments imports this module, so import it here
+            from payments.services import StripeWebhookService
+            StripeWebhookService().process_event(job.stripe_event, final_attempt=job.attempts >= job.max_attempts)
+    except Exception as e:
+        if job.attempts >= job.max_attempts:
+            _finish(job, status='failed', last_error=str(e))
+        else:
+            _finish(
+                job,
+                status='queued',
+                run_after=timezone.now() + timedelta(seconds=30 * 2 ** (job.attempts - 1)),
+                last_error=str(e)
+            )
+        return False
+
+    _finish(job, status='done', completed_at=timezone.now(), last_error='')
+    return True
+
+
+def process_jobs(worker_id=None, limit=10):
+    """Claim and run one batch. Returns (succeeded, failed) counts."""
+    worker_id = worker_id or default_worker_id()
+    succeeded = failed = 0
+    for job in claim_jobs(worker_id, limit):
+        if run_job(job):
+            succeeded += 1
+        else:
+            failed += 1
+    return succeeded, failed
+
+
+def generate_ticket_image(ticket):
+    """Generate a ticket image with event and buyer details"""
+    # Create a new image with white background
+    width = 1000
+    height = 500
+    image = Image.new('RGB', (width, height), 'white')
+    draw = ImageDraw.Draw(image)
+    
+    # Try to load a font, fallback to default if not found
+    try:
+        font_large = ImageFont.truetype("arial.ttf", 40)
+        font_medium = ImageFont.truetype("arial.ttf", 30)
+        font_small = ImageFont.truetype("arial.ttf", 25)
+    except:
+        font_large = ImageFont.load_default()
+        font_medium = ImageFont.load_default()
+        font_small = ImageFont.load_default()
+
+    # Draw ticket content
+    draw.text((50, 50), ticket.event.title, fill='black', font=font_large)
+    draw.text((50, 100), f"Category: {ticket.ticket_category.name}", fill='black', font=font_medium)
+    draw.text((50, 150), f"Date: {ticket.event.date.strftime('%B %d, %Y at %I:%M %p')}", fill='black', font=font_medium)
+    draw.text((50, 200), f"Location: {ticket.event.location}", fill='black', font=font_medium)
+    draw.text((50, 250), f"Attendee: {ticket.buyer_name}", fill='black', font=font_medium)
+    draw.text((50, 300), f"Quantity: {ticket.quantity}", fill='black', font=font_medium)
+    draw.text((50, 350), f"Price per ticket: ${ticket.unit_price}", fill='black', font=font_medium)
+    draw.text((50, 400), f"Ticket Code: {ticket.ticket_code}", fill='black', font=font_large)
+    
+    # Save image to bytes buffer
+    image_buffer = io.BytesIO()
+    image.save(image_buffer, format='JPEG', quality=90)
+    image_buffer.seek(0)
+    
+    return image_buffer
+
+def send_ticket_email(ticket):
+    """
+    Send email with ticket details and attached ticket image. For a group
+    purchase every attendee ticket in the group is attached.
+    """
+    if ticket.group_reference:
+        return send_group_ticket_email(ticket)
+
+    subject = f'Your Ticket for {ticket.event.title}'
+    message = f"""
+    Dear {ticket.buyer_name},
+    
+    Thank you for purchasing tickets for {ticket.event.title}!
+    
+    Event Details:
+    - Event: {ticket.event.title}
+    - Category: {ticket.ticket_category.name}
+    - Date: {ticket.event.date.strftime('%B %d, %Y at %I:%M %p')}
+    - Location: {ticket.event.location}
+    - Quantity: {ticket.quantity}
+    - Price per ticket: ${ticket.unit_price}
+    - Total Paid: ${ticket.total_amount}
+    - Ticket Code: {ticket.ticket_code}
+    
+    
+    Please find your ticket attached to this email.
+    Present this ticket (either digital or printed) at the event entrance.
+    
+    Best regards,
+    Event Team
+    """
+    
+    # Create EmailMessage object
+    email = EmailMessage(
+        subject,
+        message,
+        settings.DEFAULT_FROM_EMAIL,
+        [ticket.buyer_email]
+    )
+    
+    ticket_image = generate_ticket_image(ticket)
+    email.attach(
+        f'ticket_{ticket.ticket_code}.jpg',
+        ticket_image.getvalue(),
+        'image/jpeg'
+    )
+    
+    email.send(fail_silently=False)
+
+def send_group_ticket_email(ticket):
+    """Send one email carrying every attendee ticket of a group purchase"""
+    tickets = list(
+        Ticket.objects.filter(group_reference=ticket.group_reference)
+        .select_related('event', 'ticket_category')
+        .order_by('id')
+    )
+    total_paid = sum(t.total_amount for t in tickets)
+    codes = '\n'.join(f'    - {t.ticket_code}' for t in tickets)
+    subject = f'Your {len(tickets)} Tickets for {ticket.event.title}'
+    message = f"""
+    Dear {ticket.buyer_name},
+    
+    Thank you for purchasing tickets for {ticket.event.title}!
+    
+    Event Details:
+    - Event: {ticket.event.title}
+    - Category: {ticket.ticket_category.name}
+    - Date: {ticket.event.date.strftime('%B %d, %Y at %I:%M %p')}
+    - Location: {ticket.event.location}
+    - Tickets: {len(tickets)}
+    - Price per ticket: ${ticket.unit_price}
+    - Total Paid: ${total_paid}
+    - Group Reference: {ticket.group_reference}
+    
+    Ticket Codes:
+{codes}
+    
+    Each attendee has their own ticket attached to this email.
+    Every ticket admits one person at the event entrance.
+    
+    Best regards,
+    Event Team
+    """
+    
+    email = EmailMessage(
+        subject,
+        message,
+        settings.DEFAULT_FROM_EMAIL,
+        [ticket.buyer_email]
+    )
+    
+    for group_ticket in tickets:
+        email.attach(
+            f'ticket_{group_ticket.ticket_code}.jpg',
+            generate_ticket_image(group_ticket).getvalue(),
+            'image/jpeg'
+        )
+    
+    email.send(fail_silently=False)
+
+def send_ticket_sms(ticket):
+    """Send an SMS confirmation. Errors propagate so the worker can retry."""
+    client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+    
+    if ticket.group_reference:
+        body = f'{ticket.event.title} group tickets confirmed for {ticket.event.date.strftime("%m/%d/%Y")}. Reference: {ticket.group_reference}. Codes sent by email.'
+    else:
+        body = f'Ticket confirmed for {ticket.event.title} on {ticket.event.date.strftime("%m/%d/%Y")}. Code: {ticket.ticket_code}'
+    
+    client.messages.create(
+        body=body,
+        from_=settings.TWILIO_PHONE_NUMBER,
+        to=ticket.buyer_phone
+    )
@@ -0,0 +1,218 @@
+"""
+Venue coordinates and radius search.
+
+Each Venue stores its latitude and longitude with a geohash, an indexed
+string whose prefixes name ever smaller grid cells. A radius search
+works out the handful of cells covering the circle's bounding box and
+looks them up as index ranges (geohash >= cell AND geohash < cell + '{').
+Only the venues in those cells, and then their events, are filtered
+further:
+
+  * by the exact bounding box;
+  * by an equirectangular distance, which is plain arithmetic that every
+    database can evaluate and order by. It is accurate to well under 1%
+    at the radii people search.
+
+Free-text locations are geocoded from an offline gazetteer: a CSV of
+name,latitude,longitude rows (settings.VENUE_GAZETTEER, or the bundled
+events/data/gazetteer.csv).
+"""
+import csv
+import math
+import re
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import F, Q
+
+from .pagination import EVENTS_PER_PAGE, decode_cursor, paginate_events
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9
+# Sorts after every geohash character, so cell + CELL_END bounds the cell's range
+CELL_END = '{'
+# Search cells per query; a coarser precision is used until the cover fits
+MAX_COVER_CELLS = 16
+
+KM_PER_DEGREE = 111.32
+MAX_RADIUS_KM = 200
+# Narrowest ring nearest_events() searches first
+MIN_RING_KM = 0.5
+
+DEFAULT_GAZETTEER = Path(__file__).resolve().parent / 'data' / 'gazetteer.csv'
+
+
+def geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Standard base32 geohash of a point"""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        interval, coordinate = (lng_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits, value = 0, 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """(height, width) in degrees of a geohash cell"""
+    lng_bits = math.ceil(5 * precision / 2)
+    lat_bits = 5 * precision - lng_bits
+    return 180 / 2 ** lat_bits, 360 / 2 ** lng_bits
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """(min_lat, max_lat, min_lng, max_lng) around a circle"""
+    lat_delta = radius_km / KM_PER_DEGREE
+    lng_delta = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+    return (
+        max(-90.0, latitude - lat_delta),
+        min(90.0, latitude + lat_delta),
+        max(-180.0, longitude - lng_delta),
+        min(180.0, longitude + lng_delta),
+    )
+
+
+def cover_cells(box):
+    """The geohash cells, at the finest precision with at most MAX_COVER_CELLS of them, covering a box"""
+    min_lat, max_lat, min_lng, max_lng = box
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        rows = math.floor((max_lat - min_lat) / height) + 2
+        columns = math.floor((max_lng - min_lng) / width) + 2
+        if rows * columns <= MAX_COVER_CELLS or precision == 1:
+            break
+
+    latitudes = [min(min_lat + row * height, max_lat) for row in range(rows)]
+    longitudes = [min(min_lng + column * width, max_lng) for column in range(columns)]
+    return sorted({geohash(lat, lng, precision) for lat in latitudes for lng in longitudes})
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(a))
+
+
+def nearby(queryset, latitude, longitude, radius_km):
+    """
+    Narrow an Event queryset to events within `radius_km` of a point and
+    annotate `distance_sq`, the squared distance in km. Order by
+    'distance_sq' for nearest first.
+
+    The venues are matched in a subquery on the geohash index, so the
+    database starts from the few venues nearby rather than from the events.
+    """
+    box = bounding_box(latitude, longitude, radius_km)
+    cells = Q()
+    for cell in cover_cells(box):
+        cells |= Q(geohash__gte=cell, geohash__lt=cell + CELL_END)
+    venues = queryset.model._meta.get_field('venue').related_model.objects.filter(
+        cells,
+        latitude__range=box[:2],
+        longitude__range=box[2:],
+    )
+
+    lng_scale = KM_PER_DEGREE * math.cos(math.radians(latitude))
+    north = (F('venue__latitude') - latitude) * KM_PER_DEGREE
+    east = (F('venue__longitude') - longitude) * lng_scale
+    return queryset.filter(venue__in=venues.values('pk')).annotate(
+        distance_sq=north * north + east * east
+    ).filter(distance_sq__lte=radius_km ** 2)
+
+
+def nearest_events(queryset, latitude, longitude, radius_km, cursor=None, per_page=EVENTS_PER_PAGE):
+    """
+    One page of events within `radius_km`, nearest first, as
+    (events, next_cursor) like paginate_events().
+
+    Searches a ring just past the previous page first and widens it
+    until it holds a full page. In a dense city only the nearest few
+    events are sorted, not every event in the radius.
+    """
+    position = decode_cursor(cursor, 'distance_sq')
+    start = math.sqrt(position[0]) if position else 0.0
+    step = max(radius_km / 32, MIN_RING_KM)
+    while True:
+        ring = min(start + step, radius_km)
+        events, next_cursor = paginate_events(
+            nearby(queryset, latitude, longitude, ring), cursor, per_page, key='distance_sq'
+        )
+        if next_cursor or ring >= radius_km:
+            return events, next_cursor
+        step *= 4
+
+
+def parse_point(latitude, longitude, radius_km, default_radius_km=25):
+    """
+    Validate request parameters for a radius search. Returns
+    (latitude, longitude, radius_km), or None if they are missing or bad.
+    """
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+        radius_km = float(radius_km) if radius_km else default_radius_km
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180 and 0 < radius_km):
+        return None
+    return latitude, longitude, min(radius_km, MAX_RADIUS_KM)
+
+
+# Gazetteer
+
+def location_key(location):
+    """Normalized form of a free-text location, used to match venues and gazetteer names"""
+    return ' '.join(re.findall(r'\w+', (location or '').lower()))
+
+
+@lru_cache(maxsize=4)
+def load_gazetteer(path):
+    """{location key: (latitude, longitude)} from a name,latitude,longitude CSV"""
+    places = {}
+    if not Path(path).exists():
+        print(f"Venue gazetteer {path} not found; locations will not be geocoded")
+        return places
+    with open(path, newline='', encoding='utf-8') as gazetteer:
+        for row in csv.DictReader(gazetteer):
+            try:
+                point = float(row['latitude']), float(row['longitude'])
+            except (KeyError, TypeError, ValueError):
+                continue
+            places.setdefault(location_key(row.get('name')), point)
+    places.pop('', None)
+    return places
+
+
+def gazetteer_path():
+    return str(settings.VENUE_GAZETTEER or DEFAULT_GAZETTEER)
+
+
+def geocode(location, path=None):
+    """
+    (latitude, longitude) for a free-text location, or None.
+
+    Tries the whole text, then each comma-separated part in order, then
+    runs of words from longest to shortest, so "The Alchemist, Westlands,
+    Nairobi" resolves to Westlands when the venue itself is not listed.
+    """
+    places = load_gazetteer(path or gazetteer_path())
+    parts = [location_key(part) for part in (location or '').split(',')]
+    candidates = [location_key(location)] + parts
+    words = location_key(location).split()
+    for length in range(len(words), 0, -1):
+        candidates.extend(' '.join(words[start:start + length]) for start in range(len(words) - length + 1))
+
+    for candidate in candidates:
+        if candidate in places:
+            return places[candidate]
+    return None
@@ -0,0 +1,239 @@
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Event, PendingSale, TicketCategory, TicketCategoryShard, TicketHold
+from .page_cache import bump_event
+
+
+class InsufficientTickets(Exception):
+    """Raised when a ticket category cannot cover the requested quantity"""
+
+    def __init__(self, ticket_category_id, quantity):
+        self.ticket_category_id = ticket_category_id
+        self.quantity = quantity
+        super().__init__(
+            f"Not enough tickets available in category {ticket_category_id} for quantity {quantity}."
+        )
+
+
+class InventoryService:
+    """
+    Ticket stock adjustments for ticket categories and their events.
+
+    Every change is a single conditional UPDATE evaluated by the database,
+    so concurrent purchases can never read the same stale value and
+    oversell or lose a decrement.
+    """
+
+    def decrement(self, ticket_category, quantity):
+        """
+        Take `quantity` tickets from a category and its event.
+
+        Raises InsufficientTickets (and leaves both counters untouched)
+        when the category does not have enough tickets left.
+        """
+        quantity = int(quantity)
+        if quantity < 1:
+            raise ValueError("Quantity must be at least 1.")
+
+        if ticket_category.is_sharded:
+            self._decrement_sharded(ticket_category, quantity)
+            return
+
+        with transaction.atomic():
+            updated = TicketCategory.objects.filter(
+                pk=ticket_category.pk,
+                available_tickets__gte=quantity
+            ).update(available_tickets=F('available_tickets') - quantity)
+
+            if not updated:
+                raise InsufficientTickets(ticket_category.pk, quantity)
+
+            # The event counter is informational; never let a drifted value
+            # fail a purchase the category itself could cover.
+            Event.objects.filter(
+                pk=ticket_category.event_id,
+                available_tickets__gte=quantity
+            ).update(available_tickets=F('available_tickets') - quantity)
+            # update() skips the signals that invalidate cached pages
+            bump_event(ticket_category.event_id)
+
+    def increment(self, ticket_category, quantity):
+        """Return `quantity` tickets to a category and its event"""
+        quantity = int(quantity)
+        if quantity < 1:
+            raise ValueError("Quantity must be at least 1.")
+
+        with transaction.atomic():
+            if ticket_category.is_sharded:
+                TicketCategoryShard.objects.filter(
+                    ticket_category_id=ticket_category.pk,
+                    index=random.randrange(ticket_category.shard_count)
+                ).update(available_tickets=F('available_tickets') + quantity)
+            else:
+                TicketCategory.objects.filter(pk=ticket_category.pk).update(
+                    available_tickets=F('available_tickets') + quantity
+                )
+                Event.objects.filter(pk=ticket_category.event_id).update(
+                    available_tickets=F('available_tickets') + quantity
+                )
+            bump_event(ticket_category.event_id)
+
+    def _decrement_sharded(self, ticket_category, quantity):
+        shards = TicketCategoryShard.objects.filter(ticket_category_id=ticket_category.pk)
+        start = random.randrange(ticket_category.shard_count)
+        order = [(start + offset) % ticket_category.shard_count for offset in range(ticket_category.shard_count)]
+
+        with transaction.atomic():
+            # Usual case: one random shard covers the whole purchase and no
+            # other row is touched.
+            for index in order:
+                if shards.filter(index=index, available_tickets__gte=quantity).update(
+                    available_tickets=F('available_tickets') - quantity
+                ):
+                    break
+            else:
+                # No single shard is big enough; gather what is left across
+                # shards under row locks. Only happens near sell-out.
+                remaining = quantity
+                for shard in shards.select_for_update().filter(available_tickets__gt=0).order_by('index'):
+                    take = min(remaining, shard.available_tickets)
+                    shards.filter(pk=shard.pk).update(available_tickets=F('available_tickets') - take)
+                    remaining -= take
+                    if not remaining:
+                        break
+                if remaining:
+                    raise InsufficientTickets(ticket_category.pk, quantity)
+            # The category and event rows are left alone; the sweeper
+            # writes their totals (sync_sharded_totals)
+
+    def sync_sharded_totals(self, ticket_category):
+        """
+        Write the shard sum to the category's available_tickets and the
+        category sum to the event's. Purchases in a sharded category only
+        touch its shards, so the expired-hold sweeper calls this every
+        minute rather than each purchase.
+        """
+        with transaction.atomic():
+            category = TicketCategory.objects.filter(pk=ticket_category.pk)
+            category.update(available_tickets=Coalesce(Subquery(
+                TicketCategoryShard.objects.filter(
+                    ticket_category_id=OuterRef('pk')
+                ).values('ticket_category_id').annotate(
+                    total=Sum('available_tickets')
+                ).values('total')
+            ), 0))
+            bump_event(ticket_category.event_id)
+
+            Event.objects.filter(pk=ticket_category.event_id).update(available_tickets=Coalesce(Subquery(
+                TicketCategory.objects.filter(
+                    event_id=OuterRef('pk')
+                ).values('event_id').annotate(
+                    total=Sum('available_tickets')
+                ).values('total')
+            ), 0))
+
+    def set_shard_count(self, ticket_category, shard_count, available=None):
+        """
+        Switch a category into high-contention mode with `shard_count`
+        shards, or back to a single counter with 0. Remaining stock, or
+        `available` tickets when given, is split evenly across the shards.
+        Stock edits to a sharded category must come through here, as the
+        sweeper overwrites its available_tickets with the shard sum.
+        """
+        with transaction.atomic():
+            category = TicketCategory.objects.select_for_update().get(pk=ticket_category.pk)
+            shards = TicketCategoryShard.objects.filter(ticket_category=category)
+            if available is None and category.is_sharded:
+                available = shards.aggregate(total=Sum('available_tickets'))['total'] or 0
+            elif available is None:
+                available = category.available_tickets
+
+            shards.delete()
+            base, extra = divmod(available, shard_count) if shard_count else (0, 0)
+            TicketCategoryShard.objects.bulk_create([
+                TicketCategoryShard(
+                    ticket_category=category,
+                    index=index,
+                    available_tickets=base + (1 if index < extra else 0)
+                )
+                for index in range(shard_count)
+            ])
+
+            TicketCategory.objects.filter(pk=category.pk).update(
+                shard_count=shard_count,
+                available_tickets=available
+            )
+            ticket_category.shard_count = shard_count
+            ticket_category.available_tickets = available
+
+    def place_hold(self, ticket_category, quantity, ttl=None):
+        """
+        Set tickets aside for a checkout until `ttl` seconds from now.
+
+        The tickets leave `available_tickets` straight away, so every view
+        that filters on availability already counts the hold without
+        locking anything. Raises InsufficientTickets like decrement().
+        """
+        ttl = settings.TICKET_HOLD_TTL if ttl is None else ttl
+        with transaction.atomic():
+            self.decrement(ticket_category, quantity)
+            return TicketHold.objects.create(
+                event_id=ticket_category.event_id,
+                ticket_category=ticket_category,
+                quantity=quantity,
+                expires_at=timezone.now() + timedelta(seconds=ttl)
+            )
+
+    def convert_hold(self, hold):
+        """
+        Mark a hold as paid for. Call inside the transaction that creates
+        the Ticket.
+
+        A hold the sweeper already released takes fresh stock instead and
+        raises InsufficientTickets if there is none left. A hold that was
+        already converted is left alone.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            converted = TicketHold.objects.filter(
+                pk=hold.pk, status='active'
+            ).update(status='converted', converted_at=now)
+
+            if not converted:
+                reclaimed = TicketHold.objects.filter(
+                    pk=hold.pk, status='released'
+                ).update(status='converted', converted_at=now)
+                if reclaimed:
+                    self.decrement(hold.ticket_category, hold.quantity)
+
+    def release_hold(self, hold):
+        """Give a hold's tickets back. Returns False if it was no longer active."""
+        with transaction.atomic():
+            released = TicketHold.objects.filter(
+                pk=hold.pk, status='active'
+            ).update(status='released', released_at=timezone.now())
+            if released:
+                self.increment(hold.ticket_category, hold.quantity)
+        return bool(released)
+
+    def release_expired_holds(self):
+        """Release every active hold past its expiry. Returns the number released."""
+        expired = TicketHold.objects.filter(
+            status='active',
+            expires_at__lte=timezone.now()
+        ).select_related('ticket_category')
+        released = sum(1 for hold in expired if self.release_hold(hold))
+
+        # Sharded categories leave their totals and sales counters to this sweep
+        for ticket_category in TicketCategory.objects.filter(shard_count__gt=0):
+            self.sync_sharded_totals(ticket_category)
+        PendingSale.flush()
+
+        return released
@@ -0,0 +1,173 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from events.inventory import InventoryService, InsufficientTickets
+from events.models import Event, PendingSale, Ticket, TicketCategory
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Fire concurrent purchases at one ticket category and check for oversell'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stock', type=int, default=200, help='Tickets in the category')
+        parser.add_argument('--purchases', type=int, default=500, help='Purchase attempts to fire')
+        parser.add_argument('--workers', type=int, default=50, help='Parallel purchase threads')
+        parser.add_argument('--quantity', type=int, default=1, help='Tickets per purchase')
+        parser.add_argument('--shards', type=int, default=0, help='Run the category in high-contention mode with this many shards')
+        parser.add_argument(
+            '--compare',
+            action='store_true',
+            help='Run single-row and sharded (--shards, default 8) back to back and compare throughput'
+        )
+        parser.add_argument(
+            '--naive',
+            action='store_true',
+            help='Use the old read-modify-write decrement for comparison'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite':
+            # SQLite serialises writers; give queued writers time to get the lock
+            # instead of failing with "database is locked".
+            connection.settings_dict.setdefault('OPTIONS', {})['timeout'] = 30
+
+        if options['compare']:
+            shards = options['shards'] or 8
+            single = self._run(options, shards=0)
+            sharded = self._run(options, shards=shards)
+            self.stdout.write(
+                f"Sharded ({shards}) vs single row: {sharded['rate'] / single['rate']:.2f}x throughput"
+            )
+            if connection.vendor == 'sqlite':
+                self.stdout.write('SQLite locks the whole database per write, so sharding cannot help here; run against PostgreSQL.')
+        else:
+            self._run(options, shards=options['shards'])
+
+    def _run(self, options, shards):
+        stock = options['stock']
+        quantity = options['quantity']
+
+        organizer = User.objects.create(username=f'bench_inventory_{int(time.time() * 1000)}')
+        try:
+            now = timezone.now()
+            event = Event.objects.create(
+                organizer=organizer,
+                title='Inventory benchmark',
+                description='Temporary event created by bench_inventory',
+                date=now + timedelta(days=30),
+                location='Benchmark',
+                total_tickets=stock,
+                available_tickets=stock,
+            )
+            category = TicketCategory.objects.create(
+                event=event,
+                name='Benchmark',
+                category_type='regular',
+                price=100,
+                available_tickets=stock,
+                max_tickets_per_purchase=quantity,
+                sales_start=now - timedelta(days=1),
+                sales_end=now + timedelta(days=1),
+            )
+            if shards:
+                InventoryService().set_shard_count(category, shards)
+
+            purchase = self._naive_purchase if options['naive'] else self._purchase
+
+            def run(index):
+                try:
+                    return purchase(category, quantity, index)
+                except OperationalError:
+                    return 'error'
+                finally:
+                    connections.close_all()
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+                results = list(pool.map(run, range(options['purchases'])))
+            elapsed = time.perf_counter() - started
+
+            if shards:
+                # What the sweeper does for sharded categories
+                InventoryService().sync_sharded_totals(category)
+                PendingSale.flush()
+            category.refresh_from_db()
+            event.refresh_from_db()
+            sold = category.tickets.aggregate(total=Sum('quantity'))['total'] or 0
+            succeeded = results.count(True)
+            rejected = results.count(False)
+            errors = results.count('error')
+            oversold = max(0, sold - stock)
+            lost_decrements = sold - (stock - category.available_tickets)
+            miscounted = sold - category.sold_count
+            rate = len(results) / elapsed
+
+            if options['naive']:
+                mode = 'naive read-modify-write'
+            elif shards:
+                mode = f'conditional update, {shards} shards'
+            else:
+                mode = 'conditional update, single row'
+            self.stdout.write(f"Mode:               {mode}")
+            self.stdout.write(f"Attempts:           {len(results)} ({options['workers']} workers, quantity {quantity})")
+            self.stdout.write(f"Succeeded:          {succeeded}")
+            self.stdout.write(f"Rejected sold out:  {rejected}")
+            self.stdout.write(f"Database errors:    {errors}")
+            self.stdout.write(f"Tickets sold:       {sold} of {stock}")
+            self.stdout.write(f"Category remaining: {category.available_tickets}")
+            self.stdout.write(f"Event remaining:    {event.available_tickets}")
+            self.stdout.write(f"Category sold:      {category.sold_count}")
+            self.stdout.write(f"Elapsed:            {elapsed:.3f}s ({rate:.0f} attempts/s)")
+
+            if oversold or lost_decrements or miscounted:
+                self.stdout.write(self.style.ERROR(
+                    f'Inventory inconsistent: oversold by {oversold}, {lost_decrements} decrements lost, '
+                    f'sold count off by {miscounted}.'
+                ))
+            else:
+                self.stdout.write(self.style.SUCCESS('No oversell, no lost decrements and sold count matches.'))
+            return {'rate': rate, 'sold': sold}
+        finally:
+            organizer.delete()
+
+    def _purchase(self, category, quantity, index):
+        try:
+            with transaction.atomic():
+                InventoryService().decrement(category, quantity)
+                self._create_ticket(category, quantity, index)
+        except InsufficientTickets:
+            return False
+        return True
+
+    def _naive_purchase(self, category, quantity, index):
+        category = TicketCategory.objects.select_related('event').get(pk=category.pk)
+        if category.available_tickets < quantity:
+            return False
+        category.available_tickets -= quantity
+        category.save()
+        category.event.available_tickets -= quantity
+        category.event.save()
+        self._create_ticket(category, quantity, index)
+        return True
+
+    def _create_ticket(self, category, quantity, index):
+        # Confirmed, as a paid purchase is, so the sales counters are written too
+        Ticket.objects.create(
+            event_id=category.event_id,
+            ticket_category=category,
+            buyer_name=f'Benchmark buyer {index}',
+            buyer_email=f'buyer{index}@example.com',
+            quantity=quantity,
+            unit_price=category.price,
+            total_amount=category.price * quantity,
+            status='confirmed',
+        )
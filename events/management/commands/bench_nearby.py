@@ -0,0 +1,112 @@
+import math
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from events import geo
+from events.models import Event, Venue
+from events.pagination import paginate_events
+
+User = get_user_model()
+
+# (name, latitude, longitude, radius in km)
+SEARCHES = (
+    ('Nairobi', -1.2864, 36.8172, 5),
+    ('Nairobi', -1.2864, 36.8172, 25),
+    ('Mombasa', -4.0435, 39.6682, 10),
+    ('Kisumu', -0.0917, 34.7680, 50),
+    ('Lodwar', 3.1191, 35.5973, 25),
+)
+
+
+class Command(BaseCommand):
+    help = 'Time "events near me" radius searches on a generated event table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=100000, help='Events to generate')
+        parser.add_argument('--venues', type=int, default=5000, help='Venues to spread the events over')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per search; the best time is reported')
+
+    def handle(self, *args, **options):
+        # Everything happens in one transaction that is rolled back at the end
+        with transaction.atomic():
+            self._generate(options['events'], options['venues'])
+            self.stdout.write(f"{'Search':<22}{'Matches':>9}{'No geohash':>14}{'Geohash':>11}{'Speedup':>10}")
+
+            listed = Event.objects.filter(is_active=True, date__gte=timezone.now())
+            for name, latitude, longitude, radius in SEARCHES:
+                matches = geo.nearby(listed, latitude, longitude, radius).count()
+                slow = self._time(options, lambda: paginate_events(
+                    self._scan(listed, latitude, longitude, radius), key='distance_sq'
+                ))
+                fast = self._time(options, lambda: geo.nearest_events(listed, latitude, longitude, radius))
+                label = f'{name} {radius}km'
+                self.stdout.write(
+                    f"{label:<22}{matches:>9}{slow * 1000:>12.1f}ms{fast * 1000:>9.1f}ms{slow / fast:>9.1f}x"
+                )
+            transaction.set_rollback(True)
+
+    def _generate(self, count, venue_count):
+        rng = random.Random(42)
+        places = list(geo.load_gazetteer(geo.gazetteer_path()).items())
+        started = time.perf_counter()
+
+        # Venues cluster around gazetteer places, about half of them around the first (biggest) few
+        venues = []
+        for index in range(venue_count):
+            key, (latitude, longitude) = places[min(int(rng.expovariate(0.1)), len(places) - 1)]
+            latitude += rng.gauss(0, 0.05)
+            longitude += rng.gauss(0, 0.05)
+            venues.append(Venue(
+                name=f'Bench venue {index}',
+                key=f'bench venue {index} {key}',
+                latitude=latitude,
+                longitude=longitude,
+                geohash=geo.geohash(latitude, longitude),
+            ))
+        venues = Venue.objects.bulk_create(venues)
+        if not venues[0].pk:
+            venues = list(Venue.objects.filter(key__startswith='bench venue '))
+
+        organizer = User.objects.create(username=f'bench_nearby_{int(time.time() * 1000)}')
+        now = timezone.now()
+        batch = []
+        for index in range(count):
+            venue = venues[rng.randrange(len(venues))]
+            batch.append(Event(
+                organizer=organizer,
+                title=f'Bench event {index}',
+                description='Generated by bench_nearby',
+                location=venue.name,
+                venue=venue,
+                date=now + timedelta(hours=index + 1),
+            ))
+            if len(batch) == 5000:
+                Event.objects.bulk_create(batch)
+                batch = []
+        Event.objects.bulk_create(batch)
+        self.stdout.write(
+            f'Generated {count} events at {venue_count} venues in {time.perf_counter() - started:.1f}s.'
+        )
+
+    def _scan(self, queryset, latitude, longitude, radius_km):
+        """The same distance filter without the geohash and bounding-box ranges"""
+        lng_scale = geo.KM_PER_DEGREE * math.cos(math.radians(latitude))
+        north = (F('venue__latitude') - latitude) * geo.KM_PER_DEGREE
+        east = (F('venue__longitude') - longitude) * lng_scale
+        return queryset.annotate(distance_sq=north * north + east * east).filter(distance_sq__lte=radius_km ** 2)
+
+    def _time(self, options, run):
+        best = None
+        for _ in range(options['repeat']):
+            started = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
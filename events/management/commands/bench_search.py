@@ -0,0 +1,96 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from events import search
+from events.models import Event
+
+User = get_user_model()
+
+WORDS = (
+    'jazz rock gospel comedy festival summit workshop nairobi mombasa kisumu night live '
+    'acoustic brunch rooftop marathon tech startup fashion art gallery film poetry dance '
+    'safari wine food market charity gala conference youth karaoke reggae amapiano '
+    'afrobeats hiphop classical orchestra theatre expo launch meetup'
+).split()
+
+FILLER = (
+    'join us for an unforgettable experience with great music friends and food '
+    'tickets are limited so book early doors open an hour before the show'
+).split()
+
+QUERIES = ('jazz', 'nairobi rooftop', 'afro', 'comedy night', 'tech summit nairobi', 'zzzz')
+
+
+class Command(BaseCommand):
+    help = 'Compare full-text search against the old icontains search on a generated event table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=100000, help='Events to generate')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per query; the best time is reported')
+        parser.add_argument('--limit', type=int, default=12, help='Results fetched per search, as on a listing page')
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            raise CommandError('This database has no full-text index to benchmark.')
+
+        # Everything happens in one transaction that is rolled back at the end
+        with transaction.atomic():
+            self._generate(options['events'])
+            self.stdout.write(f"{'Query':<24}{'icontains':>13}{'full-text':>13}{'Speedup':>10}")
+
+            limit = options['limit']
+            listed = Event.objects.filter(is_active=True, date__gte=timezone.now())
+            for query in QUERIES:
+                slow = self._time(options, lambda: list(
+                    search.search_events_icontains(listed, query).order_by('date', 'id')[:limit]
+                ))
+                fast = self._time(options, lambda: self._full_text_page(listed, query, limit))
+                self.stdout.write(f"{query:<24}{slow * 1000:>11.1f}ms{fast * 1000:>11.1f}ms{slow / fast:>9.1f}x")
+            transaction.set_rollback(True)
+
+        self.stdout.write('icontains only matches whole phrases; full-text matches every term as a prefix, in any order.')
+
+    def _generate(self, count):
+        rng = random.Random(42)
+        organizer = User.objects.create(username=f'bench_search_{int(time.time() * 1000)}')
+        now = timezone.now()
+
+        started = time.perf_counter()
+        batch = []
+        for index in range(count):
+            title_words = rng.sample(WORDS, 3)
+            batch.append(Event(
+                organizer=organizer,
+                title=' '.join(title_words).title(),
+                # Mostly filler, so keywords are rare in descriptions as in real listings
+                description=' '.join(rng.choices(FILLER, k=58) + rng.sample(WORDS, 2)),
+                location=rng.choice(('Nairobi', 'Mombasa', 'Kisumu', 'Nakuru', 'Eldoret')),
+                date=now + timedelta(hours=index + 1),
+            ))
+            if len(batch) == 5000:
+                Event.objects.bulk_create(batch)
+                batch = []
+        Event.objects.bulk_create(batch)
+        # bulk_create skips the signals that maintain the index
+        search.rebuild_index()
+        self.stdout.write(f'Generated and indexed {count} events in {time.perf_counter() - started:.1f}s.')
+
+    def _full_text_page(self, queryset, query, limit):
+        ranked, _ = search.search_event_ids(queryset, query, per_page=limit)
+        found = Event.objects.in_bulk([event_id for event_id, rank in ranked])
+        return [found[event_id] for event_id, rank in ranked]
+
+    def _time(self, options, run):
+        best = None
+        for _ in range(options['repeat']):
+            started = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
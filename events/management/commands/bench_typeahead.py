@@ -0,0 +1,83 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from events import typeahead
+from events.management.commands.bench_search import WORDS
+
+LOCATIONS = ('Nairobi', 'Westlands, Nairobi', 'Mombasa', 'Nyali, Mombasa', 'Kisumu', 'Nakuru', 'Eldoret', 'Diani')
+CATEGORIES = ('Music', 'Comedy', 'Sports', 'Technology', 'Food & Drink', 'Arts', 'Nightlife', 'Business')
+
+
+class Command(BaseCommand):
+    help = 'Time typeahead lookups against an in-memory index of generated events (no database)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=100000, help='Events in the index')
+        parser.add_argument('--lookups', type=int, default=20000, help='Lookups to time')
+        parser.add_argument('--updates', type=int, default=1000, help='Incremental updates to time')
+
+    def handle(self, *args, **options):
+        rng = random.Random(7)
+        now = timezone.now()
+
+        def record(event_id):
+            category = rng.choice(CATEGORIES)
+            location = rng.choice(LOCATIONS)
+            title = ' '.join(rng.sample(WORDS, 3)).title()
+            return typeahead.EventRecord(
+                id=event_id,
+                title=title,
+                date=now + timedelta(hours=rng.randrange(1, 24 * 365)),
+                location=location,
+                location_key=' '.join(typeahead.words(location)),
+                category_slug=category.lower(),
+                category_name=category,
+                words=tuple(typeahead.words(title) + typeahead.words(location)),
+            )
+
+        started = time.perf_counter()
+        index = typeahead.TypeaheadIndex(record(event_id) for event_id in range(1, options['events'] + 1))
+        self.stdout.write(
+            f"Built an index of {len(index)} events ({len(index.tokens)} tokens) "
+            f"in {time.perf_counter() - started:.2f}s."
+        )
+
+        # What people type: the first few letters of one or two words
+        queries = []
+        for _ in range(options['lookups']):
+            typed = [word[:rng.randint(2, len(word))] for word in rng.sample(WORDS, rng.choice((1, 1, 2)))]
+            queries.append(' '.join(typed))
+
+        # The version stamp check a real lookup makes before searching
+        cache_key = typeahead.VERSION_KEY
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            cache.get(cache_key, 0)
+            index.search(query, now=now)
+            timings.append(time.perf_counter() - started)
+        self._report('Lookup', timings)
+
+        timings = []
+        for _ in range(options['updates']):
+            event_id = rng.randrange(1, options['events'] + 1)
+            started = time.perf_counter()
+            index.upsert(event_id, record(event_id))
+            timings.append(time.perf_counter() - started)
+        self._report('Update', timings)
+
+    def _report(self, label, timings):
+        timings.sort()
+
+        def percentile(share):
+            return timings[min(len(timings) - 1, int(len(timings) * share))] * 1000
+
+        self.stdout.write(
+            f"{label}: p50 {percentile(0.50):.3f}ms  p99 {percentile(0.99):.3f}ms  "
+            f"max {timings[-1] * 1000:.3f}ms over {len(timings)}"
+        )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from events.forecasting import BATCH_SIZE, forecast
+
+
+class Command(BaseCommand):
+    help = 'Recompute sales velocity and sell-out forecasts of ticket categories on sale (run nightly from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Ticket categories forecast per query')
+
+    def handle(self, *args, **options):
+        written = forecast(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Forecast {written} ticket categories.'))
@@ -0,0 +1,53 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from events import geo
+from events.models import Event, Venue
+
+
+class Command(BaseCommand):
+    help = 'Link events without a venue to geocoded venues, using an offline gazetteer'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--gazetteer',
+            help='name,latitude,longitude CSV to geocode from (default: settings.VENUE_GAZETTEER or the bundled file)'
+        )
+        parser.add_argument('--all', action='store_true', help='Re-link events that already have a venue')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be linked without saving')
+
+    def handle(self, *args, **options):
+        path = options['gazetteer'] or geo.gazetteer_path()
+        if not geo.load_gazetteer(path):
+            raise CommandError(f'No places could be read from {path}.')
+
+        events = Event.objects.all()
+        if not options['all']:
+            events = events.filter(venue__isnull=True)
+        counts = Counter(events.values_list('location', flat=True))
+
+        linked, missing = 0, Counter()
+        with transaction.atomic():
+            for location, count in counts.items():
+                if options['dry_run']:
+                    found = Venue.objects.filter(key=geo.location_key(location)).exists() or geo.geocode(location, path)
+                else:
+                    venue = Venue.for_location(location, path)
+                    found = venue is not None
+                    # update() skips Event.save, which would resolve each event again
+                    events.filter(location=location).update(venue=venue)
+                if found:
+                    linked += count
+                else:
+                    missing[location] += count
+
+        verb = 'Would link' if options['dry_run'] else 'Linked'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {linked} events to venues.'))
+        if missing:
+            self.stdout.write(self.style.WARNING(
+                f'{sum(missing.values())} events in {len(missing)} locations are not in the gazetteer. Most common:'
+            ))
+            for location, count in missing.most_common(10):
+                self.stdout.write(f'  {count:>6}  {location}')
@@ -0,0 +1,23 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from events.sales import rebuild_daily_sales
+
+
+class Command(BaseCommand):
+    help = 'Recompute the DailySales rollup from Ticket rows, for all days or a date range'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='First day to rebuild, YYYY-MM-DD')
+        parser.add_argument('--until', help='Last day to rebuild, YYYY-MM-DD')
+        parser.add_argument('--event', type=int, action='append', dest='events', help='Only rebuild this event id (repeatable)')
+
+    def handle(self, *args, **options):
+        try:
+            since = date.fromisoformat(options['since']) if options['since'] else None
+            until = date.fromisoformat(options['until']) if options['until'] else None
+        except ValueError as e:
+            raise CommandError(f'Bad date: {e}')
+        written = rebuild_daily_sales(since, until, options['events'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} daily sales rows.'))
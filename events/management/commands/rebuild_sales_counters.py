@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from events.sales import rebuild_sales_counters
+
+
+class Command(BaseCommand):
+    help = 'Recompute sold_count and revenue on events and ticket categories, and organizer summaries, from Ticket rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--event', type=int, action='append', dest='events', help='Only rebuild this event id (repeatable)')
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_sales_counters(options['events'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt sales counters for {rebuilt} events.'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from events import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for all events'
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            self.stdout.write(self.style.WARNING(
+                f'No full-text index for {connection.vendor}; event search uses icontains.'
+            ))
+            return
+
+        with transaction.atomic():
+            indexed = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} events.'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from events.inventory import InventoryService
+
+
+class Command(BaseCommand):
+    help = 'Return tickets from expired checkout holds to their categories (run every minute from cron)'
+
+    def handle(self, *args, **options):
+        released = InventoryService().release_expired_holds()
+        self.stdout.write(self.style.SUCCESS(f'Released {released} expired ticket holds.'))
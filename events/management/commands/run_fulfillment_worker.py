@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from events.fulfillment import default_worker_id, process_jobs
+
+
+class Command(BaseCommand):
+    help = 'Send queued ticket emails and SMS and fulfill recorded Stripe events. Several workers can run side by side.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=10, help='Jobs to claim per round')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Process one batch and exit')
+
+    def handle(self, *args, **options):
+        worker_id = default_worker_id()
+        self.stdout.write(f'Fulfillment worker {worker_id} started.')
+
+        try:
+            while True:
+                close_old_connections()
+                succeeded, failed = process_jobs(worker_id, options['batch'])
+                if succeeded or failed:
+                    self.stdout.write(f'Processed {succeeded + failed} jobs ({failed} failed).')
+                if options['once']:
+                    break
+                if not (succeeded or failed):
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            self.stdout.write('Fulfillment worker stopped.')
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from events.inventory import InventoryService
+from events.models import TicketCategory
+
+
+class Command(BaseCommand):
+    help = 'Put a ticket category into high-contention mode by spreading its stock across shard rows (0 turns it off)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('ticket_category_id', type=int)
+        parser.add_argument('shards', type=int, help='Number of shard rows, or 0 for a single counter')
+
+    def handle(self, *args, **options):
+        if options['shards'] < 0:
+            raise CommandError('Shard count cannot be negative.')
+        try:
+            ticket_category = TicketCategory.objects.get(pk=options['ticket_category_id'])
+        except TicketCategory.DoesNotExist:
+            raise CommandError(f"Ticket category {options['ticket_category_id']} does not exist.")
+
+        InventoryService().set_shard_count(ticket_category, options['shards'])
+
+        if ticket_category.is_sharded:
+            self.stdout.write(self.style.SUCCESS(
+                f'{ticket_category} now spreads {ticket_category.available_tickets} tickets across {ticket_category.shard_count} shards.'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'{ticket_category} now uses a single counter.'))
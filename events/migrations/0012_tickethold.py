@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-16 19:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0011_alter_user_profile_picture'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('status', models.CharField(choices=[('active', 'Active'), ('converted', 'Converted'), ('released', 'Released')], default='active', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField()),
+                ('converted_at', models.DateTimeField(blank=True, null=True)),
+                ('released_at', models.DateTimeField(blank=True, null=True)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ticket_holds', to='events.event')),
+                ('ticket_category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='holds', to='events.ticketcategory')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'expires_at'], name='events_tick_status_f06f85_idx')],
+            },
+        ),
+    ]
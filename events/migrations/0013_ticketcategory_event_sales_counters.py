@@ -0,0 +1,53 @@
+# Generated by Django 4.2.7 on 2026-10-16 19:18
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_sales_counters(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    TicketCategory = apps.get_model('events', 'TicketCategory')
+    Ticket = apps.get_model('events', 'Ticket')
+    sold = Ticket.objects.filter(status__in=('confirmed', 'used'))
+
+    for row in sold.exclude(ticket_category=None).values('ticket_category').annotate(
+        quantity=Sum('quantity'), amount=Sum('total_amount')
+    ):
+        TicketCategory.objects.filter(pk=row['ticket_category']).update(
+            sold_count=row['quantity'], revenue=row['amount']
+        )
+    for row in sold.values('event').annotate(quantity=Sum('quantity'), amount=Sum('total_amount')):
+        Event.objects.filter(pk=row['event']).update(
+            sold_count=row['quantity'], revenue=row['amount']
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0012_tickethold'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='revenue',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Revenue from sold tickets, maintained by Ticket.save', max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='sold_count',
+            field=models.PositiveIntegerField(default=0, help_text='Tickets sold across all categories, maintained by Ticket.save'),
+        ),
+        migrations.AddField(
+            model_name='ticketcategory',
+            name='revenue',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Revenue from sold tickets, maintained by Ticket.save', max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='ticketcategory',
+            name='sold_count',
+            field=models.PositiveIntegerField(default=0, help_text='Tickets sold in this category, maintained by Ticket.save'),
+        ),
+        migrations.RunPython(backfill_sales_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-16 19:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0013_ticketcategory_event_sales_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticketcategory',
+            name='shard_count',
+            field=models.PositiveSmallIntegerField(default=0, help_text='High-contention mode: spread stock across this many shard rows (0 keeps a single counter)'),
+        ),
+        migrations.CreateModel(
+            name='TicketCategoryShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveSmallIntegerField()),
+                ('available_tickets', models.PositiveIntegerField(default=0)),
+                ('ticket_category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shards', to='events.ticketcategory')),
+            ],
+            options={
+                'ordering': ['ticket_category', 'index'],
+                'unique_together': {('ticket_category', 'index')},
+            },
+        ),
+    ]
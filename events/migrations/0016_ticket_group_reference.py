@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-16 19:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0015_fulfillmentjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='group_reference',
+            field=models.CharField(blank=True, db_index=True, help_text='Shared by the per-attendee tickets of one group purchase', max_length=50),
+        ),
+    ]
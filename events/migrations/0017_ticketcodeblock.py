@@ -0,0 +1,20 @@
+# Generated by Django 4.2.7 on 2026-10-16 19:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0016_ticket_group_reference'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketCodeBlock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('allocated_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
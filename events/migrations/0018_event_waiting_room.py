@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-16 19:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0017_ticketcodeblock'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='waiting_room_enabled',
+            field=models.BooleanField(default=False, help_text='Queue visitors and admit them to checkout gradually'),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='waiting_room_rate',
+            field=models.PositiveIntegerField(default=60, help_text='Visitors admitted to checkout per minute while the waiting room is on'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS events_event_fts USING fts5("
+            "title, description, location, tokenize='unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            "INSERT INTO events_event_fts (events_event_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0, 5.0)')"
+        )
+        schema_editor.execute(
+            "INSERT INTO events_event_fts (rowid, title, description, location) "
+            "SELECT id, title, description, location FROM events_event"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE TABLE IF NOT EXISTS events_event_search ("
+            "event_id bigint PRIMARY KEY REFERENCES events_event (id) "
+            "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS events_event_search_document_idx "
+            "ON events_event_search USING GIN (document)"
+        )
+        schema_editor.execute(
+            "INSERT INTO events_event_search (event_id, document) SELECT id, "
+            "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(location, '')), 'B') || "
+            "setweight(to_tsvector('simple', coalesce(description, '')), 'C') "
+            "FROM events_event"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS events_event_fts")
+    elif vendor == 'postgresql':
+        schema_editor.execute("DROP TABLE IF EXISTS events_event_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0019_event_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
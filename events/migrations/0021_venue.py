@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-16 20:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0020_event_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Venue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=300)),
+                ('key', models.CharField(help_text='Normalized location text this venue matches', max_length=300, unique=True)),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+                ('geohash', models.CharField(db_index=True, max_length=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='venue',
+            field=models.ForeignKey(blank=True, help_text='Set from the location on save', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='events', to='events.venue'),
+        ),
+    ]
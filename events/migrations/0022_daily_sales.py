@@ -0,0 +1,55 @@
+# Generated by Django 4.2.7 on 2026-10-16 20:36
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+import django.db.models.deletion
+
+
+def backfill_daily_sales(apps, schema_editor):
+    DailySales = apps.get_model('events', 'DailySales')
+    Ticket = apps.get_model('events', 'Ticket')
+    totals = Ticket.objects.filter(status__in=('confirmed', 'used')).values(
+        'event_id', 'ticket_category_id', 'purchased_at__date'
+    ).annotate(count=Count('id'), quantity=Sum('quantity'), amount=Sum('total_amount')).order_by()
+    DailySales.objects.bulk_create(
+        [
+            DailySales(
+                event_id=row['event_id'],
+                ticket_category_id=row['ticket_category_id'],
+                day=row['purchased_at__date'],
+                tickets=row['count'],
+                quantity=row['quantity'],
+                revenue=row['amount'],
+            )
+            for row in totals.iterator()
+        ],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0021_venue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('tickets', models.IntegerField(default=0, help_text='Sold Ticket rows')),
+                ('quantity', models.IntegerField(default=0, help_text='Tickets sold, counting group quantities')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='events.event')),
+                ('ticket_category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='events.ticketcategory')),
+            ],
+            options={
+                'verbose_name_plural': 'daily sales',
+                'indexes': [models.Index(fields=['day'], name='daily_sales_day_idx')],
+                'unique_together': {('event', 'ticket_category', 'day')},
+            },
+        ),
+        migrations.RunPython(backfill_daily_sales, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-16 20:37
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0022_daily_sales'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrganizerSummary',
+            fields=[
+                ('organizer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('events', models.PositiveIntegerField(default=0)),
+                ('active_events', models.PositiveIntegerField(default=0)),
+                ('tickets_sold', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('last_sale_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'organizer summaries',
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-16 20:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0023_organizer_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesForecast',
+            fields=[
+                ('ticket_category', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='forecast', serialize=False, to='events.ticketcategory')),
+                ('moving_average', models.FloatField(default=0, help_text='Tickets sold per day over the last week')),
+                ('smoothed_rate', models.FloatField(default=0, help_text='Exponentially smoothed tickets sold per day')),
+                ('remaining', models.IntegerField(default=0)),
+                ('sellout_on', models.DateField(blank=True, help_text='Empty when it is not expected to sell out before sales end', null=True)),
+                ('computed_at', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-16 20:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0024_sales_forecast'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingSale',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('tickets', models.IntegerField(default=0)),
+                ('quantity', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='events.event')),
+                ('ticket_category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='events.ticketcategory')),
+            ],
+        ),
+    ]
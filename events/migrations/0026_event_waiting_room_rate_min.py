@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-16 21:23
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0025_pending_sale'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='event',
+            name='waiting_room_rate',
+            field=models.PositiveIntegerField(default=60, help_text='Visitors admitted to checkout per minute while the waiting room is on', validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+    ]
@@ -1,8 +1,12 @@
-from django.db import models
+from django.db import IntegrityError, connection, models, transaction
 from django.contrib.auth.models import AbstractUser
 from django.urls import reverse
 from django.utils import timezone
 from django.conf import settings
+from django.core.validators import MinValueValidator
+
+from . import geo
+from .page_cache import bump_event
 
 # Import merchandise models
 from .models_merchandise import MerchandiseCategory, Merchandise, MerchandiseOrder, OrderItem
@@ -66,7 +70,70 @@ class Category(models.Model):
         return self.name
 
     def get_absolute_url(self):
-        return reverse('category_detail', kwargs={'slug': self.slug})
+        return reverse('category_events', kwargs={'slug': self.slug})
+
+class Venue(models.Model):
+    """
+    A geocoded place. Events link to the venue matching their free-text
+    location; see events.geo for the geohash index and radius search.
+    """
+    name = models.CharField(max_length=300)
+    key = models.CharField(max_length=300, unique=True, help_text="Normalized location text this venue matches")
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    geohash = models.CharField(max_length=12, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        self.geohash = geo.geohash(self.latitude, self.longitude)
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def for_location(cls, location, gazetteer=None):
+        """The venue for a free-text location, geocoded from the gazetteer on first use. None if unknown."""
+        key = geo.location_key(location)
+        if not key:
+            return None
+        venue = cls.objects.filter(key=key).first()
+        if venue is None:
+            point = geo.geocode(location, gazetteer)
+            if point is None:
+                return None
+            venue, _ = cls.objects.get_or_create(
+                key=key,
+                defaults={'name': location.strip()[:300], 'latitude': point[0], 'longitude': point[1]}
+            )
+        return venue
+
+class EventQuerySet(models.QuerySet):
+    def with_listing_stats(self):
+        """
+        Annotate everything an event card shows, in the same SQL statement
+        as the events themselves: lowest and highest ticket price, number
+        of ticket categories, and whether any category is on sale right
+        now. Sold count is already the denormalized sold_count column, and
+        the category is joined in, so rendering a card runs no queries.
+        """
+        now = timezone.now()
+        on_sale = TicketCategory.objects.filter(
+            event=models.OuterRef('pk'),
+            available_tickets__gt=0,
+            sales_start__lte=now,
+            sales_end__gte=now
+        )
+        return self.select_related('category').annotate(
+            min_ticket_price=models.Min('ticket_categories__price'),
+            max_ticket_price=models.Max('ticket_categories__price'),
+            ticket_category_count=models.Count('ticket_categories'),
+            has_category_on_sale=models.Exists(on_sale),
+        )
+
 
 class Event(models.Model):
     organizer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='events')
@@ -76,32 +143,85 @@ class Event(models.Model):
     image = models.ImageField(upload_to='event_images/', blank=True, null=True)
     date = models.DateTimeField()
     location = models.CharField(max_length=300)
+    venue = models.ForeignKey(
+        Venue,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='events',
+        help_text="Set from the location on save"
+    )
     total_tickets = models.PositiveIntegerField(default=0)
     available_tickets = models.PositiveIntegerField(default=0)
+    sold_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Tickets sold across all categories, maintained by Ticket.save"
+    )
+    revenue = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        help_text="Revenue from sold tickets, maintained by Ticket.save"
+    )
     created_at = models.DateTimeField(auto_now=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
+    waiting_room_enabled = models.BooleanField(
+        default=False,
+        help_text="Queue visitors and admit them to checkout gradually"
+    )
+    waiting_room_rate = models.PositiveIntegerField(
+        default=60,
+        # At 0 nobody after the first visitor would ever be admitted
+        validators=[MinValueValidator(1)],
+        help_text="Visitors admitted to checkout per minute while the waiting room is on"
+    )
+
+    objects = EventQuerySet.as_manager()
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of listings, see events.pagination
+            models.Index(fields=['date', 'id'], name='event_date_id_idx'),
+        ]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # The location the venue was last resolved from
+        self._venue_location = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if instance.get_deferred_fields().isdisjoint({'location', 'venue'}):
+            instance._venue_location = instance.location
+        return instance
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        if self.venue_id is None or self.location != self._venue_location:
+            self.venue = Venue.for_location(self.location)
+        super().save(*args, **kwargs)
+        self._venue_location = self.location
+
     def get_absolute_url(self):
         return reverse('event_detail', kwargs={'pk': self.pk})
 
     @property
     def tickets_sold(self):
         """Return total number of tickets sold across all categories"""
-        return sum(
-            category.tickets_sold 
-            for category in self.ticket_categories.all()
-        )
+        return self.sold_count
 
     @property
     def is_sold_out(self):
         """Check if any tickets are available in any category"""
+        if hasattr(self, 'has_category_on_sale'):
+            # Annotated by EventQuerySet.with_listing_stats
+            return self.ticket_category_count > 0 and not self.has_category_on_sale
+
         # If no ticket categories exist, don't show as sold out
         if not self.ticket_categories.exists():
             return False
@@ -116,11 +236,15 @@ class Event(models.Model):
 
     @property
     def lowest_ticket_price(self):
+        if hasattr(self, 'min_ticket_price'):
+            return self.min_ticket_price
         category = self.ticket_categories.order_by('price').first()
         return category.price if category else None
 
     @property
     def highest_ticket_price(self):
+        if hasattr(self, 'max_ticket_price'):
+            return self.max_ticket_price
         category = self.ticket_categories.order_by('-price').first()
         return category.price if category else None
 
@@ -134,8 +258,8 @@ class Event(models.Model):
         )
 
     def get_total_revenue(self):
-        """Calculate total revenue from all ticket categories"""
-        return sum(category.get_revenue() for category in self.ticket_categories.all())
+        """Return total revenue from all ticket categories"""
+        return self.revenue
 
 class TicketCategory(models.Model):
     CATEGORY_TYPES = [
@@ -164,6 +288,20 @@ class TicketCategory(models.Model):
     )
     sales_start = models.DateTimeField()
     sales_end = models.DateTimeField()
+    shard_count = models.PositiveSmallIntegerField(
+        default=0,
+        help_text="High-contention mode: spread stock across this many shard rows (0 keeps a single counter)"
+    )
+    sold_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Tickets sold in this category, maintained by Ticket.save"
+    )
+    revenue = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        help_text="Revenue from sold tickets, maintained by Ticket.save"
+    )
 
     class Meta:
         unique_together = ['event', 'category_type']
@@ -179,10 +317,8 @@ class TicketCategory(models.Model):
 
     @property
     def tickets_sold(self):
-        """Return total number of tickets sold based on actual ticket records"""
-        return self.tickets.filter(status='confirmed').aggregate(
-            total=models.Sum('quantity')
-        )['total'] or 0
+        """Return total number of tickets sold in this category"""
+        return self.sold_count
 
     def get_sales_percentage(self):
         if not self.initial_tickets:
@@ -202,8 +338,104 @@ class TicketCategory(models.Model):
     def total_tickets(self):
         return self.initial_tickets
 
+    @property
+    def is_sharded(self):
+        return self.shard_count > 0
+
     def get_revenue(self):
-        return sum(ticket.total_amount for ticket in self.tickets.all())
+        return self.revenue
+
+class TicketCategoryShard(models.Model):
+    """
+    One slice of a high-contention category's stock. Purchases decrement a
+    random shard so concurrent buyers do not queue on the category row;
+    TicketCategory.available_tickets holds the sum of the shards, written
+    by the expired-hold sweeper (InventoryService.sync_sharded_totals), so
+    it can lag the shards by up to a minute.
+    """
+    ticket_category = models.ForeignKey(TicketCategory, on_delete=models.CASCADE, related_name='shards')
+    index = models.PositiveSmallIntegerField()
+    available_tickets = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['ticket_category', 'index']
+        ordering = ['ticket_category', 'index']
+
+    def __str__(self):
+        return f"{self.ticket_category} - shard {self.index}"
+
+
+class PendingSale(models.Model):
+    """
+    A sale in a sharded (high-contention) ticket category that has not
+    reached the sales counters yet.
+
+    Ticket.record_sales only inserts one of these for a sharded category,
+    so a flash sale never queues on its TicketCategory, Event,
+    DailySales or OrganizerSummary rows. The expired-hold sweeper folds
+    them into those rows every minute (flush), so sharded categories'
+    sales figures lag by up to that long.
+    """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='+')
+    ticket_category = models.ForeignKey(TicketCategory, on_delete=models.CASCADE, related_name='+')
+    day = models.DateField()
+    tickets = models.IntegerField(default=0)
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.ticket_category_id} on {self.day}: {self.quantity}"
+
+    @classmethod
+    def flush(cls, batch_size=10000):
+        """Move pending sales into the counters and rollups. Returns the number folded."""
+        skip_locked = connection.features.has_select_for_update_skip_locked
+        folded = 0
+        while True:
+            with transaction.atomic():
+                rows = list(cls.objects.select_for_update(skip_locked=skip_locked).order_by('pk')[:batch_size])
+                if not rows:
+                    return folded
+                totals = {}
+                for row in rows:
+                    total = totals.setdefault((row.event_id, row.ticket_category_id, row.day), [0, 0, 0])
+                    total[0] += row.tickets
+                    total[1] += row.quantity
+                    total[2] += row.revenue
+                cls.objects.filter(pk__in=[row.pk for row in rows]).delete()
+                for (event_id, ticket_category_id, day), (tickets, quantity, amount) in totals.items():
+                    Ticket.record_sales(event_id, ticket_category_id, quantity, amount, tickets, day)
+            folded += len(rows)
+
+class TicketHold(models.Model):
+    """Tickets set aside for a buyer while their payment is in flight"""
+    STATUS_CHOICES = [
+        ('active', 'Active'),
+        ('converted', 'Converted'),
+        ('released', 'Released'),
+    ]
+
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='ticket_holds')
+    ticket_category = models.ForeignKey(TicketCategory, on_delete=models.CASCADE, related_name='holds')
+    quantity = models.PositiveIntegerField(default=1)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    converted_at = models.DateTimeField(null=True, blank=True)
+    released_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'expires_at']),
+        ]
+
+    def __str__(self):
+        return f"Hold #{self.pk} - {self.quantity}x {self.ticket_category.name} ({self.status})"
+
+    @property
+    def is_expired(self):
+        return self.expires_at <= timezone.now()
 
 class Ticket(models.Model):
     STATUS_CHOICES = [
@@ -226,18 +458,115 @@ class Ticket(models.Model):
     purchased_at = models.DateTimeField(auto_now_add=True)
     ticket_code = models.CharField(max_length=50, unique=True)
     transaction_code = models.CharField(max_length=50, blank=True, null=True)
+    group_reference = models.CharField(
+        max_length=50,
+        blank=True,
+        db_index=True,
+        help_text="Shared by the per-attendee tickets of one group purchase"
+    )
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     used_at = models.DateTimeField(null=True, blank=True)
     cancelled_at = models.DateTimeField(null=True, blank=True)
 
+    # Statuses that count towards sold_count and revenue
+    SOLD_STATUSES = ('confirmed', 'used')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._counted_sale = (0, 0, 0)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if instance.get_deferred_fields().isdisjoint({'status', 'quantity', 'total_amount'}):
+            instance._counted_sale = instance._current_sale()
+        else:
+            # Looked up from the stored row on save
+            instance._counted_sale = None
+        return instance
+
+    def _current_sale(self):
+        """Tickets, quantity and amount this ticket contributes to the sales counters"""
+        if self.status in self.SOLD_STATUSES:
+            return 1, self.quantity, self.total_amount
+        return 0, 0, 0
+
+    def _stored_sale(self):
+        stored = Ticket.objects.filter(pk=self.pk).values('status', 'quantity', 'total_amount').first()
+        if stored and stored['status'] in self.SOLD_STATUSES:
+            return 1, stored['quantity'], stored['total_amount']
+        return 0, 0, 0
+
+    @classmethod
+    def record_sales(cls, event_id, ticket_category_id, quantity, amount, tickets=0, day=None, sharded=False):
+        """
+        Move the category and event sales counters, and the DailySales
+        rollup for `day` (default today), by the given delta. `tickets`
+        is the change in the number of sold Ticket rows. Called by save()
+        and delete(), and directly by code that writes tickets in bulk.
+
+        For a sharded category (`sharded`) the delta is only written down
+        as a PendingSale, for the sweeper to apply.
+        """
+        if not tickets and not quantity and not amount:
+            return
+        if sharded and ticket_category_id:
+            PendingSale.objects.create(
+                event_id=event_id, ticket_category_id=ticket_category_id, day=day or sale_day(),
+                tickets=tickets, quantity=quantity, revenue=amount
+            )
+            return
+        DailySales.record(event_id, ticket_category_id, day or sale_day(), tickets, quantity, amount)
+        OrganizerSummary.record_sales(event_id, quantity, amount)
+        if ticket_category_id:
+            TicketCategory.objects.filter(pk=ticket_category_id).update(
+                sold_count=models.F('sold_count') + quantity,
+                revenue=models.F('revenue') + amount
+            )
+        Event.objects.filter(pk=event_id).update(
+            sold_count=models.F('sold_count') + quantity,
+            revenue=models.F('revenue') + amount
+        )
+        bump_event(event_id)
+
+    def _apply_sales_delta(self, tickets, quantity, amount):
+        if not tickets and not quantity and not amount:
+            return
+        sharded = bool(self.ticket_category_id) and self.ticket_category.is_sharded
+        # Sales are dated by purchase, so a later cancellation comes off the day it was bought
+        self.record_sales(
+            self.event_id, self.ticket_category_id, quantity, amount, tickets, sale_day(self.purchased_at), sharded
+        )
+
     def save(self, *args, **kwargs):
         if not self.unit_price:
             self.unit_price = self.ticket_category.price
         self.total_amount = self.unit_price * self.quantity
-        if not self.ticket_code:
-            import uuid
-            self.ticket_code = str(uuid.uuid4())[:8].upper()
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            if not self.ticket_code:
+                from .ticket_codes import allocate_ticket_codes
+                self.ticket_code = allocate_ticket_codes(1)[0]
+            if self._counted_sale is None:
+                self._counted_sale = self._stored_sale()
+            super().save(*args, **kwargs)
+            counted_tickets, counted_quantity, counted_amount = self._counted_sale
+            tickets, quantity, amount = self._current_sale()
+            self._apply_sales_delta(tickets - counted_tickets, quantity - counted_quantity, amount - counted_amount)
+        self._counted_sale = (tickets, quantity, amount)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            if self._counted_sale is None:
+                self._counted_sale = self._stored_sale()
+            counted_tickets, counted_quantity, counted_amount = self._counted_sale
+            self._apply_sales_delta(-counted_tickets, -counted_quantity, -counted_amount)
+            result = super().delete(*args, **kwargs)
+        self._counted_sale = (0, 0, 0)
+        return result
+
+    def confirm(self):
+        self.status = 'confirmed'
+        self.save()
 
     def mark_as_used(self):
         self.status = 'used'
@@ -249,6 +578,215 @@ class Ticket(models.Model):
         self.cancelled_at = timezone.now()
         self.save()
 
+def sale_day(moment=None):
+    """The local date a sale is counted on"""
+    moment = moment or timezone.now()
+    return timezone.localtime(moment).date() if timezone.is_aware(moment) else moment.date()
+
+
+class DailySales(models.Model):
+    """
+    Confirmed sales (Ticket.SOLD_STATUSES) per event, ticket category and
+    purchase day. Ticket.record_sales keeps the rows current and
+    events.sales.rebuild_daily_sales recomputes any date range. Sales
+    charts sum these rows, so they cost one row per day rather than one
+    per ticket.
+
+    Readers always sum rows: a racing first sale of a day without a
+    ticket category (NULL is never equal, so unique_together cannot catch
+    it) may leave two rows for the same day, and their sum is still right.
+    """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='daily_sales')
+    ticket_category = models.ForeignKey(
+        TicketCategory, on_delete=models.CASCADE, null=True, blank=True, related_name='daily_sales'
+    )
+    day = models.DateField()
+    # Signed: a cancellation of a ticket sold before the rollup existed can
+    # take a day below zero until it is rebuilt
+    tickets = models.IntegerField(default=0, help_text="Sold Ticket rows")
+    quantity = models.IntegerField(default=0, help_text="Tickets sold, counting group quantities")
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ['event', 'ticket_category', 'day']
+        indexes = [
+            models.Index(fields=['day'], name='daily_sales_day_idx'),
+        ]
+        verbose_name_plural = 'daily sales'
+
+    def __str__(self):
+        return f"{self.event_id} / {self.ticket_category_id} on {self.day}"
+
+    @classmethod
+    def record(cls, event_id, ticket_category_id, day, tickets, quantity, amount):
+        """Add a delta to one day's row, creating it on the day's first sale"""
+        row = cls.objects.filter(event_id=event_id, ticket_category_id=ticket_category_id, day=day)
+        changes = {
+            'tickets': models.F('tickets') + tickets,
+            'quantity': models.F('quantity') + quantity,
+            'revenue': models.F('revenue') + amount,
+        }
+        if row.update(**changes):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(
+                    event_id=event_id, ticket_category_id=ticket_category_id, day=day,
+                    tickets=tickets, quantity=quantity, revenue=amount
+                )
+        except IntegrityError:
+            # Another sale created the row first
+            row.update(**changes)
+
+
+class OrganizerSummary(models.Model):
+    """
+    Running totals of one organizer's events and sales, for the seller
+    profile and dashboard headers, read by primary key.
+
+    Ticket.record_sales moves the sales totals with every sale, and
+    events.signals recounts the row when an event is saved or deleted.
+    Rows are created the first time they are read (for_organizer), from
+    the events' sales counters; until then there is nothing to keep
+    current.
+    """
+    organizer = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='summary')
+    events = models.PositiveIntegerField(default=0)
+    active_events = models.PositiveIntegerField(default=0)
+    tickets_sold = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    last_sale_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'organizer summaries'
+
+    def __str__(self):
+        return f"Summary for {self.organizer_id}"
+
+    @staticmethod
+    def _totals(organizer_id):
+        totals = Event.objects.filter(organizer_id=organizer_id).aggregate(
+            events=models.Count('id'),
+            active_events=models.Count('id', filter=models.Q(is_active=True)),
+            tickets_sold=models.Sum('sold_count'),
+            revenue=models.Sum('revenue'),
+        )
+        totals['tickets_sold'] = totals['tickets_sold'] or 0
+        totals['revenue'] = totals['revenue'] or 0
+        return totals
+
+    @classmethod
+    def for_organizer(cls, organizer):
+        try:
+            return cls.objects.get(pk=organizer.pk)
+        except cls.DoesNotExist:
+            last_sale = Ticket.objects.filter(
+                event__organizer=organizer, status__in=Ticket.SOLD_STATUSES
+            ).aggregate(at=models.Max('purchased_at'))['at']
+            summary, _ = cls.objects.get_or_create(
+                organizer=organizer,
+                defaults=dict(cls._totals(organizer.pk), last_sale_at=last_sale)
+            )
+            return summary
+
+    @classmethod
+    def refresh(cls, organizer_id):
+        """Recount an existing row from the organizer's events"""
+        cls.objects.filter(pk=organizer_id).update(updated_at=timezone.now(), **cls._totals(organizer_id))
+
+    @classmethod
+    def touch(cls, event_id):
+        """Mark the event's organizer as changed, for caches keyed on updated_at"""
+        cls.objects.filter(organizer__events=event_id).update(updated_at=timezone.now())
+
+    @classmethod
+    def record_sales(cls, event_id, quantity, amount):
+        changes = {
+            'tickets_sold': models.F('tickets_sold') + quantity,
+            'revenue': models.F('revenue') + amount,
+            'updated_at': timezone.now(),
+        }
+        if quantity > 0:
+            changes['last_sale_at'] = timezone.now()
+        cls.objects.filter(organizer__events=event_id).update(**changes)
+
+
+class SalesForecast(models.Model):
+    """
+    Sales velocity and projected sell-out of one ticket category, written
+    in batches by the forecast_sales command (events.forecasting) and
+    only read by the seller dashboard.
+    """
+    ticket_category = models.OneToOneField(
+        TicketCategory, on_delete=models.CASCADE, primary_key=True, related_name='forecast'
+    )
+    moving_average = models.FloatField(default=0, help_text="Tickets sold per day over the last week")
+    smoothed_rate = models.FloatField(default=0, help_text="Exponentially smoothed tickets sold per day")
+    remaining = models.IntegerField(default=0)
+    sellout_on = models.DateField(null=True, blank=True, help_text="Empty when it is not expected to sell out before sales end")
+    computed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Forecast for {self.ticket_category_id}"
+
+
+class TicketCodeBlock(models.Model):
+    """
+    A reserved range of ticket code sequence numbers. The auto-increment
+    id is the block number, so handing out a block is a plain INSERT; see
+    events.ticket_codes.
+    """
+    allocated_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Ticket code block {self.pk}"
+
+class FulfillmentJob(models.Model):
+    """
+    Post-purchase work run by the fulfillment worker: a ticket's email or
+    SMS, or issuing the tickets of a recorded Stripe webhook event.
+    """
+    KIND_CHOICES = [
+        ('email', 'Email'),
+        ('sms', 'SMS'),
+        ('stripe', 'Stripe event'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    ticket = models.ForeignKey(
+        Ticket, on_delete=models.CASCADE, null=True, blank=True, related_name='fulfillment_jobs'
+    )
+    stripe_event = models.ForeignKey(
+        'payments.StripeEvent', on_delete=models.CASCADE, null=True, blank=True, related_name='jobs'
+    )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    claimed_by = models.CharField(max_length=100, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['run_after']
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+        ]
+
+    def __str__(self):
+        if self.stripe_event_id:
+            return f"{self.get_kind_display()} {self.stripe_event_id} ({self.status})"
+        return f"{self.get_kind_display()} for ticket {self.ticket_id} ({self.status})"
+
 class Subscription(models.Model):
     SUBSCRIPTION_PLANS = [
         ('basic', 'Basic'),
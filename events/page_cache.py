@@ -0,0 +1,160 @@
+"""
+Response cache for the public event pages (home, event list, event detail).
+
+Only anonymous GETs are cached. Each cache key carries a version number:
+
+  * the listing version, for pages that list events;
+  * the event's own version, for an event detail page.
+
+Saving or deleting an Event, TicketCategory or Ticket bumps the versions
+it affects (see events.signals), and so do the stock updates in
+events.inventory, which bypass the signals. Old entries are never
+deleted; they are no longer looked up and expire on their own.
+
+Each bump also records when it happened, so the versions double as
+ETags and Last-Modified times for the JSON API (events.views_api). A
+version the cache has lost starts again from the clock, never from a
+number a client may still hold.
+
+Stock changes bump only the event's version, so that a busy on-sale
+does not empty the listing cache on every purchase. Availability on a
+listing can therefore lag by up to PAGE_CACHE_TIMEOUT seconds, and no
+entry is ever served for longer than that.
+
+The cache must be shared by every worker (see CACHES).
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils import timezone
+
+LISTING_VERSION_KEY = 'page_cache:version:listing'
+HITS_KEY = 'page_cache:hits'
+MISSES_KEY = 'page_cache:misses'
+
+
+def event_version_key(event_id):
+    return f'page_cache:version:event:{event_id}'
+
+
+def _modified_key(version_key):
+    return f'{version_key}:modified'
+
+
+def _fresh_version():
+    # Milliseconds since the epoch: larger than any count an evicted version reached
+    return int(time.time() * 1000)
+
+
+def _incr(key, start=1):
+    # Versions and counters are kept until evicted
+    if not cache.add(key, start, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Evicted between add() and incr()
+            cache.set(key, start, None)
+
+
+def bump_events(event_ids, listing=False):
+    """
+    Invalidate the cached pages of these events, and the listings as
+    well if `listing` is set. Takes effect when the current transaction
+    commits, so a page can never be cached from data about to change.
+    """
+    keys = [event_version_key(event_id) for event_id in event_ids]
+    if listing:
+        keys.append(LISTING_VERSION_KEY)
+
+    def bump():
+        for key in keys:
+            _incr(key, start=_fresh_version())
+        cache.set_many({_modified_key(key): timezone.now() for key in keys}, None)
+    transaction.on_commit(bump)
+
+
+def bump_event(event_id, listing=False):
+    bump_events([event_id], listing)
+
+
+def version_state(version_key):
+    """
+    (version, last modified) of LISTING_VERSION_KEY or an event's version
+    key, from one cache lookup. If the cache has lost them they start
+    afresh, modified now.
+    """
+    keys = [version_key, _modified_key(version_key)]
+    state = cache.get_many(keys)
+    if len(state) < 2:
+        cache.add(version_key, _fresh_version(), None)
+        cache.add(_modified_key(version_key), timezone.now(), None)
+        state = cache.get_many(keys)
+    return state.get(version_key, 0), state.get(_modified_key(version_key))
+
+
+def stats():
+    """Hit and miss counts, kept in the cache alongside the pages"""
+    counts = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits, misses = counts.get(HITS_KEY, 0), counts.get(MISSES_KEY, 0)
+    lookups = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / lookups, 4) if lookups else None,
+        'timeout': settings.PAGE_CACHE_TIMEOUT,
+    }
+
+
+def _is_cacheable(request):
+    if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+        return False
+    # Flash messages are rendered into the page and belong to one visitor
+    return not len(get_messages(request))
+
+
+def cache_public_page(scope):
+    """
+    Cache a view's response for anonymous visitors.
+
+    `scope` is 'listing' for pages that list events, or 'event' for views
+    taking the event `pk`.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if not settings.PAGE_CACHE_TIMEOUT or not _is_cacheable(request):
+                return view(request, *args, **kwargs)
+
+            if scope == 'event':
+                version_key = event_version_key(kwargs['pk'] if 'pk' in kwargs else args[0])
+            else:
+                version_key = LISTING_VERSION_KEY
+            version = cache.get(version_key, 0)
+            path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+            key = f'page_cache:page:{version_key}:{version}:{path}'
+
+            cached = cache.get(key)
+            if cached is not None:
+                _incr(HITS_KEY)
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+                response['X-Page-Cache'] = 'hit'
+                return response
+
+            _incr(MISSES_KEY)
+            response = view(request, *args, **kwargs)
+            # Skip anything per-visitor: cookies set by the view or a CSRF token in the page
+            if (response.status_code == 200 and not response.cookies
+                    and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+                    and not getattr(response, 'streaming', False)):
+                cache.set(key, (response.content, response['Content-Type']), settings.PAGE_CACHE_TIMEOUT)
+            response['X-Page-Cache'] = 'miss'
+            return response
+        return wrapped
+    return decorator
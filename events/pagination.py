@@ -0,0 +1,70 @@
+"""
+Keyset (cursor) pagination for event listings.
+
+Pages are ordered on (date, id) and each page starts strictly after the
+last event of the previous one, so the database seeks straight to the
+start of the page through the (date, id) index. A deep page costs the
+same as the first because nothing is skipped with OFFSET.
+
+Radius searches page on (distance, id) the same way, and search results
+on (search rank, id); see events.geo and events.search.
+"""
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+EVENTS_PER_PAGE = 12
+
+# How to write and read each supported key in a cursor
+KEY_CODECS = {
+    'date': (lambda value: value.isoformat(), datetime.fromisoformat),
+    'search_rank': (repr, float),
+    'distance_sq': (repr, float),
+}
+
+
+def make_cursor(value, pk, key='date'):
+    """Opaque cursor pointing just after the row with this key value and id"""
+    encode, _ = KEY_CODECS[key]
+    raw = f"{encode(value)}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def encode_cursor(event, key='date'):
+    """Opaque cursor pointing just after `event`"""
+    return make_cursor(getattr(event, key), event.pk, key)
+
+
+def decode_cursor(cursor, key='date'):
+    """Return (key value, id) for a cursor, or None if it is missing or malformed"""
+    if not cursor:
+        return None
+    _, decode = KEY_CODECS[key]
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        value, pk = raw.rsplit('|', 1)
+        return decode(value), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def paginate_events(queryset, cursor=None, per_page=EVENTS_PER_PAGE, key='date'):
+    """
+    Return (events, next_cursor) for the page after `cursor`, ordered on
+    (key, id). `key` is 'date' or an annotation named in KEY_CODECS.
+
+    next_cursor is None on the last page. One extra row is fetched to find
+    out whether another page exists, instead of running a COUNT.
+    """
+    queryset = queryset.order_by(key, 'id')
+    position = decode_cursor(cursor, key)
+    if position:
+        value, pk = position
+        queryset = queryset.filter(Q(**{f'{key}__gt': value}) | Q(**{key: value, 'id__gt': pk}))
+
+    events = list(queryset[:per_page + 1])
+    if len(events) > per_page:
+        events = events[:per_page]
+        return events, encode_cursor(events[-1], key)
+    return events, None
@@ -0,0 +1,149 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from .models import DailySales, Event, OrganizerSummary, PendingSale, Ticket, TicketCategory, sale_day
+
+
+def rebuild_sales_counters(event_ids=None):
+    """
+    Recompute sold_count and revenue on ticket categories and events from
+    Ticket rows, then recount their organizers' OrganizerSummary rows.
+    Fixes drift left by bulk updates or deletes that bypass Ticket.save.
+    Returns the number of events rebuilt.
+    """
+    # Pending sales are already in the Ticket rows; fold them first so
+    # they are not counted again later
+    PendingSale.flush()
+    events = Event.objects.all()
+    categories = TicketCategory.objects.all()
+    tickets = Ticket.objects.filter(status__in=Ticket.SOLD_STATUSES)
+    if event_ids:
+        events = events.filter(pk__in=event_ids)
+        categories = categories.filter(event_id__in=event_ids)
+        tickets = tickets.filter(event_id__in=event_ids)
+
+    with transaction.atomic():
+        categories.update(sold_count=0, revenue=0)
+        rebuilt = events.update(sold_count=0, revenue=0)
+
+        per_category = tickets.exclude(ticket_category=None).values('ticket_category').annotate(
+            quantity=Sum('quantity'),
+            amount=Sum('total_amount')
+        )
+        for row in per_category:
+            TicketCategory.objects.filter(pk=row['ticket_category']).update(
+                sold_count=row['quantity'],
+                revenue=row['amount']
+            )
+
+        per_event = tickets.values('event').annotate(
+            quantity=Sum('quantity'),
+            amount=Sum('total_amount')
+        )
+        for row in per_event:
+            Event.objects.filter(pk=row['event']).update(
+                sold_count=row['quantity'],
+                revenue=row['amount']
+            )
+
+        for organizer_id in events.order_by().values_list('organizer_id', flat=True).distinct():
+            OrganizerSummary.refresh(organizer_id)
+
+    return rebuilt
+
+
+def rebuild_daily_sales(start=None, end=None, event_ids=None):
+    """
+    Recompute the DailySales rows for days `start` to `end` inclusive
+    (dates, either may be left open) from Ticket rows. Returns the number
+    of rows written.
+
+    Sales committed while it runs may be missed or counted twice on the
+    days being rebuilt; rebuild past days, or run it again.
+    """
+    PendingSale.flush()
+    rows = DailySales.objects.all()
+    tickets = Ticket.objects.filter(status__in=Ticket.SOLD_STATUSES)
+    if start:
+        rows = rows.filter(day__gte=start)
+        tickets = tickets.filter(purchased_at__date__gte=start)
+    if end:
+        rows = rows.filter(day__lte=end)
+        tickets = tickets.filter(purchased_at__date__lte=end)
+    if event_ids:
+        rows = rows.filter(event_id__in=event_ids)
+        tickets = tickets.filter(event_id__in=event_ids)
+
+    totals = tickets.values('event_id', 'ticket_category_id', 'purchased_at__date').annotate(
+        count=Count('id'),
+        quantity=Sum('quantity'),
+        amount=Sum('total_amount')
+    ).order_by()
+    with transaction.atomic():
+        rows.delete()
+        created = DailySales.objects.bulk_create(
+            [
+                DailySales(
+                    event_id=row['event_id'],
+                    ticket_category_id=row['ticket_category_id'],
+                    day=row['purchased_at__date'],
+                    tickets=row['count'],
+                    quantity=row['quantity'],
+                    revenue=row['amount'],
+                )
+                for row in totals.iterator()
+            ],
+            batch_size=1000
+        )
+    return len(created)
+
+
+def organizer_revenue(organizer):
+    """
+    Sold tickets and confirmed revenue of an organizer's events, per
+    event and per ticket category, from one grouped query over the
+    DailySales rollup:
+
+        {event id: {'tickets_sold': n, 'revenue': Decimal,
+                    'categories': {ticket category id: {'tickets_sold': n, 'revenue': Decimal}}}}
+
+    Only Ticket.SOLD_STATUSES count; pending and cancelled tickets do
+    not. Events and categories without sales are left out. Tickets
+    without a category count towards their event only.
+    """
+    rows = DailySales.objects.filter(event__organizer=organizer).values('event_id', 'ticket_category_id').annotate(
+        quantity=Sum('quantity'),
+        amount=Sum('revenue')
+    ).order_by()
+
+    revenue = {}
+    for row in rows:
+        event = revenue.setdefault(row['event_id'], {'tickets_sold': 0, 'revenue': 0, 'categories': {}})
+        event['tickets_sold'] += row['quantity']
+        event['revenue'] += row['amount']
+        if row['ticket_category_id']:
+            event['categories'][row['ticket_category_id']] = {
+                'tickets_sold': row['quantity'],
+                'revenue': row['amount'],
+            }
+    return revenue
+
+
+def sales_by_day(days, organizer=None):
+    """
+    [{'day': date, 'tickets': n, 'quantity': n, 'revenue': Decimal}] for
+    the last `days` days that had sales, oldest first, from the DailySales
+    rollup. `organizer` narrows it to their events.
+    """
+    rows = DailySales.objects.filter(day__gt=sale_day() - timedelta(days=days))
+    if organizer is not None:
+        rows = rows.filter(event__organizer=organizer)
+    return list(
+        rows.values('day').annotate(
+            tickets=Sum('tickets'),
+            quantity=Sum('quantity'),
+            revenue=Sum('revenue')
+        ).order_by('day')
+    )
@@ -0,0 +1,197 @@
+"""
+Full-text search for events.
+
+Title, location and description are indexed in a side table maintained
+by the Event post_save/post_delete signals (see events.signals):
+
+  * SQLite: an FTS5 virtual table, ranked with bm25().
+  * PostgreSQL: a tsvector side table with a GIN index, ranked with
+    ts_rank_cd().
+
+Title outweighs location, which outweighs description.
+
+Every search term is matched as a prefix, so "jaz nai" finds "Jazz Night
+in Nairobi". Other databases fall back to the old icontains filter. Bulk
+writes (update(), bulk_create) skip the signals; run the
+rebuild_search_index command after them.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Event
+from .pagination import EVENTS_PER_PAGE, decode_cursor, make_cursor
+
+FTS_TABLE = 'events_event_fts'
+TSVECTOR_TABLE = 'events_event_search'
+
+# Search terms beyond this many are ignored
+MAX_TERMS = 8
+
+# Relative weight of title, description and location in SQLite's bm25();
+# stored as the FTS5 table's rank function
+BM25_WEIGHTS = (10.0, 1.0, 5.0)
+
+POSTGRES_DOCUMENT = (
+    "setweight(to_tsvector('simple', coalesce(%(title)s, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(%(location)s, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(%(description)s, '')), 'C')"
+)
+
+
+def search_terms(query):
+    return re.findall(r'\w+', (query or '').lower())[:MAX_TERMS]
+
+
+def is_supported():
+    return connection.vendor in ('sqlite', 'postgresql')
+
+
+# Index maintenance
+
+def index_event(event):
+    """Add or refresh one event in the search index"""
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [event.pk])
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, description, location) VALUES (%s, %s, %s, %s)",
+                [event.pk, event.title, event.description, event.location]
+            )
+        else:
+            document = POSTGRES_DOCUMENT % {'title': '%s', 'location': '%s', 'description': '%s'}
+            cursor.execute(
+                f"INSERT INTO {TSVECTOR_TABLE} (event_id, document) VALUES (%s, {document}) "
+                "ON CONFLICT (event_id) DO UPDATE SET document = EXCLUDED.document",
+                [event.pk, event.title, event.location, event.description]
+            )
+
+
+def remove_event(event_id):
+    """Drop one event from the search index"""
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [event_id])
+        else:
+            cursor.execute(f"DELETE FROM {TSVECTOR_TABLE} WHERE event_id = %s", [event_id])
+
+
+def rebuild_index():
+    """Re-index every event from scratch. Returns the number of events indexed."""
+    if not is_supported():
+        return 0
+    events = Event._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, description, location) "
+                f"SELECT id, title, description, location FROM {events}"
+            )
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rank) VALUES ('rank', %s)",
+                [f"bm25({', '.join(str(weight) for weight in BM25_WEIGHTS)})"]
+            )
+            cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+        else:
+            document = POSTGRES_DOCUMENT % {'title': 'title', 'location': 'location', 'description': 'description'}
+            cursor.execute(f"TRUNCATE {TSVECTOR_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {TSVECTOR_TABLE} (event_id, document) SELECT id, {document} FROM {events}"
+            )
+        cursor.execute(f"SELECT COUNT(*) FROM {events}")
+        return cursor.fetchone()[0]
+
+
+# Querying
+
+def search_event_ids(queryset, query, cursor=None, per_page=EVENTS_PER_PAGE):
+    """
+    Rank the events in `queryset` that match `query`.
+
+    Returns ([(event_id, rank), ...], next_cursor) for one page, best match
+    first, with a lower rank being better on every backend. The search
+    table drives a single query, so only matching rows are ranked and
+    sorted, and pages are keyed on (rank, id) like the listing cursor in
+    events.pagination.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return [], None
+
+    if connection.vendor == 'sqlite':
+        # `rank` is bm25() with BM25_WEIGHTS, configured on the table
+        rank, event_id = 'rank', f'{FTS_TABLE}.rowid'
+        sql = f"SELECT {event_id}, rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"
+        params = [' '.join(f'"{term}"*' for term in terms)]
+    else:
+        # Negated so that, as with bm25(), lower is better
+        rank, event_id = '-ts_rank_cd(document, query)', f'{TSVECTOR_TABLE}.event_id'
+        sql = (
+            f"SELECT {event_id}, {rank} FROM {TSVECTOR_TABLE}, to_tsquery('simple', %s) query "
+            "WHERE document @@ query"
+        )
+        params = [' & '.join(f'{term}:*' for term in terms)]
+
+    # Check each match against the queryset by primary key, rather than
+    # evaluating the whole queryset for every search
+    events_sql, events_params = (
+        queryset.order_by().filter(pk=RawSQL(event_id, [])).values('pk').query.sql_with_params()
+    )
+    sql += f" AND EXISTS ({events_sql})"
+    params.extend(events_params)
+
+    position = decode_cursor(cursor, 'search_rank')
+    if position:
+        sql += f" AND ({rank} > %s OR ({rank} = %s AND {event_id} > %s))"
+        params.extend([position[0], position[0], position[1]])
+
+    sql += f" ORDER BY {rank}, {event_id} LIMIT %s"
+    params.append(per_page + 1)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        ranked = [(row[0], float(row[1])) for row in cursor.fetchall()]
+
+    if len(ranked) > per_page:
+        ranked = ranked[:per_page]
+        return ranked, make_cursor(ranked[-1][1], ranked[-1][0], 'search_rank')
+    return ranked, None
+
+
+def filter_matching(queryset, query):
+    """
+    Narrow `queryset` to every event matching `query`, unranked, e.g. to
+    count them. Falls back to icontains where there is no index.
+    """
+    if not is_supported():
+        return search_events_icontains(queryset, query)
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none()
+    if connection.vendor == 'sqlite':
+        matches = RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+            [' '.join(f'"{term}"*' for term in terms)]
+        )
+    else:
+        matches = RawSQL(
+            f"SELECT event_id FROM {TSVECTOR_TABLE} WHERE document @@ to_tsquery('simple', %s)",
+            [' & '.join(f'{term}:*' for term in terms)]
+        )
+    return queryset.filter(pk__in=matches)
+
+
+def search_events_icontains(queryset, query):
+    """The unindexed substring search event_list used before; kept as a fallback and a benchmark baseline"""
+    return queryset.filter(
+        Q(title__icontains=query) |
+        Q(description__icontains=query) |
+        Q(location__icontains=query)
+    )
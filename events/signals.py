@@ -0,0 +1,59 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import search, typeahead
+from .models import Category, Event, OrganizerSummary, Ticket, TicketCategory
+from .page_cache import bump_event, bump_events
+
+
+@receiver(post_save, sender=Event)
+def index_event(sender, instance, **kwargs):
+    search.index_event(instance)
+
+
+@receiver(post_delete, sender=Event)
+def unindex_event(sender, instance, **kwargs):
+    search.remove_event(instance.pk)
+
+
+@receiver(post_save, sender=Event)
+def publish_typeahead_record(sender, instance, **kwargs):
+    typeahead.publish(instance.pk, typeahead.record_for(instance))
+
+
+@receiver(post_delete, sender=Event)
+def publish_typeahead_removal(sender, instance, **kwargs):
+    typeahead.publish(instance.pk, None)
+
+
+@receiver([post_save, post_delete], sender=Event)
+def invalidate_event_pages(sender, instance, **kwargs):
+    bump_event(instance.pk, listing=True)
+
+
+@receiver([post_save, post_delete], sender=Event)
+def refresh_organizer_summary(sender, instance, **kwargs):
+    # Deleting an event takes its sales off the totals as well
+    OrganizerSummary.refresh(instance.organizer_id)
+
+
+@receiver([post_save, post_delete], sender=TicketCategory)
+def invalidate_ticket_category_pages(sender, instance, **kwargs):
+    # Prices and availability show on the listing cards too
+    bump_event(instance.event_id, listing=True)
+
+
+@receiver([post_save, post_delete], sender=TicketCategory)
+def touch_organizer_summary(sender, instance, **kwargs):
+    # The seller dashboard panels are cached under the summary's updated_at
+    OrganizerSummary.touch(instance.event_id)
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category_pages(sender, instance, **kwargs):
+    bump_events([], listing=True)
+
+
+@receiver([post_save, post_delete], sender=Ticket)
+def invalidate_ticket_pages(sender, instance, **kwargs):
+    bump_event(instance.event_id)
@@ -1,3 +1,1339 @@
-from django.test import TestCase
+import json
+import re
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+
+from django.db import connection, transaction
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import (
+    availability, dashboard_panels, facets, forecasting, fulfillment, geo, page_cache, sales, search, ticket_codes,
+    typeahead, views_api, waiting_room
+)
+from .forms import EventForm
+from .inventory import InsufficientTickets, InventoryService
+from .models import (
+    Category, DailySales, Event, FulfillmentJob, OrganizerSummary, PendingSale, SalesForecast, Ticket,
+    TicketCategory, TicketCodeBlock, TicketHold, User, Venue, sale_day
+)
+from .ticketing import issue_tickets
+from .pagination import paginate_events
+
+
+def create_organizer(username='organizer', **fields):
+    return User.objects.create_user(username=username, password='password', is_seller=True, **fields)
+
+
+def create_event(organizer, title='Test Event', days=7, **fields):
+    """An event `days` days from now, in Nairobi unless `location` is given"""
+    fields.setdefault('description', f'{title} for tests')
+    fields.setdefault('location', 'Nairobi')
+    return Event.objects.create(
+        organizer=organizer, title=title, date=timezone.now() + timedelta(days=days), **fields
+    )
+
+
+def create_ticket_category(event, category_type='regular', price=500, available_tickets=100, **fields):
+    """A ticket category on sale since yesterday and for the next 30 days"""
+    now = timezone.now()
+    fields.setdefault('name', category_type.title())
+    fields.setdefault('max_tickets_per_purchase', 5)
+    fields.setdefault('sales_start', now - timedelta(days=1))
+    fields.setdefault('sales_end', now + timedelta(days=30))
+    return TicketCategory.objects.create(
+        event=event, category_type=category_type, price=price, available_tickets=available_tickets, **fields
+    )
+
+
+class EventTestData:
+    """
+    Test data for one organizer's event in the Music category with one
+    ticket category on sale: cls.organizer, cls.category, cls.event and
+    cls.ticket_category. `event_fields` and `ticket_category_fields`
+    override the defaults of create_event and create_ticket_category.
+    """
+    event_fields = {}
+    ticket_category_fields = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.organizer = create_organizer()
+        cls.category = Category.objects.create(name='Music', slug='music')
+        cls.event = create_event(cls.organizer, category=cls.category, **cls.event_fields)
+        cls.ticket_category = create_ticket_category(cls.event, **cls.ticket_category_fields)
+
+
+class InventoryTests(EventTestData, TestCase):
+    event_fields = {'total_tickets': 10, 'available_tickets': 10}
+    ticket_category_fields = {'available_tickets': 10, 'max_tickets_per_purchase': 10}
+
+    def setUp(self):
+        self.inventory = InventoryService()
+
+    def stock(self):
+        self.ticket_category.refresh_from_db()
+        self.event.refresh_from_db()
+        return self.ticket_category.available_tickets, self.event.available_tickets
+
+    def test_decrement_takes_from_the_category_and_its_event(self):
+        self.inventory.decrement(self.ticket_category, 4)
+        self.assertEqual(self.stock(), (6, 6))
+        self.inventory.increment(self.ticket_category, 1)
+        self.assertEqual(self.stock(), (7, 7))
+
+    def test_insufficient_tickets_leaves_both_counters_untouched(self):
+        self.inventory.decrement(self.ticket_category, 8)
+        with self.assertRaises(InsufficientTickets):
+            self.inventory.decrement(self.ticket_category, 3)
+        self.assertEqual(self.stock(), (2, 2))
+
+    def test_decrement_is_a_conditional_update(self):
+        # A stale in-memory count must not matter; the database decides
+        TicketCategory.objects.filter(pk=self.ticket_category.pk).update(available_tickets=1)
+        with self.assertRaises(InsufficientTickets):
+            self.inventory.decrement(self.ticket_category, 2)
+        self.inventory.decrement(self.ticket_category, 1)
+        self.assertEqual(self.stock(), (0, 9))
+
+    def test_drifted_event_counter_does_not_fail_a_purchase(self):
+        Event.objects.filter(pk=self.event.pk).update(available_tickets=0)
+        self.inventory.decrement(self.ticket_category, 2)
+        self.assertEqual(self.stock(), (8, 0))
+
+
+class TicketHoldTests(EventTestData, TestCase):
+    event_fields = {'total_tickets': 10, 'available_tickets': 10}
+    ticket_category_fields = {'available_tickets': 10, 'max_tickets_per_purchase': 10}
+
+    def setUp(self):
+        self.inventory = InventoryService()
+
+    def available(self):
+        self.ticket_category.refresh_from_db()
+        return self.ticket_category.available_tickets
+
+    def test_placing_a_hold_takes_the_tickets(self):
+        hold = self.inventory.place_hold(self.ticket_category, 3, ttl=60)
+        self.assertEqual((hold.status, self.available()), ('active', 7))
+        with self.assertRaises(InsufficientTickets):
+            self.inventory.place_hold(self.ticket_category, 8)
+        self.assertEqual((TicketHold.objects.count(), self.available()), (1, 7))
+
+    def test_converting_keeps_the_tickets_taken(self):
+        hold = self.inventory.place_hold(self.ticket_category, 3)
+        self.inventory.convert_hold(hold)
+        self.inventory.convert_hold(hold)
+        hold.refresh_from_db()
+        self.assertEqual((hold.status, self.available()), ('converted', 7))
+        self.assertFalse(self.inventory.release_hold(hold))
+        self.assertEqual(self.available(), 7)
+
+    def test_converting_a_released_hold_takes_fresh_stock(self):
+        hold = self.inventory.place_hold(self.ticket_category, 3)
+        self.assertTrue(self.inventory.release_hold(hold))
+        self.assertEqual(self.available(), 10)
+        self.inventory.convert_hold(hold)
+        hold.refresh_from_db()
+        self.assertEqual((hold.status, self.available()), ('converted', 7))
+
+    def test_converting_a_released_hold_fails_when_sold_out(self):
+        hold = self.inventory.place_hold(self.ticket_category, 3)
+        self.inventory.release_hold(hold)
+        self.inventory.decrement(self.ticket_category, 9)
+        with self.assertRaises(InsufficientTickets):
+            with transaction.atomic():
+                self.inventory.convert_hold(hold)
+        hold.refresh_from_db()
+        self.assertEqual((hold.status, self.available()), ('released', 1))
+
+    def test_expired_holds_are_released(self):
+        expired = self.inventory.place_hold(self.ticket_category, 2, ttl=0)
+        current = self.inventory.place_hold(self.ticket_category, 3, ttl=60)
+        call_command('release_expired_holds', stdout=StringIO())
+        expired.refresh_from_db()
+        current.refresh_from_db()
+        self.assertEqual((expired.status, current.status), ('released', 'active'))
+        self.assertEqual(self.available(), 7)
+        self.assertEqual(self.inventory.release_expired_holds(), 0)
+
+
+class SalesCounterTests(EventTestData, TestCase):
+    ticket_category_fields = {'max_tickets_per_purchase': 10}
+
+    def buy(self, quantity, status='pending'):
+        return Ticket.objects.create(
+            event=self.event, ticket_category=self.ticket_category, buyer_name='Buyer',
+            buyer_email='buyer@example.com', quantity=quantity, status=status,
+        )
+
+    def counters(self):
+        self.event.refresh_from_db()
+        self.ticket_category.refresh_from_db()
+        return (
+            (self.event.sold_count, self.event.revenue),
+            (self.ticket_category.sold_count, self.ticket_category.revenue),
+        )
+
+    def assertCounters(self, sold, revenue):
+        self.assertEqual(self.counters(), ((sold, revenue), (sold, revenue)))
+
+    def test_only_confirmed_and_used_tickets_count(self):
+        ticket = self.buy(2)
+        self.assertCounters(0, 0)
+        ticket.confirm()
+        self.assertCounters(2, 1000)
+        ticket.mark_as_used()
+        self.assertCounters(2, 1000)
+        ticket.cancel()
+        self.assertCounters(0, 0)
+
+    def test_changes_to_a_sold_ticket_move_the_counters(self):
+        ticket = self.buy(2, 'confirmed')
+        ticket.quantity = 3
+        ticket.save()
+        self.assertCounters(3, 1500)
+        Ticket.objects.get(pk=ticket.pk).delete()
+        self.assertCounters(0, 0)
+
+    def test_rebuild_fixes_drift(self):
+        self.buy(2, 'confirmed')
+        self.buy(1, 'used')
+        self.buy(4, 'cancelled')
+        Event.objects.filter(pk=self.event.pk).update(sold_count=50, revenue=1)
+        TicketCategory.objects.filter(pk=self.ticket_category.pk).update(sold_count=0, revenue=0)
+        OrganizerSummary.for_organizer(self.organizer)
+        OrganizerSummary.objects.filter(pk=self.organizer.pk).update(tickets_sold=7, revenue=9)
+        call_command('rebuild_sales_counters', event=[self.event.pk], stdout=StringIO())
+        self.assertCounters(3, 1500)
+        summary = OrganizerSummary.objects.get(pk=self.organizer.pk)
+        self.assertEqual((summary.tickets_sold, summary.revenue), (3, 1500))
+
+
+class ShardedInventoryTests(EventTestData, TestCase):
+    event_fields = {'total_tickets': 10, 'available_tickets': 10}
+    ticket_category_fields = {'available_tickets': 10, 'max_tickets_per_purchase': 10}
+
+    def setUp(self):
+        self.inventory = InventoryService()
+        self.inventory.set_shard_count(self.ticket_category, 4)
+
+    def shard_stock(self):
+        return list(self.ticket_category.shards.values_list('available_tickets', flat=True))
+
+    def test_set_shard_count_redistributes_stock(self):
+        self.assertEqual(self.shard_stock(), [3, 3, 2, 2])
+        self.inventory.decrement(self.ticket_category, 1)
+        self.inventory.set_shard_count(self.ticket_category, 3)
+        self.assertEqual(self.shard_stock(), [3, 3, 3])
+        self.inventory.set_shard_count(self.ticket_category, 0)
+        self.assertEqual(self.shard_stock(), [])
+        self.ticket_category.refresh_from_db()
+        self.assertEqual(self.ticket_category.available_tickets, 9)
+
+    def test_decrement_only_writes_a_shard(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.inventory.decrement(self.ticket_category, 2)
+        writes = [query['sql'] for query in queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(writes), 1)
+        self.assertIn('events_ticketcategoryshard', writes[0])
+        self.assertEqual(sum(self.shard_stock()), 8)
+
+        self.inventory.release_expired_holds()
+        self.ticket_category.refresh_from_db()
+        self.event.refresh_from_db()
+        self.assertEqual((self.ticket_category.available_tickets, self.event.available_tickets), (8, 8))
+
+    def test_returned_tickets_go_to_a_shard_and_expire_the_event_page(self):
+        version_key = page_cache.event_version_key(self.event.pk)
+        version = page_cache.version_state(version_key)[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.inventory.increment(self.ticket_category, 2)
+        self.assertEqual(sum(self.shard_stock()), 12)
+        self.assertNotEqual(page_cache.version_state(version_key)[0], version)
+
+    def test_stock_edits_survive_the_sweeper(self):
+        category = self.ticket_category
+        data = {
+            'title': self.event.title, 'description': self.event.description, 'category': self.event.category_id,
+            'date': self.event.date.strftime('%Y-%m-%dT%H:%M'), 'location': self.event.location,
+            'total_tickets': 10, 'waiting_room_rate': 60,
+            'ticket_categories-TOTAL_FORMS': 1, 'ticket_categories-INITIAL_FORMS': 1,
+            'ticket_categories-0-id': category.pk, 'ticket_categories-0-event': self.event.pk,
+            'ticket_categories-0-name': category.name, 'ticket_categories-0-category_type': category.category_type,
+            'ticket_categories-0-price': category.price, 'ticket_categories-0-available_tickets': 25,
+            'ticket_categories-0-max_tickets_per_purchase': category.max_tickets_per_purchase,
+            'ticket_categories-0-sales_start': category.sales_start.strftime('%Y-%m-%dT%H:%M'),
+            'ticket_categories-0-sales_end': category.sales_end.strftime('%Y-%m-%dT%H:%M'),
+        }
+        self.client.force_login(self.organizer)
+        response = self.client.post(reverse('edit_event', args=[self.event.pk]), data)
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        self.assertEqual(self.shard_stock(), [7, 6, 6, 6])
+
+        self.inventory.release_expired_holds()
+        category.refresh_from_db()
+        self.assertEqual(category.available_tickets, 25)
+
+    def test_purchase_larger_than_any_shard_gathers_across_shards(self):
+        self.inventory.decrement(self.ticket_category, 5)
+        self.assertEqual(sum(self.shard_stock()), 5)
+        with self.assertRaises(InsufficientTickets):
+            self.inventory.decrement(self.ticket_category, 6)
+        self.assertEqual(sum(self.shard_stock()), 5)
+
+    def test_sales_reach_the_counters_through_the_sweeper(self):
+        OrganizerSummary.for_organizer(self.organizer)
+        with CaptureQueriesContext(connection) as queries:
+            issue_tickets(self.event, self.ticket_category, 2, 'Buyer', 'buyer@example.com')
+        hot_rows = ('events_ticketcategory"', 'events_event"', 'events_dailysales', 'events_organizersummary')
+        writes = [query['sql'] for query in queries if query['sql'].startswith('UPDATE')]
+        self.assertFalse([sql for sql in writes if any(table in sql for table in hot_rows)])
+        self.assertEqual(PendingSale.objects.count(), 1)
+
+        self.inventory.release_expired_holds()
+        self.ticket_category.refresh_from_db()
+        self.assertEqual((self.ticket_category.sold_count, self.ticket_category.revenue), (2, 1000))
+        self.assertEqual(DailySales.objects.get(ticket_category=self.ticket_category).quantity, 2)
+        self.assertEqual(OrganizerSummary.objects.get(pk=self.organizer.pk).tickets_sold, 2)
+        self.assertFalse(PendingSale.objects.exists())
+
+
+class FulfillmentWorkerTests(EventTestData, TestCase):
+    def setUp(self):
+        ticket = Ticket.objects.create(
+            event=self.event, ticket_category=self.ticket_category, buyer_name='Buyer',
+            buyer_email='buyer@example.com', quantity=1, status='confirmed',
+        )
+        self.job, = fulfillment.enqueue_fulfillment(ticket)
+
+    def test_a_job_is_claimed_by_one_worker(self):
+        self.assertEqual(fulfillment.claim_jobs('worker-1'), [self.job])
+        self.assertEqual(fulfillment.claim_jobs('worker-2'), [])
+        self.job.refresh_from_db()
+        self.assertEqual((self.job.status, self.job.claimed_by, self.job.attempts), ('running', 'worker-1', 1))
+
+    def test_an_expired_lease_hands_the_job_to_another_worker(self):
+        fulfillment.claim_jobs('worker-1')
+        FulfillmentJob.objects.filter(pk=self.job.pk).update(
+            claimed_at=timezone.now() - timedelta(seconds=fulfillment.JOB_LEASE_SECONDS + 1)
+        )
+        self.assertEqual(fulfillment.claim_jobs('worker-2'), [self.job])
+        self.job.refresh_from_db()
+        self.assertEqual((self.job.claimed_by, self.job.attempts), ('worker-2', 2))
+
+    def test_a_job_abandoned_on_its_last_attempt_fails(self):
+        fulfillment.claim_jobs('worker-1')
+        FulfillmentJob.objects.filter(pk=self.job.pk).update(
+            attempts=self.job.max_attempts,
+            claimed_at=timezone.now() - timedelta(seconds=fulfillment.JOB_LEASE_SECONDS + 1)
+        )
+        self.assertEqual(fulfillment.claim_jobs('worker-2'), [])
+        self.job.refresh_from_db()
+        self.assertEqual((self.job.status, self.job.attempts), ('failed', self.job.max_attempts))
+
+    def test_a_worker_that_lost_its_lease_writes_nothing(self):
+        job, = fulfillment.claim_jobs('worker-1')
+        FulfillmentJob.objects.filter(pk=job.pk).update(
+            claimed_at=timezone.now() - timedelta(seconds=fulfillment.JOB_LEASE_SECONDS + 1)
+        )
+        fulfillment.claim_jobs('worker-2')
+        fulfillment.run_job(job)
+        self.job.refresh_from_db()
+        self.assertEqual((self.job.status, self.job.claimed_by), ('running', 'worker-2'))
+
+    def test_the_worker_sends_the_email(self):
+        self.assertEqual(fulfillment.process_jobs('worker-1'), (1, 0))
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, 'done')
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_failures_are_retried_with_backoff_then_fail(self):
+        with mock.patch('events.fulfillment.send_ticket_email', side_effect=OSError('SMTP down')):
+            for attempt, delay in ((1, 30), (2, 60), (3, 120)):
+                before = timezone.now()
+                self.assertEqual(fulfillment.process_jobs('worker-1'), (0, 1))
+                self.job.refresh_from_db()
+                self.assertEqual((self.job.status, self.job.attempts), ('queued', attempt))
+                self.assertGreaterEqual(self.job.run_after, before + timedelta(seconds=delay))
+                self.assertEqual(fulfillment.process_jobs('worker-1'), (0, 0))
+                FulfillmentJob.objects.filter(pk=self.job.pk).update(run_after=timezone.now())
+
+            FulfillmentJob.objects.filter(pk=self.job.pk).update(attempts=self.job.max_attempts - 1)
+            fulfillment.process_jobs('worker-1')
+        self.job.refresh_from_db()
+        self.assertEqual((self.job.status, self.job.last_error), ('failed', 'SMTP down'))
+
+
+class GroupPurchaseTests(EventTestData, TestCase):
+    event_fields = {'total_tickets': 100, 'available_tickets': 100}
+    ticket_category_fields = {'max_tickets_per_purchase': 50}
+
+    def buy(self, quantity):
+        with CaptureQueriesContext(connection) as queries:
+            tickets = issue_tickets(
+                self.event, self.ticket_category, quantity, 'Buyer', 'buyer@example.com', per_attendee=True
+            )
+        return tickets, len(queries)
+
+    def test_query_count_does_not_grow_with_the_group(self):
+        # The first sale of the day also creates its rollup rows
+        self.buy(2)
+        small, small_queries = self.buy(2)
+        large, large_queries = self.buy(20)
+        self.assertEqual(large_queries, small_queries)
+        self.assertEqual((len(small), len(large)), (2, 20))
+        self.assertEqual(len({ticket.group_reference for ticket in large}), 1)
+        self.assertEqual(len({ticket.ticket_code for ticket in small + large}), 22)
+        self.ticket_category.refresh_from_db()
+        self.assertEqual(self.ticket_category.sold_count, 24)
+
+    def test_group_counts_towards_sales_and_stock(self):
+        self.buy(5)
+        self.ticket_category.refresh_from_db()
+        self.assertEqual((self.ticket_category.available_tickets, self.ticket_category.sold_count), (95, 5))
+        self.assertEqual(FulfillmentJob.objects.count(), 1)
+
+
+class TicketCodeTests(TestCase):
+    def setUp(self):
+        # Start each test without a cached block, as a fresh worker
+        ticket_codes._next = ticket_codes._end = 0
+
+    def test_rolled_back_block_is_not_reused(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                ticket_codes.allocate_sequence_numbers(5)
+                raise RuntimeError('payment failed')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first = ticket_codes.allocate_sequence_numbers(5)
+        # Another worker reserves the next block
+        other = ticket_codes._reserve_blocks(1)[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            second = ticket_codes.allocate_sequence_numbers(ticket_codes.BLOCK_SIZE)
+
+        blocks = set(TicketCodeBlock.objects.values_list('pk', flat=True))
+        self.assertTrue(all(number // ticket_codes.BLOCK_SIZE in blocks for number in first + second))
+        other_numbers = range(other * ticket_codes.BLOCK_SIZE, (other + 1) * ticket_codes.BLOCK_SIZE)
+        self.assertFalse(set(first + second) & set(other_numbers))
+        self.assertEqual(len(set(first + second)), len(first + second))
+
+    def test_codes_are_unique_and_self_checking(self):
+        codes = ticket_codes.allocate_ticket_codes(2 * ticket_codes.BLOCK_SIZE + 1)
+        self.assertEqual(len(set(codes)), len(codes))
+        self.assertTrue(all(ticket_codes.is_valid_ticket_code(code) for code in codes))
+
+        code = codes[0]
+        typo = ticket_codes.ALPHABET[(ticket_codes.ALPHABET.index(code[3]) + 1) % 32]
+        self.assertFalse(ticket_codes.is_valid_ticket_code(code[:3] + typo + code[4:]))
+        self.assertFalse(ticket_codes.is_valid_ticket_code(code[:-1]))
+
+
+class TicketCodeAutocommitTests(TransactionTestCase):
+    def setUp(self):
+        ticket_codes._next = ticket_codes._end = 0
+
+    def test_allocating_outside_a_transaction_keeps_the_block(self):
+        first = ticket_codes.allocate_sequence_numbers(1)
+        second = ticket_codes.allocate_sequence_numbers(1)
+        self.assertEqual(second, [first[0] + 1])
+        self.assertEqual(TicketCodeBlock.objects.count(), 1)
+
+    def test_ticket_created_outside_a_transaction_gets_a_code(self):
+        event = create_event(create_organizer())
+        ticket_category = create_ticket_category(event)
+        ticket = Ticket.objects.create(
+            event=event, ticket_category=ticket_category, buyer_name='Buyer', buyer_email='buyer@example.com',
+        )
+        self.assertTrue(ticket_codes.is_valid_ticket_code(ticket.ticket_code))
+
+
+class WaitingRoomTests(EventTestData, TestCase):
+    event_fields = {'waiting_room_enabled': True, 'waiting_room_rate': 60}
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('event_detail', args=[self.event.pk])
+        self.status_url = reverse('waiting_room_status', args=[self.event.pk])
+
+    def test_the_first_visitor_is_admitted_and_the_next_queued(self):
+        self.assertTemplateUsed(self.client.get(self.url), 'events/event_detail.html')
+        queued = Client()
+        self.assertTemplateUsed(queued.get(self.url), 'events/waiting_room.html')
+        status = queued.get(self.status_url).json()
+        self.assertEqual((status['position'], status['admitted']), (2, False))
+
+    def test_rate_must_admit_someone(self):
+        data = {
+            'title': 'Hot Event', 'description': 'Waiting room test event', 'category': self.category.pk,
+            'date': '2030-01-01T20:00', 'location': 'Nairobi', 'total_tickets': 100,
+            'waiting_room_enabled': True, 'waiting_room_rate': 0,
+        }
+        form = EventForm(data)
+        self.assertEqual(list(form.errors), ['waiting_room_rate'])
+        self.assertTrue(EventForm(dict(data, waiting_room_rate=1)).is_valid())
+
+    def test_status_checks_make_no_queries(self):
+        self.client.get(self.url)
+        queued = Client()
+        queued.get(self.url)
+        with self.assertNumQueries(0):
+            self.assertFalse(queued.get(self.status_url).json()['admitted'])
+
+        later = time.time() + 5
+        with mock.patch('events.waiting_room.time.time', return_value=later), self.assertNumQueries(0):
+            response = queued.get(self.status_url)
+        self.assertTrue(response.json()['admitted'])
+        self.assertIn(waiting_room.WaitingRoom(self.event.pk).cookie_name, response.cookies)
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+class ListingStatsQueryCountTests(TestCase):
+    """Event cards must render from with_listing_stats() without per-event queries"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = create_organizer()
+        cls.category = Category.objects.create(name='Music', slug='music')
+
+    def create_events(self, count):
+        for index in range(count):
+            event = create_event(
+                self.organizer, f'Event {index}', days=index + 1, category=self.category,
+                total_tickets=100, available_tickets=100,
+            )
+            for category_type, price, available in (('regular', 500, 50), ('vip', 2000, 0)):
+                create_ticket_category(event, category_type, price, available)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def assertConstantQueries(self, url):
+        self.create_events(2)
+        few = self.count_queries(url)
+        self.create_events(8)
+        many = self.count_queries(url)
+        self.assertEqual(few, many, f'{url} runs queries per event card')
+
+    def test_home_query_count_does_not_grow_with_events(self):
+        self.assertConstantQueries(reverse('home'))
+
+    def test_event_list_query_count_does_not_grow_with_events(self):
+        self.assertConstantQueries(reverse('event_list'))
+
+    def test_card_fields_need_no_extra_queries(self):
+        self.create_events(5)
+        with self.assertNumQueries(1):
+            for event in Event.objects.filter(organizer=self.organizer).with_listing_stats():
+                event.is_sold_out
+                event.lowest_ticket_price
+                event.highest_ticket_price
+                event.tickets_sold
+                event.category.name
+
+    def test_listing_stats_values(self):
+        self.create_events(1)
+        event = Event.objects.with_listing_stats().get()
+        self.assertEqual(event.lowest_ticket_price, 500)
+        self.assertEqual(event.highest_ticket_price, 2000)
+        self.assertFalse(event.is_sold_out)
+
+        TicketCategory.objects.filter(event=event).update(available_tickets=0)
+        event = Event.objects.with_listing_stats().get()
+        self.assertTrue(event.is_sold_out)
+        self.assertEqual(event.is_sold_out, Event.objects.get().is_sold_out)
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = create_organizer()
+        cls.category = Category.objects.create(name='Music', slug='music')
+        date = timezone.now() + timedelta(days=7)
+        # Several events share a date so the id tie-breaker matters
+        Event.objects.bulk_create([
+            Event(
+                organizer=cls.organizer,
+                category=cls.category,
+                title=f'Event {index}',
+                description='Pagination test event',
+                date=date + timedelta(days=index // 3),
+                location='Nairobi',
+            )
+            for index in range(30)
+        ])
+
+    def test_pages_cover_every_event_once_in_order(self):
+        seen = []
+        cursor = None
+        while True:
+            response = self.client.get(reverse('event_list'), {'format': 'json', 'cursor': cursor or ''})
+            data = response.json()
+            seen.extend(int(pk) for pk in re.findall(r'href="/event/(\d+)/"', data['html']))
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+
+        expected = list(Event.objects.order_by('date', 'id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_deep_page_costs_the_same_as_the_first(self):
+        events, cursor = paginate_events(Event.objects.all(), per_page=5)
+        with CaptureQueriesContext(connection) as first:
+            paginate_events(Event.objects.all(), per_page=5)
+        for _ in range(4):
+            events, cursor = paginate_events(Event.objects.all(), cursor, per_page=5)
+        with CaptureQueriesContext(connection) as deep:
+            paginate_events(Event.objects.all(), cursor, per_page=5)
+        self.assertEqual(len(first.captured_queries), len(deep.captured_queries))
+        self.assertNotIn('OFFSET', deep.captured_queries[0]['sql'])
+
+    def test_category_events_hides_past_and_inactive_events(self):
+        Event.objects.filter(title='Event 0').update(is_active=False)
+        Event.objects.filter(title='Event 1').update(date=timezone.now() - timedelta(days=1))
+        self.client.force_login(self.organizer)
+        response = self.client.get(reverse('category_events', args=['music']))
+        titles = [event.title for event in response.context['events']]
+        self.assertNotIn('Event 0', titles)
+        self.assertNotIn('Event 1', titles)
+        self.assertIsNotNone(response.context['next_cursor'])
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+class SearchIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = create_organizer()
+        cls.category = Category.objects.create(name='Music', slug='music')
+
+    def create_event(self, title, description='An evening out', location='Nairobi', **fields):
+        fields.setdefault('date', timezone.now() + timedelta(days=7))
+        return Event.objects.create(
+            organizer=self.organizer,
+            category=self.category,
+            title=title,
+            description=description,
+            location=location,
+            **fields
+        )
+
+    def search_ids(self, query, queryset=None, **kwargs):
+        queryset = Event.objects.all() if queryset is None else queryset
+        ranked, cursor = search.search_event_ids(queryset, query, **kwargs)
+        return [event_id for event_id, rank in ranked], cursor
+
+    def test_terms_match_as_prefixes_in_any_order(self):
+        event = self.create_event('Jazz Night', location='Mombasa')
+        self.create_event('Comedy Night')
+        self.assertEqual(self.search_ids('mom jaz')[0], [event.pk])
+
+    def test_title_matches_rank_above_description_matches(self):
+        in_description = self.create_event('Open Mic', description='Some jazz standards late on')
+        in_title = self.create_event('Jazz Brunch')
+        self.assertEqual(self.search_ids('jazz')[0], [in_title.pk, in_description.pk])
+
+    def test_index_follows_saves_and_deletes(self):
+        event = self.create_event('Gospel Concert')
+        event.title = 'Reggae Concert'
+        event.save()
+        self.assertEqual(self.search_ids('gospel')[0], [])
+        self.assertEqual(self.search_ids('reggae')[0], [event.pk])
+        event.delete()
+        self.assertEqual(self.search_ids('reggae')[0], [])
+
+    def test_results_respect_the_queryset_and_page_by_cursor(self):
+        for index in range(5):
+            self.create_event(f'Rooftop Party {index}')
+        hidden = self.create_event('Rooftop Party hidden', is_active=False)
+
+        seen, cursor = self.search_ids('rooftop', Event.objects.filter(is_active=True), per_page=2)
+        while cursor:
+            page, cursor = self.search_ids('rooftop', Event.objects.filter(is_active=True), cursor=cursor, per_page=2)
+            seen.extend(page)
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len(set(seen)), 5)
+        self.assertNotIn(hidden.pk, seen)
+
+    def test_rebuild_picks_up_bulk_writes(self):
+        event = self.create_event('Poetry Slam')
+        Event.objects.filter(pk=event.pk).update(title='Film Screening')
+        self.assertEqual(self.search_ids('film')[0], [])
+        self.assertEqual(search.rebuild_index(), 1)
+        self.assertEqual(self.search_ids('film')[0], [event.pk])
+
+    def test_event_list_search(self):
+        event = self.create_event('Amapiano Sundays')
+        self.create_event('Classical Evening')
+        response = self.client.get(reverse('event_list'), {'search': 'amap'})
+        self.assertEqual([e.pk for e in response.context['events']], [event.pk])
+
+
+class PageCacheTests(EventTestData, TestCase):
+    event_fields = {'total_tickets': 100, 'available_tickets': 100}
+
+    def setUp(self):
+        cache.clear()
+
+    def cache_status(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.get('X-Page-Cache')
+
+    def test_anonymous_pages_are_served_from_cache(self):
+        for url in (reverse('home'), reverse('event_list'), reverse('event_detail', args=[self.event.pk])):
+            self.assertEqual(self.cache_status(url), 'miss')
+            with self.assertNumQueries(0):
+                self.assertEqual(self.cache_status(url), 'hit')
+
+    def test_signed_in_visitors_are_not_cached(self):
+        self.client.force_login(self.organizer)
+        self.assertIsNone(self.cache_status(reverse('home')))
+
+    def test_event_save_invalidates_its_page_and_listings(self):
+        other = create_event(self.organizer, 'Other Event', days=8, location='Mombasa')
+        urls = [reverse('event_list'), reverse('event_detail', args=[self.event.pk]),
+                reverse('event_detail', args=[other.pk])]
+        for url in urls:
+            self.cache_status(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.title = 'Renamed Event'
+            self.event.save()
+
+        self.assertEqual(self.cache_status(urls[0]), 'miss')
+        self.assertEqual(self.cache_status(urls[1]), 'miss')
+        self.assertEqual(self.cache_status(urls[2]), 'hit')
+
+    def test_stock_updates_invalidate_the_event_page_only(self):
+        detail_url = reverse('event_detail', args=[self.event.pk])
+        self.cache_status(reverse('event_list'))
+        self.cache_status(detail_url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            InventoryService().decrement(self.ticket_category, 2)
+
+        self.assertEqual(self.cache_status(detail_url), 'miss')
+        self.assertEqual(self.cache_status(reverse('event_list')), 'hit')
+
+    @override_settings(PAGE_CACHE_TIMEOUT=0)
+    def test_timeout_zero_turns_the_cache_off(self):
+        self.assertIsNone(self.cache_status(reverse('home')))
+        self.assertIsNone(self.cache_status(reverse('home')))
+
+    def test_stats_count_hits_and_misses(self):
+        self.cache_status(reverse('home'))
+        self.cache_status(reverse('home'))
+        staff = User.objects.create_user(username='staff', password='password', is_staff=True)
+        self.client.force_login(staff)
+        stats = self.client.get(reverse('page_cache_stats')).json()
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_rate']), (1, 1, 0.5))
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+class VenueGeoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = create_organizer()
+
+    def create_event(self, location, **fields):
+        fields.setdefault('date', timezone.now() + timedelta(days=7))
+        return Event.objects.create(
+            organizer=self.organizer,
+            title=f'Event at {location}',
+            description='Geo test event',
+            location=location,
+            **fields
+        )
+
+    def test_geohash_matches_reference_value(self):
+        self.assertEqual(geo.geohash(57.64911, 10.40744, 11), 'u4pruydqqvj')
+
+    def test_cover_cells_contain_every_point_in_the_box(self):
+        box = geo.bounding_box(-1.2864, 36.8172, 10)
+        cells = geo.cover_cells(box)
+        self.assertLessEqual(len(cells), geo.MAX_COVER_CELLS)
+        for latitude in (box[0], -1.2864, box[1]):
+            for longitude in (box[2], 36.8172, box[3]):
+                point = geo.geohash(latitude, longitude)
+                self.assertTrue(any(point.startswith(cell) for cell in cells))
+
+    def test_locations_are_geocoded_from_the_gazetteer(self):
+        event = self.create_event('The Alchemist, Westlands, Nairobi')
+        self.assertEqual((event.venue.latitude, event.venue.longitude), (-1.2676, 36.8108))
+        self.assertEqual(self.create_event('the alchemist westlands nairobi').venue, event.venue)
+        self.assertIsNone(self.create_event('Somewhere Unlisted').venue)
+
+    def test_venue_is_resolved_again_only_when_the_location_changes(self):
+        event = Event.objects.get(pk=self.create_event('Karen').pk)
+        with CaptureQueriesContext(connection) as queries:
+            event.save()
+        self.assertFalse([query for query in queries if 'events_venue' in query['sql']])
+        event.location = 'Westlands'
+        event.save()
+        self.assertEqual(Event.objects.get(pk=event.pk).venue.key, 'westlands')
+
+    def test_near_me_orders_by_distance_within_the_radius(self):
+        karen = self.create_event('Karen')
+        cbd = self.create_event('Nairobi CBD')
+        westlands = self.create_event('Westlands')
+        self.create_event('Mombasa')
+        self.create_event('Westlands', is_active=False)
+
+        response = self.client.get(reverse('event_list'), {'lat': -1.2680, 'lng': 36.8110, 'radius': 25})
+        events = response.context['events']
+        self.assertEqual([event.pk for event in events], [westlands.pk, cbd.pk, karen.pk])
+        self.assertAlmostEqual(events[1].distance_km, geo.haversine_km(-1.2680, 36.8110, -1.2841, 36.8233), delta=0.05)
+
+    def test_near_me_pages_through_widening_rings(self):
+        for place in ('Westlands', 'Nairobi CBD', 'Karen', 'Kasarani', 'Ruaka', 'Thika', 'Machakos'):
+            self.create_event(place)
+        queryset = Event.objects.all()
+        expected = list(
+            geo.nearby(queryset, -1.2680, 36.8110, 100).order_by('distance_sq', 'id').values_list('id', flat=True)
+        )
+
+        seen, cursor = [], None
+        while True:
+            events, cursor = geo.nearest_events(queryset, -1.2680, 36.8110, 100, cursor, per_page=2)
+            seen.extend(event.pk for event in events)
+            if not cursor:
+                break
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(seen), 7)
+
+    def test_bad_coordinates_are_ignored(self):
+        self.create_event('Westlands')
+        response = self.client.get(reverse('event_list'), {'lat': 'north', 'lng': 36.8, 'radius': 5})
+        self.assertIsNone(response.context['near'])
+        self.assertEqual(len(response.context['events']), 1)
+
+    def test_geocode_venues_links_bulk_created_events(self):
+        Event.objects.bulk_create([
+            Event(organizer=self.organizer, title='Bulk', description='Bulk', location=location,
+                  date=timezone.now() + timedelta(days=3))
+            for location in ('Kisumu', 'Kisumu', 'Atlantis')
+        ])
+        call_command('geocode_venues', stdout=StringIO())
+        self.assertEqual(Event.objects.filter(venue__key='kisumu').count(), 2)
+        self.assertEqual(Venue.objects.count(), 1)
+
+
+class FacetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = create_organizer()
+        cls.music = Category.objects.create(name='Music', slug='music')
+        cls.comedy = Category.objects.create(name='Comedy', slug='comedy')
+        # (category, cheapest price, tickets left, days away)
+        for category, price, available, days in (
+            (cls.music, 500, 10, 40),
+            (cls.music, 2000, 10, 45),
+            (cls.music, 2500, 0, 50),
+            (cls.comedy, 500, 10, 60),
+            (cls.comedy, None, 0, 70),
+        ):
+            event = create_event(cls.organizer, f'{category.name} {price}', days=days, category=category)
+            if price is not None:
+                create_ticket_category(event, price=price, available_tickets=available)
+
+    def setUp(self):
+        cache.clear()
+
+    def counts(self, response):
+        return {
+            facet['name']: {option['value']: option['count'] for option in facet['options']}
+            for facet in response.context['facets']
+        }
+
+    def test_counts_per_facet(self):
+        counts = self.counts(self.client.get(reverse('event_list')))
+        self.assertEqual(counts['category'], {'comedy': 2, 'music': 3})
+        self.assertEqual(counts['price'], {'free': 1, 'under_1000': 2, '1000_2999': 2})
+        self.assertEqual(counts['availability'], {'available': 4, 'sold_out': 1})
+
+    def test_counts_respect_the_other_selected_facets(self):
+        response = self.client.get(reverse('event_list'), {'price': 'under_1000'})
+        counts = self.counts(response)
+        self.assertEqual(counts['category'], {'comedy': 1, 'music': 1})
+        # A facet's own options still count without its selection
+        self.assertEqual(counts['price'], {'free': 1, 'under_1000': 2, '1000_2999': 2})
+        self.assertEqual({event.title for event in response.context['events']}, {'Music 500', 'Comedy 500'})
+
+    def test_selected_facets_filter_the_listing(self):
+        response = self.client.get(reverse('event_list'), {'category': 'music', 'availability': 'sold_out'})
+        self.assertEqual([event.title for event in response.context['events']], ['Music 2500'])
+        self.assertEqual(self.counts(response)['availability'], {'available': 2, 'sold_out': 1})
+
+    def test_when_buckets(self):
+        weekend_start, weekend_end = facets.date_ranges()['weekend']
+        event = Event.objects.create(
+            organizer=self.organizer, category=self.music, title='Weekend gig', description='Facet test event',
+            date=weekend_start + (weekend_end - weekend_start) / 2, location='Nairobi',
+        )
+        response = self.client.get(reverse('event_list'), {'when': 'weekend'})
+        self.assertEqual([e.pk for e in response.context['events']], [event.pk])
+        self.assertEqual(self.counts(response)['when']['weekend'], 1)
+
+    def test_cube_is_one_cached_query_until_events_change(self):
+        queryset = Event.objects.filter(is_active=True)
+        with self.assertNumQueries(1):
+            facets.facet_cube(queryset, 'state')
+        with self.assertNumQueries(0):
+            facets.facet_cube(queryset, 'state')
+        with self.captureOnCommitCallbacks(execute=True):
+            Event.objects.filter(title='Music 500').get().save()
+        with self.assertNumQueries(1):
+            facets.facet_cube(queryset, 'state')
+
+
+class TypeaheadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = create_organizer()
+        cls.music = Category.objects.create(name='Music', slug='music')
+        cls.later = create_event(
+            cls.organizer, 'Jazz Night', days=20, category=cls.music, location='Westlands, Nairobi'
+        )
+        cls.sooner = create_event(cls.organizer, 'Jam Session', days=5, category=cls.music, location='Mombasa')
+        create_event(cls.organizer, 'Jazz Past', days=-1, category=cls.music, location='Mombasa')
+
+    def setUp(self):
+        cache.clear()
+        typeahead._index = None
+
+    def labels(self, query):
+        return [(result['type'], result['label']) for result in typeahead.suggest(query)]
+
+    def test_prefix_matches_events_soonest_first(self):
+        self.assertEqual(self.labels('ja'), [('event', 'Jam Session'), ('event', 'Jazz Night')])
+        self.assertEqual(self.labels('jazz ni'), [('event', 'Jazz Night')])
+        self.assertEqual(self.labels('jazz mom'), [])
+
+    def test_categories_and_locations_come_first(self):
+        self.assertEqual(self.labels('mus'), [('category', 'Music')])
+        self.assertEqual(self.labels('westl')[0], ('location', 'Westlands, Nairobi'))
+
+    def test_changes_reach_a_loaded_index_without_a_reload(self):
+        typeahead.get_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            create_event(self.organizer, 'Jazz Brunch', days=1, category=self.music, location='Kisumu')
+            self.later.delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.labels('jazz'), [('event', 'Jazz Brunch')])
+        self.assertEqual(self.labels('westl'), [])
+
+    def test_changes_leave_the_index_being_read_untouched(self):
+        index = typeahead.get_index()
+        tokens = list(index.tokens)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.later.delete()
+        self.assertIsNot(typeahead.get_index(), index)
+        self.assertEqual(index.tokens, tokens)
+        self.assertEqual(self.labels('jazz'), [])
+
+    def test_endpoint(self):
+        typeahead.get_index()
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('event_autocomplete'), {'q': 'jam'})
+        self.assertEqual(response.json()['results'][0]['url'], reverse('event_detail', args=[self.sooner.pk]))
+
+
+class ApiTests(EventTestData, TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_list_and_detail(self):
+        events = self.client.get(reverse('api_event_list')).json()['events']
+        self.assertEqual([(event['id'], event['lowest_price']) for event in events], [(self.event.pk, '500.00')])
+        event = self.client.get(reverse('api_event_detail', args=[self.event.pk])).json()['event']
+        self.assertEqual(event['ticket_categories'][0]['available'], 100)
+        self.assertTrue(event['ticket_categories'][0]['on_sale'])
+        categories = self.client.get(reverse('api_category_list')).json()['categories']
+        self.assertEqual(categories, [{'name': 'Music', 'slug': 'music'}])
+
+    def test_repeat_poll_is_not_modified_without_queries(self):
+        url = reverse('api_event_availability', args=[self.event.pk])
+        response = self.client.get(url)
+        with self.assertNumQueries(0):
+            repeat = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(repeat.status_code, 304)
+        repeat = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(repeat.status_code, 304)
+
+    def test_stock_change_makes_a_new_etag(self):
+        url = reverse('api_event_availability', args=[self.event.pk])
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            InventoryService().decrement(self.ticket_category, 3)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['ticket_categories'][0]['available'], 97)
+
+    def test_validators_roll_over_for_sales_windows(self):
+        url = reverse('api_event_detail', args=[self.event.pk])
+        etag = self.client.get(url)['ETag']
+        later = timezone.now() + timedelta(seconds=views_api.LISTING_REFRESH)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_lost_version_never_reuses_an_etag(self):
+        url = reverse('api_event_detail', args=[self.event.pk])
+        etag = self.client.get(url)['ETag']
+        cache.clear()
+        self.assertNotEqual(self.client.get(url)['ETag'], etag)
+
+    def test_inactive_event_is_not_found(self):
+        Event.objects.filter(pk=self.event.pk).update(is_active=False)
+        self.assertEqual(self.client.get(reverse('api_event_detail', args=[self.event.pk])).status_code, 404)
+
+
+class AvailabilityTests(EventTestData, TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def sell(self, quantity):
+        with self.captureOnCommitCallbacks(execute=True):
+            InventoryService().decrement(self.ticket_category, quantity)
+
+    def test_snapshot_is_cached_until_stock_moves(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(availability.snapshot(self.event.pk)['ticket_categories'][0]['available'], 100)
+        with self.assertNumQueries(0):
+            availability.snapshot(self.event.pk)
+        self.sell(3)
+        self.assertEqual(availability.snapshot(self.event.pk)['ticket_categories'][0]['available'], 97)
+
+    def test_missing_event(self):
+        self.assertIsNone(availability.snapshot(self.event.pk + 1))
+        for name in ('api_event_availability', 'event_availability_stream'):
+            response = self.client.get(reverse(name, args=[self.event.pk + 1]))
+            self.assertEqual(response.status_code, 404)
+
+    def test_pages_poll_unless_streams_are_served(self):
+        response = self.client.get(self.event.get_absolute_url())
+        self.assertContains(response, 'data-availability-url="%s"' % reverse('api_event_availability', args=[self.event.pk]))
+        self.assertNotContains(response, 'data-availability-stream')
+
+        cache.clear()
+        with self.settings(AVAILABILITY_STREAM=True):
+            response = self.client.get(self.event.get_absolute_url())
+            self.assertContains(response, 'data-availability-stream')
+            # The test client is WSGI, where a stream would hold a worker
+            response = self.client.get(reverse('event_availability_stream', args=[self.event.pk]))
+            self.assertEqual(response.status_code, 404)
+
+    @mock.patch.object(availability, 'POLL_INTERVAL', 0.01)
+    async def test_stream_pushes_changes(self):
+        stream = availability.stream(self.event.pk)
+        try:
+            self.assertTrue((await anext(stream)).startswith('retry:'))
+            self.assertIn('"available":100', await anext(stream))
+            await sync_to_async(self.sell)(3)
+            self.assertIn('"available":97', await anext(stream))
+        finally:
+            await stream.aclose()
+        self.assertEqual(availability._feeds, {})
+
+
+class OrganizerRevenueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = create_organizer()
+
+    def setUp(self):
+        self.client.force_login(self.organizer)
+
+    def create_events(self, count):
+        for index in range(count):
+            event = create_event(self.organizer, f'Event {index}', days=index + 1)
+            for category_type, price in (('regular', 500), ('vip', 2000)):
+                category = create_ticket_category(event, category_type, price, available_tickets=50)
+                for status, quantity in (('confirmed', 2), ('used', 1), ('pending', 3), ('cancelled', 4)):
+                    Ticket.objects.create(
+                        event=event, ticket_category=category, buyer_name='Buyer', buyer_email='buyer@example.com',
+                        quantity=quantity, status=status,
+                    )
+
+    def test_only_confirmed_tickets_count(self):
+        self.create_events(1)
+        event = Event.objects.get()
+        regular = event.ticket_categories.get(category_type='regular')
+        revenue = sales.organizer_revenue(self.organizer)[event.pk]
+        self.assertEqual(revenue['tickets_sold'], 6)
+        self.assertEqual(revenue['revenue'], 3 * 500 + 3 * 2000)
+        self.assertEqual(revenue['categories'][regular.pk], {'tickets_sold': 3, 'revenue': 1500})
+
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['total_revenue'], 7500)
+        self.assertEqual(response.context['total_tickets_sold'], 6)
+        events_data = self.client.get(reverse('dashboard_panel', args=['revenue'])).json()['events']
+        self.assertEqual(events_data[0]['category_revenue']['Regular']['revenue'], 1500.0)
+
+    def test_dashboard_query_count_does_not_grow_with_events(self):
+        def count_queries(url):
+            cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                self.assertEqual(self.client.get(url).status_code, 200)
+            return len(context.captured_queries)
+
+        urls = [reverse('dashboard')] + [reverse('dashboard_panel', args=[name]) for name in ('events', 'revenue', 'categories')]
+        self.create_events(2)
+        # The first visit creates the organizer's summary row
+        self.client.get(urls[0])
+        few = [count_queries(url) for url in urls]
+        self.create_events(8)
+        self.assertEqual([count_queries(url) for url in urls], few)
+
+
+class DashboardPanelTests(EventTestData, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.organizer)
+
+    def panel(self, name):
+        return self.client.get(reverse('dashboard_panel', args=[name])).json()
+
+    def test_skeleton_renders_no_panels(self):
+        response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, 'data-dashboard-panel="events"')
+        self.assertNotContains(response, self.event.title)
+        self.assertIn(self.event.title, self.panel('events')['html'])
+        self.assertEqual(self.panel('categories')['categories'][0]['name'], 'Regular')
+
+    def test_panels_are_cached_until_a_sale(self):
+        self.panel('revenue')
+        summary = OrganizerSummary.for_organizer(self.organizer)
+        with self.assertNumQueries(0):
+            dashboard_panels.get_panel('revenue', self.organizer, summary)
+
+        Ticket.objects.create(
+            event=self.event, ticket_category=self.ticket_category, buyer_name='Buyer',
+            buyer_email='buyer@example.com', quantity=2, status='confirmed',
+        )
+        revenue = self.panel('revenue')['events'][0]['category_revenue']['Regular']
+        self.assertEqual(revenue['tickets_sold'], 2)
+
+    def test_price_change_refreshes_the_panels(self):
+        self.panel('categories')
+        self.ticket_category.price = 750
+        self.ticket_category.save()
+        self.assertEqual(self.panel('categories')['categories'][0]['price'], '750.00')
+
+    def test_unknown_panel(self):
+        self.assertEqual(self.client.get(reverse('dashboard_panel', args=['nope'])).status_code, 404)
+
+
+class DailySalesTests(EventTestData, TestCase):
+    def buy(self, quantity, status='confirmed'):
+        return Ticket.objects.create(
+            event=self.event, ticket_category=self.ticket_category, buyer_name='Buyer',
+            buyer_email='buyer@example.com', quantity=quantity, status=status,
+        )
+
+    def today(self):
+        return DailySales.objects.values('tickets', 'quantity', 'revenue').get(day=sale_day())
+
+    def test_confirm_and_cancel_move_the_day(self):
+        pending = self.buy(2, status='pending')
+        self.assertFalse(DailySales.objects.exists())
+        pending.confirm()
+        self.buy(1)
+        self.assertEqual(self.today(), {'tickets': 2, 'quantity': 3, 'revenue': 1500})
+        pending.cancel()
+        self.assertEqual(self.today(), {'tickets': 1, 'quantity': 1, 'revenue': 500})
+
+    def test_cancellation_comes_off_the_purchase_day(self):
+        ticket = self.buy(2)
+        yesterday = sale_day() - timedelta(days=1)
+        Ticket.objects.filter(pk=ticket.pk).update(purchased_at=timezone.now() - timedelta(days=1))
+        call_command('rebuild_daily_sales', stdout=StringIO())
+        Ticket.objects.get(pk=ticket.pk).cancel()
+        self.assertEqual(DailySales.objects.get(day=yesterday).quantity, 0)
+
+    def test_rebuild_a_date_range(self):
+        self.buy(2)
+        self.buy(1, status='pending')
+        DailySales.objects.update(quantity=99)
+        today = sale_day().isoformat()
+        call_command('rebuild_daily_sales', since=today, until=today, stdout=StringIO())
+        self.assertEqual(self.today(), {'tickets': 1, 'quantity': 2, 'revenue': 1000})
+
+    def test_charts_read_the_rollup(self):
+        self.buy(2)
+        with self.assertNumQueries(1):
+            series = sales.sales_by_day(30, organizer=self.organizer)
+        self.assertEqual([(row['day'], row['revenue']) for row in series], [(sale_day(), 1000)])
+        self.assertEqual(sales.organizer_revenue(self.organizer)[self.event.pk]['tickets_sold'], 2)
+
+
+class OrganizerSummaryTests(EventTestData, TestCase):
+    def buy(self, quantity, event=None):
+        return Ticket.objects.create(
+            event=event or self.event, ticket_category=self.ticket_category, buyer_name='Buyer',
+            buyer_email='buyer@example.com', quantity=quantity, status='confirmed',
+        )
+
+    def test_created_from_existing_sales_then_read_by_primary_key(self):
+        self.buy(2)
+        summary = OrganizerSummary.for_organizer(self.organizer)
+        self.assertEqual((summary.events, summary.active_events, summary.tickets_sold, summary.revenue), (1, 1, 2, 1000))
+        self.assertIsNotNone(summary.last_sale_at)
+        with self.assertNumQueries(1):
+            OrganizerSummary.for_organizer(self.organizer)
+
+    def test_kept_current_by_sales_and_events(self):
+        OrganizerSummary.for_organizer(self.organizer)
+        ticket = self.buy(3)
+        ticket.cancel()
+        self.buy(1)
+        other = create_event(self.organizer, 'Draft', days=9, is_active=False)
+        summary = OrganizerSummary.for_organizer(self.organizer)
+        self.assertEqual((summary.events, summary.active_events, summary.tickets_sold, summary.revenue), (2, 1, 1, 500))
+
+        self.event.delete()
+        other.delete()
+        summary = OrganizerSummary.for_organizer(self.organizer)
+        self.assertEqual((summary.events, summary.tickets_sold, summary.revenue), (0, 0, 0))
+
+    def test_profile_shows_the_totals(self):
+        self.buy(2)
+        self.client.force_login(self.organizer)
+        response = self.client.get(reverse('profile_view'))
+        self.assertEqual((response.context['tickets_sold'], response.context['total_revenue']), (2, 1000))
+
+
+class AttendeeExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = create_organizer()
+        cls.event = create_event(cls.organizer)
+        cls.categories = {
+            category_type: create_ticket_category(cls.event, category_type, price)
+            for category_type, price in (('regular', 500), ('vip', 2000))
+        }
+        for index, (category_type, status) in enumerate(
+            (('regular', 'confirmed'), ('regular', 'cancelled'), ('vip', 'confirmed'), ('vip', 'used'))
+        ):
+            Ticket.objects.create(
+                event=cls.event, ticket_category=cls.categories[category_type], buyer_name=f'Buyer {index}',
+                buyer_email=f'buyer{index}@example.com', quantity=1, status=status,
+            )
+
+    def setUp(self):
+        self.client.force_login(self.organizer)
+
+    def export(self, **params):
+        response = self.client.get(reverse('export_attendees', args=[self.event.pk]), params)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_csv(self):
+        response, content = self.export()
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = content.splitlines()
+        self.assertTrue(lines[0].startswith('ticket_code,buyer_name'))
+        self.assertEqual(len(lines), 5)
+
+    def test_ndjson_filtered_by_category_and_status(self):
+        response, content = self.export(format='ndjson', category=self.categories['vip'].pk, status='confirmed')
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([(row['buyer_name'], row['category']) for row in rows], [('Buyer 2', 'Vip')])
+
+    def test_formula_cells_are_neutralised(self):
+        Ticket.objects.filter(buyer_name='Buyer 0').update(buyer_name='=HYPERLINK("x")')
+        response, content = self.export(status='confirmed')
+        self.assertIn('"\'=HYPERLINK(""x"")"', content)
+
+    def test_cells_starting_with_tab_or_carriage_return_are_neutralised(self):
+        Ticket.objects.filter(buyer_name='Buyer 0').update(buyer_name='\t=1+1')
+        Ticket.objects.filter(buyer_name='Buyer 2').update(buyer_name='\r=1+1')
+        response, content = self.export(status='confirmed')
+        self.assertIn("'\t=1+1", content)
+        self.assertIn("'\r=1+1", content)
+
+    def test_only_the_organizer_can_export(self):
+        other = create_organizer('other')
+        self.client.force_login(other)
+        response = self.client.get(reverse('export_attendees', args=[self.event.pk]))
+        self.assertEqual(response.status_code, 404)
+
+
+class ForecastTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = create_organizer()
+        cls.event = create_event(cls.organizer, days=40)
+        cls.categories = {
+            category_type: create_ticket_category(
+                cls.event, category_type, available_tickets=available,
+                sales_start=timezone.now() - timedelta(days=10)
+            )
+            for category_type, available in (('regular', 100), ('vip', 1000))
+        }
+        # Ten tickets a day since sales opened, in both categories
+        today = sale_day()
+        for category in cls.categories.values():
+            for days_ago in range(1, 11):
+                DailySales.objects.create(
+                    event=cls.event, ticket_category=category, day=today - timedelta(days=days_ago),
+                    tickets=10, quantity=10, revenue=5000,
+                )
+
+    def test_moving_average(self):
+        series = forecasting.np.array([[1, 2, 3, 4, 5, 6], [0, 0, 0, 7, 7, 7]], dtype=float)
+        averages = forecasting.moving_average(series, 3)
+        self.assertEqual(averages.shape, (2, 4))
+        self.assertEqual(averages[0].round(6).tolist(), [2, 3, 4, 5])
+        self.assertEqual(averages[1].round(6).tolist(), [0, 2.333333, 4.666667, 7])
+
+    def test_exponential_smoothing_matches_the_recursion(self):
+        series = forecasting.np.array([[4, 0, 8, 2, 6], [9, 9, 1, 3, 5]], dtype=float)
+        first = forecasting.np.array([0, 2])
+        smoothed = forecasting.exponential_smoothing(series, 0.5, first)
+        for row, start, value in zip(series.tolist(), first.tolist(), smoothed.tolist()):
+            level = row[start]
+            for sold in row[start + 1:]:
+                level = 0.5 * sold + 0.5 * level
+            self.assertAlmostEqual(value, level)
+
+    def test_forecast(self):
+        self.assertEqual(forecasting.forecast(batch_size=1), 2)
+        regular = SalesForecast.objects.get(ticket_category=self.categories['regular'])
+        self.assertAlmostEqual(regular.moving_average, 10)
+        self.assertAlmostEqual(regular.smoothed_rate, 10)
+        self.assertEqual(regular.remaining, 100)
+        self.assertEqual(regular.sellout_on, sale_day() + timedelta(days=10))
+        # A hundred days of stock with thirty days of sales left
+        self.assertIsNone(SalesForecast.objects.get(ticket_category=self.categories['vip']).sellout_on)
+
+    def test_sold_out_categories_are_dropped(self):
+        forecasting.forecast()
+        TicketCategory.objects.filter(pk=self.categories['vip'].pk).update(available_tickets=0)
+        self.assertEqual(forecasting.forecast(), 1)
+        self.assertEqual(list(SalesForecast.objects.values_list('ticket_category', flat=True)), [self.categories['regular'].pk])
+
+    def test_command_and_dashboard_panel(self):
+        out = StringIO()
+        call_command('forecast_sales', stdout=out)
+        self.assertIn('Forecast 2 ticket categories', out.getvalue())
+
+        cache.clear()
+        self.client.force_login(self.organizer)
+        forecasts = self.client.get(reverse('dashboard_panel', args=['forecasts'])).json()['forecasts']
+        self.assertEqual([forecast['category'] for forecast in forecasts], ['Regular', 'Vip'])
+        self.assertEqual(forecasts[0]['sellout_on'], (sale_day() + timedelta(days=10)).isoformat())
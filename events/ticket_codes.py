@@ -0,0 +1,121 @@
+"""
+Ticket code generation.
+
+Codes come from a database-backed sequence, so two tickets can never get
+the same code and no retry-on-collision loop is needed. Each process
+reserves a block of sequence numbers with a single INSERT (the block's
+auto-increment id is the block number) and hands them out from memory.
+The block row is written in the caller's transaction, so the unused rest
+of a block is only kept for later calls once that transaction commits: a
+rolled-back block row is gone, and its number will be reserved again.
+
+A sequence number is turned into a code by a keyed Feistel permutation of
+the 40-bit space, so consecutive tickets get unrelated codes that cannot
+be guessed from one another. The result is written as 8 Crockford base32
+characters followed by a mod-37 check symbol, so door staff can reject
+mistyped codes without a lookup.
+"""
+import hashlib
+import hmac
+import threading
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import TicketCodeBlock
+
+# Sequence numbers per block. Never change this once tickets exist:
+# block N always covers [N * BLOCK_SIZE, (N + 1) * BLOCK_SIZE).
+BLOCK_SIZE = 1000
+
+CODE_BITS = 40
+HALF_BITS = CODE_BITS // 2
+HALF_MASK = (1 << HALF_BITS) - 1
+FEISTEL_ROUNDS = 4
+
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+CHECK_ALPHABET = ALPHABET + '*~$=U'
+CODE_LENGTH = CODE_BITS // 5 + 1
+
+_lock = threading.Lock()
+_next = 0
+_end = 0
+
+
+def _round(key, index, half):
+    digest = hmac.new(key, f'{index}:{half}'.encode(), hashlib.sha256).digest()
+    return int.from_bytes(digest[:4], 'big') & HALF_MASK
+
+
+def permute(number):
+    """Map a sequence number to a unique 40-bit value"""
+    key = settings.TICKET_CODE_KEY.encode()
+    left, right = number >> HALF_BITS, number & HALF_MASK
+    for index in range(FEISTEL_ROUNDS):
+        left, right = right, left ^ _round(key, index, right)
+    return (left << HALF_BITS) | right
+
+
+def encode(value):
+    """Write a 40-bit value as 8 base32 characters plus a check symbol"""
+    chars = []
+    remaining = value
+    for _ in range(CODE_BITS // 5):
+        chars.append(ALPHABET[remaining & 31])
+        remaining >>= 5
+    return ''.join(reversed(chars)) + CHECK_ALPHABET[value % 37]
+
+
+def is_valid_ticket_code(code):
+    """Check the format and check symbol of a code without touching the database"""
+    code = (code or '').strip().upper()
+    if len(code) != CODE_LENGTH or any(char not in ALPHABET for char in code[:-1]):
+        return False
+    value = 0
+    for char in code[:-1]:
+        value = (value << 5) | ALPHABET.index(char)
+    return CHECK_ALPHABET[value % 37] == code[-1]
+
+
+def _reserve_blocks(count):
+    blocks = TicketCodeBlock.objects.bulk_create([TicketCodeBlock() for _ in range(count)])
+    return [block.pk for block in blocks]
+
+
+def _adopt(start, end):
+    """Hand out [start, end) to later calls"""
+    global _next, _end
+    with _lock:
+        _next, _end = start, end
+
+
+def allocate_sequence_numbers(count):
+    """Return `count` sequence numbers that no other caller will ever receive"""
+    global _next
+
+    numbers, tail = [], None
+    with _lock:
+        take = min(count, _end - _next)
+        numbers.extend(range(_next, _next + take))
+        _next += take
+
+        missing = count - take
+        if missing:
+            blocks = _reserve_blocks(-(-missing // BLOCK_SIZE))
+            for block in blocks:
+                start = block * BLOCK_SIZE
+                take = min(missing, BLOCK_SIZE)
+                numbers.extend(range(start, start + take))
+                missing -= take
+            tail = (start + take, start + BLOCK_SIZE)
+    if tail:
+        # Keep the unused tail of the last block for later calls, once its
+        # row is committed. Outside a transaction on_commit runs the
+        # callback at once, so it must not be registered under _lock.
+        transaction.on_commit(lambda: _adopt(*tail))
+    return numbers
+
+
+def allocate_ticket_codes(count):
+    """Return `count` unique, hard-to-guess ticket codes"""
+    return [encode(permute(number)) for number in allocate_sequence_numbers(count)]
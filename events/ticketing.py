@@ -0,0 +1,73 @@
+import uuid
+
+from django.db import transaction
+
+from .fulfillment import enqueue_fulfillment
+from .inventory import InventoryService
+from .models import Ticket
+from .ticket_codes import allocate_ticket_codes
+
+
+def issue_tickets(event, ticket_category, quantity, buyer_name, buyer_email, buyer_phone='',
+                  unit_price=None, per_attendee=False, hold=None, **payment_fields):
+    """
+    Take the stock for a paid purchase, create its confirmed ticket(s) and
+    queue fulfillment, all in one transaction.
+
+    By default one Ticket covers the whole quantity. With per_attendee a
+    group purchase gets one Ticket per attendee, written with a single
+    bulk_create, so the query count does not grow with the group size.
+    `payment_fields` (stripe_payment_intent_id, transaction_code, buyer)
+    are copied onto every ticket. Raises InsufficientTickets.
+    """
+    unit_price = ticket_category.price if unit_price is None else unit_price
+    inventory = InventoryService()
+
+    with transaction.atomic():
+        if hold:
+            inventory.convert_hold(hold)
+        else:
+            inventory.decrement(ticket_category, quantity)
+
+        if per_attendee and quantity > 1:
+            group_reference = f"GRP-{uuid.uuid4().hex[:12].upper()}"
+            tickets = Ticket.objects.bulk_create([
+                Ticket(
+                    event=event,
+                    ticket_category=ticket_category,
+                    buyer_name=buyer_name,
+                    buyer_email=buyer_email,
+                    buyer_phone=buyer_phone,
+                    quantity=1,
+                    unit_price=unit_price,
+                    total_amount=unit_price,
+                    ticket_code=code,
+                    group_reference=group_reference,
+                    status='confirmed',
+                    **payment_fields
+                )
+                for code in allocate_ticket_codes(quantity)
+            ])
+            # bulk_create skips Ticket.save, so move the counters once here
+            Ticket.record_sales(
+                event.pk, ticket_category.pk, quantity, unit_price * quantity, tickets=quantity,
+                sharded=ticket_category.is_sharded
+            )
+        else:
+            tickets = [Ticket.objects.create(
+                event=event,
+                ticket_category=ticket_category,
+                buyer_name=buyer_name,
+                buyer_email=buyer_email,
+                buyer_phone=buyer_phone,
+                quantity=quantity,
+                unit_price=unit_price,
+                total_amount=unit_price * quantity,
+                status='confirmed',
+                **payment_fields
+            )]
+
+        # One delivery per purchase; a group email carries every ticket
+        enqueue_fulfillment(tickets[0])
+
+    return tickets
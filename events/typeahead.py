@@ -0,0 +1,325 @@
+"""
+In-process typeahead index for the event search box.
+
+Each worker keeps a sorted array of word tokens from upcoming events'
+titles and locations, with a parallel array of event ids ordered by
+date within each token, plus a small array for category and location
+names. A lookup bisects to the tokens starting with the typed prefix
+and merges their events soonest first, stopping after a page of
+matches. Suggestions never touch the database.
+
+Keeping workers in step:
+
+  * The first lookup in a worker loads the index with one query.
+  * Every Event save or delete (events.signals) publishes the event's new
+    index record, or None when it is gone, to the cache under the next
+    number of a shared version stamp.
+  * A lookup compares the stamp with the version the worker has applied
+    and replays the missing changes from the cache. Only if a change has
+    already expired from the cache does the worker reload from the
+    database.
+  * Changes are applied to a copy of the index that then replaces it,
+    so lookups running in other threads never see it half updated.
+
+Past events are skipped at lookup time and dropped at the next reload.
+Each worker reloads every RELOAD_INTERVAL seconds, which also picks up
+bulk writes that skipped the signals.
+
+The cache must be shared by every worker (see CACHES).
+"""
+import heapq
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+
+VERSION_KEY = 'typeahead:version'
+CHANGE_KEY = 'typeahead:change:{}'
+# Changes older than this must be caught up by a full reload
+CHANGE_TIMEOUT = 60 * 60
+RELOAD_INTERVAL = 6 * 60 * 60
+
+# Distinct tokens merged per lookup, so very short prefixes stay fast
+MAX_RUNS = 200
+MAX_CATEGORIES = 2
+MAX_LOCATIONS = 3
+DEFAULT_LIMIT = 8
+
+EventRecord = namedtuple('EventRecord', 'id title date location location_key category_slug category_name words')
+
+
+def words(text):
+    return re.findall(r'\w+', (text or '').lower())
+
+
+def record_for(event):
+    """The index record of an event, or None if it should not be suggested"""
+    if not event.is_active:
+        return None
+    category = event.category
+    return EventRecord(
+        id=event.pk,
+        title=event.title,
+        date=event.date,
+        location=event.location,
+        location_key=' '.join(words(event.location)),
+        category_slug=category.slug if category else '',
+        category_name=category.name if category else '',
+        words=tuple(words(event.title) + words(event.location)),
+    )
+
+
+class TypeaheadIndex:
+    """Sorted word tokens of events, categories and locations, searched with bisect"""
+
+    def __init__(self, records=()):
+        self.events = {}
+        # Categories and locations are suggested while any indexed event uses them;
+        # each maps to [label, number of events, words of the label]
+        self.categories = {}
+        self.locations = {}
+        # Parallel arrays: event tokens sorted, and within one token the
+        # events soonest first, so a lookup can stop after a page of matches
+        self.tokens = []
+        self.event_ids = []
+        # The same for category and location names; refs are (kind, key)
+        self.name_tokens = []
+        self.name_refs = []
+
+        pairs, name_pairs = [], []
+        for record in records:
+            self.events[record.id] = record
+            pairs.extend((token, record.date, record.id) for token in self._event_tokens(record))
+            name_pairs.extend(self._count_in(record))
+        pairs.sort()
+        name_pairs.sort()
+        self.tokens = [token for token, date, event_id in pairs]
+        self.event_ids = [event_id for token, date, event_id in pairs]
+        self.name_tokens = [token for token, ref in name_pairs]
+        self.name_refs = [ref for token, ref in name_pairs]
+
+    def __len__(self):
+        return len(self.events)
+
+    def copy(self):
+        """An index changes can be applied to while lookups still read this one"""
+        other = TypeaheadIndex()
+        other.events = dict(self.events)
+        other.categories = {key: list(name) for key, name in self.categories.items()}
+        other.locations = {key: list(name) for key, name in self.locations.items()}
+        other.tokens = list(self.tokens)
+        other.event_ids = list(self.event_ids)
+        other.name_tokens = list(self.name_tokens)
+        other.name_refs = list(self.name_refs)
+        return other
+
+    @staticmethod
+    def _event_tokens(record):
+        return {sys.intern(token) for token in record.words}
+
+    def _count_in(self, record):
+        """Count a record's category and location, returning tokens for any newly seen one"""
+        new = []
+        for kind, names, key, label in (
+            ('category', self.categories, record.category_slug, record.category_name),
+            ('location', self.locations, record.location_key, record.location),
+        ):
+            if not key:
+                continue
+            if key in names:
+                names[key][1] += 1
+            else:
+                label_words = tuple(words(label))
+                names[key] = [label, 1, label_words]
+                new.extend((sys.intern(token), (kind, key)) for token in set(label_words))
+        return new
+
+    def _position(self, token, record):
+        """Where (token, record) sorts: by token, then date and id"""
+        low = bisect_left(self.tokens, token)
+        high = bisect_right(self.tokens, token, low)
+        key = (record.date, record.id)
+        while low < high:
+            middle = (low + high) // 2
+            other = self.events[self.event_ids[middle]]
+            if (other.date, other.id) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def remove(self, event_id):
+        record = self.events.get(event_id)
+        if record is None:
+            return
+        for token in self._event_tokens(record):
+            index = self._position(token, record)
+            if index < len(self.tokens) and self.tokens[index] == token and self.event_ids[index] == event_id:
+                del self.tokens[index]
+                del self.event_ids[index]
+        del self.events[event_id]
+
+        for kind, names, key in (
+            ('category', self.categories, record.category_slug),
+            ('location', self.locations, record.location_key),
+        ):
+            if key in names:
+                names[key][1] -= 1
+                if not names[key][1]:
+                    for token in set(names.pop(key)[2]):
+                        index = bisect_left(self.name_tokens, token)
+                        while self.name_refs[index] != (kind, key):
+                            index += 1
+                        del self.name_tokens[index]
+                        del self.name_refs[index]
+
+    def upsert(self, event_id, record):
+        """Apply one published change; `record` None removes the event"""
+        self.remove(event_id)
+        if record is None:
+            return
+        self.events[record.id] = record
+        for token in self._event_tokens(record):
+            index = self._position(token, record)
+            self.tokens.insert(index, token)
+            self.event_ids.insert(index, record.id)
+        for token, ref in self._count_in(record):
+            index = bisect_left(self.name_tokens, token)
+            self.name_tokens.insert(index, token)
+            self.name_refs.insert(index, ref)
+
+    def _runs(self, prefix):
+        """Each token starting with `prefix`, as an iterator of its events soonest first"""
+        index = bisect_left(self.tokens, prefix)
+        for _ in range(MAX_RUNS):
+            if index >= len(self.tokens) or not self.tokens[index].startswith(prefix):
+                return
+            end = bisect_right(self.tokens, self.tokens[index], index)
+            yield (self.events[self.event_ids[position]] for position in range(index, end))
+            index = end
+
+    def search(self, query, limit=DEFAULT_LIMIT, now=None):
+        """
+        Suggestions for what has been typed so far: every word must start
+        a word of the suggestion. Categories and locations come first,
+        then events, soonest first.
+        """
+        terms = words(query)
+        if not terms:
+            return []
+        now = now or timezone.now()
+        # Walk the longest term's tokens; the others only filter
+        scan_term = max(terms, key=len)
+
+        def matches(label_words):
+            return all(any(word.startswith(term) for word in label_words) for term in terms)
+
+        categories, locations = [], []
+        index = bisect_left(self.name_tokens, scan_term)
+        seen = set()
+        while index < len(self.name_tokens) and self.name_tokens[index].startswith(scan_term):
+            kind, key = ref = self.name_refs[index]
+            index += 1
+            if ref in seen:
+                continue
+            seen.add(ref)
+            names, found = (self.categories, categories) if kind == 'category' else (self.locations, locations)
+            label, count, label_words = names[key]
+            if matches(label_words):
+                found.append((key, label, count))
+
+        events, seen = [], set()
+        merged = heapq.merge(*self._runs(scan_term), key=lambda record: (record.date, record.id))
+        for record in merged:
+            if record.date < now or record.id in seen or not matches(record.words):
+                continue
+            seen.add(record.id)
+            events.append(record)
+            if len(events) == limit:
+                break
+
+        results = [
+            {'type': 'category', 'label': label, 'count': count,
+             'url': f"{reverse('event_list')}?category={key}"}
+            for key, label, count in sorted(categories, key=lambda found: -found[2])[:MAX_CATEGORIES]
+        ]
+        results += [
+            {'type': 'location', 'label': label, 'count': count,
+             'url': f"{reverse('event_list')}?search={'+'.join(words(label))}"}
+            for key, label, count in sorted(locations, key=lambda found: -found[2])[:MAX_LOCATIONS]
+        ]
+        results += [
+            {'type': 'event', 'label': record.title, 'detail': record.location,
+             'date': record.date.isoformat(), 'url': reverse('event_detail', args=[record.id])}
+            for record in events
+        ]
+        return results[:limit]
+
+
+# Per-process state
+
+_lock = threading.Lock()
+_index = None
+_version = 0
+_loaded_at = 0.0
+
+
+def _load(version):
+    global _index, _version, _loaded_at
+    from .models import Event
+
+    events = Event.objects.filter(is_active=True, date__gte=timezone.now()).select_related('category')
+    _index = TypeaheadIndex(record_for(event) for event in events.iterator(chunk_size=2000))
+    _version, _loaded_at = version, time.monotonic()
+    return _index
+
+
+def get_index():
+    """This worker's index, brought up to the shared version first"""
+    global _index, _version
+    shared = cache.get(VERSION_KEY, 0)
+    if _index is not None and shared == _version and time.monotonic() - _loaded_at < RELOAD_INTERVAL:
+        return _index
+
+    with _lock:
+        if _index is None or shared < _version or time.monotonic() - _loaded_at >= RELOAD_INTERVAL:
+            # First use, the cache lost the stamp, or time to drop past events
+            return _load(shared)
+
+        changes = cache.get_many([CHANGE_KEY.format(version) for version in range(_version + 1, shared + 1)])
+        if len(changes) < shared - _version:
+            return _load(shared)
+        # Lookups in other threads keep reading the old index unlocked,
+        # so the changes go into a copy that then replaces it
+        index = _index.copy()
+        for version in range(_version + 1, shared + 1):
+            index.upsert(*changes[CHANGE_KEY.format(version)])
+        _index, _version = index, shared
+        return index
+
+
+def publish(event_id, record):
+    """
+    Share a change to one event with every worker once the current
+    transaction commits. `record` None removes the event.
+    """
+    def send():
+        cache.add(VERSION_KEY, 0, None)
+        try:
+            version = cache.incr(VERSION_KEY)
+        except ValueError:
+            # The stamp was evicted; workers will see it go back and reload
+            return
+        cache.set(CHANGE_KEY.format(version), (event_id, record), CHANGE_TIMEOUT)
+    transaction.on_commit(send)
+
+
+def suggest(query, limit=DEFAULT_LIMIT):
+    return get_index().search(query, limit)
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from django.contrib.auth import views as auth_views
-from . import views, views_subscription
+from . import views, views_api, views_subscription
 from django.contrib.auth.decorators import user_passes_test, login_required
 from django.views.generic import TemplateView
 
@@ -11,7 +11,11 @@ from . import views_merchandise
 urlpatterns = [
     path('', views.home, name='home'),
     path('events/', views.event_list, name='event_list'),
+    path('events/autocomplete/', views.event_autocomplete, name='event_autocomplete'),
+    path('category/<slug:slug>/', views.category_events, name='category_events'),
     path('event/<int:pk>/', views.event_detail, name='event_detail'),
+    path('event/<int:pk>/availability/stream/', views.event_availability_stream, name='event_availability_stream'),
+    path('event/<int:pk>/waiting-room/status/', views.waiting_room_status, name='waiting_room_status'),
     path('checkout/<int:pk>/', views.checkout, name='checkout'),
     path('payment-success/', views.payment_success, name='payment_success'),
     path('ticket/<int:ticket_id>/', views.ticket_confirmation, name='ticket_confirmation'),
@@ -22,9 +26,11 @@ urlpatterns = [
     path('signup/buyer/', views.signup_buyer, name='signup_buyer'),
     path('signup/seller/', views.signup_seller, name='signup_seller'),
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('dashboard/panels/<slug:name>/', views.dashboard_panel, name='dashboard_panel'),
     path('create-event/', views.create_event, name='create_event'),
     path('edit-event/<int:pk>/', views.edit_event, name='edit_event'),
     path('events/<int:pk>/delete/', views.delete_event, name='delete_event'),
+    path('events/<int:pk>/attendees/export/', views.export_attendees, name='export_attendees'),
 
     path('create-payment-intent/<int:pk>/', views.create_payment_intent, name='create_payment_intent'),
     # path('ticket-confirmation/<str:payment_intent>/', views.ticket_confirmation, name='ticket_confirmation'),
@@ -43,7 +49,14 @@ urlpatterns = [
     
     # Admin URLs
     path('admin-dashboard/', user_passes_test(lambda u: u.is_staff)(views.admin_dashboard), name='admin_dashboard'),
+    path('admin-dashboard/page-cache/', views.page_cache_stats, name='page_cache_stats'),
     
+    # JSON API for the mobile app
+    path('api/v1/events/', views_api.event_list, name='api_event_list'),
+    path('api/v1/events/<int:pk>/', views_api.event_detail, name='api_event_detail'),
+    path('api/v1/events/<int:pk>/availability/', views_api.event_availability, name='api_event_availability'),
+    path('api/v1/categories/', views_api.category_list, name='api_category_list'),
+
     # M-Pesa Callback URL
     path('api/mpesa/callback/', views.mpesa_callback, name='mpesa_callback'),
     
@@ -0,0 +1,169 @@
+"""
+Read-only JSON API for the mobile app, version 1.
+
+Every response carries an ETag and Last-Modified taken from the page
+cache versions (events.page_cache): the listing version for the event
+list and categories, the event's own version for its detail and
+availability. Those versions move whenever the event, its ticket
+categories or its stock change, so a repeat poll with If-None-Match or
+If-Modified-Since is answered 304 from one cache lookup, without
+touching the database.
+
+Events leave the list when they start, and ticket categories go on and
+off sale, without bumping any version, so every validator also rolls
+over every LISTING_REFRESH seconds.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, JsonResponse
+from django.utils import timezone
+from django.views.decorators.http import condition, require_safe
+
+from . import availability, page_cache
+from .models import Category, Event
+from .pagination import paginate_events
+
+API_VERSION = 1
+LISTING_REFRESH = 5 * 60
+
+
+def api_response(data, status=200):
+    """JSON without whitespace"""
+    return JsonResponse(data, status=status, encoder=DjangoJSONEncoder, json_dumps_params={'separators': (',', ':')})
+
+
+# Validators. condition() asks for the ETag and Last-Modified separately,
+# so the version lookup is kept on the request.
+
+def _aware(value):
+    # condition() would read a naive time as UTC rather than local time
+    return value if timezone.is_aware(value) else timezone.make_aware(value)
+
+
+def _state(version_key, path):
+    """(ETag, Last-Modified) for a response built from `version_key`'s data"""
+    version, modified = page_cache.version_state(version_key)
+    now = _aware(timezone.now())
+    period, elapsed = divmod(now.timestamp(), LISTING_REFRESH)
+    tag = f'{version}:{period:.0f}:{path}'
+    return hashlib.md5(tag.encode()).hexdigest(), max(_aware(modified), now - timedelta(seconds=elapsed))
+
+
+def _listing_state(request):
+    if not hasattr(request, '_api_state'):
+        # The query string picks the page, so it is part of the tag
+        request._api_state = _state(page_cache.LISTING_VERSION_KEY, request.get_full_path())
+    return request._api_state
+
+
+def _event_state(request, pk):
+    if not hasattr(request, '_api_state'):
+        # on_sale depends on the time as well as the version
+        request._api_state = _state(page_cache.event_version_key(pk), request.path)
+    return request._api_state
+
+
+def listing_conditions(view):
+    return require_safe(condition(
+        etag_func=lambda request, *args, **kwargs: _listing_state(request)[0],
+        last_modified_func=lambda request, *args, **kwargs: _listing_state(request)[1],
+    )(view))
+
+
+def event_conditions(view):
+    return require_safe(condition(
+        etag_func=lambda request, pk: _event_state(request, pk)[0],
+        last_modified_func=lambda request, pk: _event_state(request, pk)[1],
+    )(view))
+
+
+# Serialization
+
+def _price(value):
+    # Aggregates can come back as Decimal('500') rather than Decimal('500.00')
+    return None if value is None else f'{value:.2f}'
+
+
+def _ticket_category_data(category, now):
+    return {
+        'id': category.pk,
+        'name': category.name,
+        'type': category.category_type,
+        'price': _price(category.price),
+        'available': category.available_tickets,
+        'max_per_purchase': category.max_tickets_per_purchase,
+        'sales_start': category.sales_start,
+        'sales_end': category.sales_end,
+        'on_sale': category.available_tickets > 0 and category.sales_start <= now <= category.sales_end,
+    }
+
+
+def _event_summary(event, lowest_price):
+    return {
+        'id': event.pk,
+        'title': event.title,
+        'date': event.date,
+        'location': event.location,
+        'category': event.category.slug if event.category else None,
+        'image': event.image.url if event.image else None,
+        'lowest_price': _price(lowest_price),
+    }
+
+
+def _get_event(pk, *related):
+    try:
+        return Event.objects.select_related('category', *related).get(pk=pk, is_active=True)
+    except Event.DoesNotExist:
+        raise Http404('No such event')
+
+
+# Endpoints
+
+@listing_conditions
+def event_list(request):
+    """Upcoming events soonest first, a page at a time; ?category=<slug> narrows them"""
+    events = Event.objects.filter(is_active=True, date__gte=timezone.now()).select_related('category')
+    if request.GET.get('category'):
+        events = events.filter(category__slug=request.GET['category'])
+    events, next_cursor = paginate_events(events.with_listing_stats(), request.GET.get('cursor'))
+    return api_response({
+        'version': API_VERSION,
+        'events': [_event_summary(event, event.min_ticket_price) for event in events],
+        'next_cursor': next_cursor,
+    })
+
+
+@event_conditions
+def event_detail(request, pk):
+    event = _get_event(pk, 'venue')
+    now = timezone.now()
+    categories = list(event.ticket_categories.all())
+    data = _event_summary(event, min((category.price for category in categories), default=None))
+    data.update({
+        'description': event.description,
+        'venue': {
+            'name': event.venue.name,
+            'latitude': event.venue.latitude,
+            'longitude': event.venue.longitude,
+        } if event.venue else None,
+        'url': event.get_absolute_url(),
+        'ticket_categories': [_ticket_category_data(category, now) for category in categories],
+    })
+    return api_response({'version': API_VERSION, 'event': data})
+
+
+@event_conditions
+def event_availability(request, pk):
+    """Tickets left per ticket category, from a cache kept for a couple of seconds"""
+    data = availability.snapshot(pk)
+    if data is None:
+        raise Http404('No such event')
+    return api_response({'version': API_VERSION, **data})
+
+
+@listing_conditions
+def category_list(request):
+    categories = [{'name': category.name, 'slug': category.slug} for category in Category.objects.order_by('name')]
+    return api_response({'version': API_VERSION, 'categories': categories})
@@ -0,0 +1,237 @@
+"""
+Virtual waiting room for high-demand on-sales.
+
+When an organizer switches it on for an event, each visitor gets a queue
+position in a signed cookie (django.core.signing, so nothing is stored
+per visitor). Visitors are admitted when the admission frontier reaches
+their position. The frontier moves forward at the event's rate:
+
+    frontier = base + rate * (now - at)
+
+`base`, `at` and `rate` live in the cache, so working out whether someone
+is admitted is a cache read and a little arithmetic. The status endpoint
+that queued visitors poll never touches the database.
+
+Every few seconds a gated request re-tunes the rate from the number of
+active ticket holds, i.e. checkouts in progress. The full rate applies
+until the backlog reaches half of what the hold TTL allows, then it falls
+off linearly so payments can drain before more visitors are let in.
+
+The counters must live in a cache shared by every worker (see CACHES).
+"""
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.shortcuts import render
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Event, TicketHold
+
+COOKIE_PREFIX = 'waiting_room_'
+SIGNING_SALT = 'events.waiting_room'
+
+# How long a queue position and an admission stay valid
+QUEUE_TOKEN_MAX_AGE = 6 * 60 * 60
+ADMISSION_MAX_AGE = 30 * 60
+
+# How often a gated request re-reads the hold backlog to tune the rate
+TUNE_INTERVAL = 10
+# Never slow admissions below this share of the configured rate
+MIN_RATE_FACTOR = 0.1
+# How long an event's waiting room settings are cached
+CONFIG_TIMEOUT = 30
+STATE_TIMEOUT = 24 * 60 * 60
+
+
+class WaitingRoom:
+    """Queue positions and the admission frontier for one event"""
+
+    def __init__(self, event_id):
+        self.event_id = event_id
+
+    def _key(self, name):
+        return f'waiting_room:{self.event_id}:{name}'
+
+    @property
+    def cookie_name(self):
+        return f'{COOKIE_PREFIX}{self.event_id}'
+
+    # Tokens
+
+    def read_token(self, request):
+        """Return the visitor's verified token payload, or None"""
+        value = request.COOKIES.get(self.cookie_name)
+        if not value:
+            return None
+        try:
+            payload = signing.loads(value, salt=SIGNING_SALT, max_age=QUEUE_TOKEN_MAX_AGE)
+            if payload.get('e') != self.event_id:
+                return None
+            if payload.get('a'):
+                # Admissions are short-lived; re-check with the tighter age
+                signing.loads(value, salt=SIGNING_SALT, max_age=ADMISSION_MAX_AGE)
+        except signing.BadSignature:
+            return None
+        return payload
+
+    def set_token(self, response, position, admitted=False):
+        payload = {'e': self.event_id, 'p': position}
+        if admitted:
+            payload['a'] = 1
+        response.set_cookie(
+            self.cookie_name,
+            signing.dumps(payload, salt=SIGNING_SALT),
+            max_age=ADMISSION_MAX_AGE if admitted else QUEUE_TOKEN_MAX_AGE,
+            httponly=True,
+            samesite='Lax',
+        )
+        return response
+
+    # Admission frontier
+
+    def frontier(self, now=None):
+        """How many queue positions have been admitted, or None if no state is cached"""
+        state = cache.get(self._key('state'))
+        if state is None:
+            return None
+        now = time.time() if now is None else now
+        return state['base'] + state['rate'] * max(0.0, now - state['at'])
+
+    def rate(self):
+        state = cache.get(self._key('state'))
+        return state['rate'] if state else None
+
+    def _rebase(self, base, rate):
+        cache.set(self._key('state'), {'base': base, 'at': time.time(), 'rate': rate}, STATE_TIMEOUT)
+
+    def join(self, rate_per_minute):
+        """Give a new visitor the next queue position"""
+        issued_key = self._key('issued')
+        cache.add(issued_key, 0, STATE_TIMEOUT)
+        position = cache.incr(issued_key)
+
+        frontier = self.frontier()
+        if frontier is None or frontier >= position:
+            # First visitor, or the room was idle and the frontier ran
+            # ahead: admit this visitor and start the frontier here, so a
+            # burst arriving right after still queues at the set rate.
+            rate = self.rate()
+            self._rebase(position, rate_per_minute / 60 if rate is None else rate)
+        return position
+
+    def is_admitted(self, position):
+        frontier = self.frontier()
+        return frontier is not None and position <= frontier
+
+    def tune(self, rate_per_minute):
+        """Adjust the admission rate to the checkout backlog, at most every TUNE_INTERVAL seconds"""
+        if not cache.add(self._key('tuned'), 1, TUNE_INTERVAL):
+            return
+
+        backlog = TicketHold.objects.filter(
+            event_id=self.event_id,
+            status='active',
+            expires_at__gt=timezone.now()
+        ).count()
+        capacity = max(1.0, rate_per_minute * settings.TICKET_HOLD_TTL / 60)
+        factor = min(1.0, max(MIN_RATE_FACTOR, 2 * (1 - backlog / capacity)))
+        rate = rate_per_minute / 60 * factor
+
+        issued = cache.get(self._key('issued'), 0)
+        frontier = self.frontier()
+        base = issued if frontier is None else min(frontier, issued)
+        self._rebase(base, rate)
+
+    def status(self, payload):
+        """Queue status for a token payload; cache reads only"""
+        if payload is None:
+            return {'queued': False, 'admitted': False}
+        position = payload['p']
+        if payload.get('a'):
+            return {'queued': True, 'admitted': True, 'position': position, 'ahead': 0, 'wait_seconds': 0}
+
+        frontier = self.frontier()
+        if frontier is None:
+            return {'queued': True, 'admitted': False, 'position': position, 'ahead': None, 'wait_seconds': None}
+
+        remaining = max(0.0, position - frontier)
+        rate = self.rate()
+        return {
+            'queued': True,
+            'admitted': remaining == 0,
+            'position': position,
+            'ahead': max(0, math.ceil(remaining) - 1),
+            'wait_seconds': math.ceil(remaining / rate) if rate else None,
+        }
+
+
+def get_waiting_room_config(event_id):
+    """(enabled, rate per minute, title) for an event, cached for CONFIG_TIMEOUT seconds"""
+    key = f'waiting_room:{event_id}:config'
+    config = cache.get(key)
+    if config is None:
+        config = Event.objects.filter(pk=event_id).values_list(
+            'waiting_room_enabled', 'waiting_room_rate', 'title'
+        ).first() or (False, 0, '')
+        cache.set(key, config, CONFIG_TIMEOUT)
+    return config
+
+
+def waiting_room_gate(api=False):
+    """
+    Only let admitted visitors through to a view taking the event `pk`.
+
+    Page views render the waiting room for queued visitors; api views
+    answer 429 with the status URL instead.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, pk, *args, **kwargs):
+            enabled, rate, title = get_waiting_room_config(pk)
+            if not enabled:
+                return view(request, pk, *args, **kwargs)
+
+            room = WaitingRoom(pk)
+            payload = room.read_token(request)
+            if payload and payload.get('a'):
+                return view(request, pk, *args, **kwargs)
+
+            if payload is None and api:
+                return JsonResponse({
+                    'success': False,
+                    'error': 'Please join the waiting room for this event first.',
+                    'waiting_room_url': reverse('event_detail', kwargs={'pk': pk}),
+                }, status=429)
+
+            position = payload['p'] if payload else room.join(rate)
+            room.tune(rate)
+
+            if room.is_admitted(position):
+                response = view(request, pk, *args, **kwargs)
+                return room.set_token(response, position, admitted=True)
+
+            if api:
+                response = JsonResponse({
+                    'success': False,
+                    'error': 'You are still in the waiting room for this event.',
+                    'status_url': reverse('waiting_room_status', kwargs={'pk': pk}),
+                }, status=429)
+            else:
+                response = render(request, 'events/waiting_room.html', {
+                    'event_id': pk,
+                    'event_title': title,
+                    'status': room.status({'p': position}),
+                    'status_url': reverse('waiting_room_status', kwargs={'pk': pk}),
+                })
+            if payload is None:
+                room.set_token(response, position)
+            return response
+        return wrapped
+    return decorator
+
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from payments.models import Transaction
+from payments.models import MpesaCallback, StripeEvent, Transaction
 
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
@@ -8,4 +8,19 @@ class TransactionAdmin(admin.ModelAdmin):
     search_fields = ('phone_number', 'buyer_name', 'buyer_email')
     list_filter = ('status', 'event')
 
+@admin.register(MpesaCallback)
+class MpesaCallbackAdmin(admin.ModelAdmin):
+    ordering = ("-received_at",)
+    list_display = ('checkout_request_id', 'receipt_number', 'result_code', 'transaction', 'received_at')
+    search_fields = ('checkout_request_id', 'receipt_number')
+    readonly_fields = ('received_at',)
+
+@admin.register(StripeEvent)
+class StripeEventAdmin(admin.ModelAdmin):
+    ordering = ("-received_at",)
+    list_display = ('event_id', 'event_type', 'payment_intent_id', 'status', 'received_at', 'processed_at')
+    search_fields = ('event_id', 'payment_intent_id')
+    list_filter = ('status', 'event_type')
+    readonly_fields = ('received_at', 'processed_at')
+
 # Register your models here.
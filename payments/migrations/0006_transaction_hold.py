@@ -0,0 +1,20 @@
+# Generated by Django 4.2.7 on 2026-10-16 19:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0012_tickethold'),
+        ('payments', '0005_transaction_checkout_request_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='hold',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transaction', to='events.tickethold'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-16 19:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0006_transaction_hold'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MpesaCallback',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('checkout_request_id', models.CharField(max_length=100, unique=True)),
+                ('receipt_number', models.CharField(blank=True, max_length=50, null=True, unique=True)),
+                ('result_code', models.IntegerField(blank=True, null=True)),
+                ('payload', models.JSONField(default=dict)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('transaction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='callbacks', to='payments.transaction')),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-16 19:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0007_mpesacallback'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='per_attendee',
+            field=models.BooleanField(default=False, help_text='Issue one ticket per attendee instead of one ticket for the whole quantity'),
+        ),
+    ]
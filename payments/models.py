@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from events.models import Event, TicketCategory
 import uuid
 
@@ -31,6 +32,13 @@ class Transaction(models.Model):
     # M-Pesa specific fields
     checkout_request_id = models.CharField(max_length=100, blank=True, null=True)
     # merchant_request_id = models.CharField(max_length=100, blank=True, null=True)
+    hold = models.OneToOneField(
+        'events.TicketHold',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='transaction'
+    )
     
     # Event and ticket related fields
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='transactions')
@@ -39,6 +47,7 @@ class Transaction(models.Model):
     buyer_email = models.EmailField()
     buyer_phone = models.CharField(max_length=20, blank=True)
     quantity = models.PositiveIntegerField(default=1)
+    per_attendee = models.BooleanField(default=False, help_text="Issue one ticket per attendee instead of one ticket for the whole quantity")
     
     def save(self, *args, **kwargs):
         if not self.transaction_id:
@@ -47,4 +56,54 @@ class Transaction(models.Model):
     
     def __str__(self):
         return f"{self.transaction_id} - {self.buyer_name} - {self.amount} - {self.status}"
-# Create your models here.
+
+
+class MpesaCallback(models.Model):
+    """
+    Ledger of processed M-Pesa STK callbacks. Safaricom retries callbacks,
+    so a row is written in the same database transaction as the callback's
+    effects and any later delivery of the same CheckoutRequestID or
+    MpesaReceiptNumber is ignored.
+    """
+    checkout_request_id = models.CharField(max_length=100, unique=True)
+    receipt_number = models.CharField(max_length=50, unique=True, blank=True, null=True)
+    result_code = models.IntegerField(blank=True, null=True)
+    transaction = models.ForeignKey(
+        Transaction,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='callbacks'
+    )
+    payload = models.JSONField(default=dict)
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.checkout_request_id} - {self.result_code}"
+
+
+class StripeEvent(models.Model):
+    """
+    Stripe webhook events, recorded once per Stripe event id when the
+    signed webhook arrives, each with a FulfillmentJob that the
+    fulfillment worker runs (run_fulfillment_worker). Stripe redelivers
+    events until it gets a 2xx, so the unique event_id makes every
+    redelivery a no-op.
+    """
+    STATUS_CHOICES = (
+        ('received', 'Received'),
+        ('processed', 'Processed'),
+        ('failed', 'Failed'),
+    )
+
+    event_id = models.CharField(max_length=255, unique=True)
+    event_type = models.CharField(max_length=100)
+    payment_intent_id = models.CharField(max_length=255, blank=True, db_index=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='received')
+    last_error = models.TextField(blank=True)
+    payload = models.JSONField(default=dict)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.event_id} - {self.event_type} - {self.status}"
@@ -1,10 +1,18 @@
 import base64
+import json
 import requests
+import stripe
 from datetime import datetime
 from django.conf import settings
-from .models import Transaction
-from events.models import Ticket
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import MpesaCallback, StripeEvent, Transaction
+from events.models import Ticket, TicketHold
 from events.models import Event, TicketCategory
+from events.inventory import InventoryService, InsufficientTickets
+from events.fulfillment import enqueue_stripe_event
+from events.ticketing import issue_tickets
 from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
 
@@ -27,7 +35,7 @@ class MpesaService:
         data_to_encode = f'{self.shortcode}{self.passkey}{timestamp}'
         return base64.b64encode(data_to_encode.encode()).decode(), timestamp
 
-    def initiate_stk_push(self, phone,user, amount, event_id, ticket_category_id, buyer_name, buyer_email, buyer_phone, quantity, callback_url):
+    def initiate_stk_push(self, phone,user, amount, event_id, ticket_category_id, buyer_name, buyer_email, buyer_phone, quantity, callback_url, hold=None, per_attendee=False):
         """Initiate STK push and create transaction record"""
         access_token = self.generate_access_token()
         password, timestamp = self.generate_password()
@@ -48,7 +56,9 @@ class MpesaService:
             buyer_phone=buyer_phone,
             quantity=quantity,
             payment_method='mpesa',
-            status='pending'
+            status='pending',
+            hold=hold,
+            per_attendee=per_attendee
         )
 
         headers = {
@@ -98,52 +108,83 @@ class MpesaService:
         }
 
     def process_callback(self, callback_data):
-        """Process the callback data from M-Pesa"""
+        """
+        Process the callback data from M-Pesa exactly once.
+
+        The callback is recorded in the MpesaCallback ledger in the same
+        database transaction as its effects. A retried delivery costs one
+        indexed lookup and writes nothing.
+        """
         stk_callback = callback_data.get('Body', {}).get('stkCallback', {})
         result_code = stk_callback.get('ResultCode')
         checkout_request_id = stk_callback.get('CheckoutRequestID')
-        result_desc = stk_callback.get('ResultDesc', '')
+        
+        processed = MpesaCallback.objects.filter(
+            checkout_request_id=checkout_request_id
+        ).values_list('result_code', flat=True)[:1]
+        if processed:
+            print(f"Duplicate callback ignored for checkout_request_id: {checkout_request_id}")
+            return processed[0] == 0
         
         transaction = Transaction.objects.filter(checkout_request_id=checkout_request_id).first()
         if not transaction:
             print(f"Transaction not found for checkout_request_id: {checkout_request_id}")
             return False
         
+        callback_metadata = stk_callback.get('CallbackMetadata', {}).get('Item', [])
+        receipt_number = next((item['Value'] for item in callback_metadata if item['Name'] == 'MpesaReceiptNumber'), None)
+        
+        with db_transaction.atomic():
+            try:
+                with db_transaction.atomic():
+                    MpesaCallback.objects.create(
+                        checkout_request_id=checkout_request_id,
+                        receipt_number=receipt_number,
+                        result_code=result_code,
+                        transaction=transaction,
+                        payload=callback_data
+                    )
+            except IntegrityError:
+                # A concurrent delivery of the same callback got there first
+                print(f"Duplicate callback ignored for checkout_request_id: {checkout_request_id}")
+                return False
+            
+            return self._apply_callback(transaction, stk_callback, receipt_number)
+
+    def _apply_callback(self, transaction, stk_callback, receipt_number):
+        """Update the transaction and issue tickets for a first-time callback"""
+        result_code = stk_callback.get('ResultCode')
+        result_desc = stk_callback.get('ResultDesc', '')
+        
         if result_code == 0:
             # Payment successful
-            callback_metadata = stk_callback.get('CallbackMetadata', {}).get('Item', [])
-            receipt_number = next((item['Value'] for item in callback_metadata if item['Name'] == 'MpesaReceiptNumber'), None)
-            
             transaction.status = "success"
             transaction.receipt_number = receipt_number
             transaction.transaction_date = datetime.now()
             transaction.save()
             
-            # Create ticket
-            ticket = Ticket.objects.create(
-                event=transaction.event,
-                ticket_category=transaction.ticket_category,
-                buyer_name=transaction.buyer_name,
-                buyer_email=transaction.buyer_email,
-                buyer_phone=transaction.buyer_phone,
-                quantity=transaction.quantity,
-                unit_price=transaction.ticket_category.price,
-                total_amount=transaction.amount,
-                transaction_code=transaction.receipt_number
-            )
-            
-            # Update available tickets
-            transaction.ticket_category.available_tickets -= transaction.quantity
-            transaction.ticket_category.save()
-            
-            transaction.event.available_tickets -= transaction.quantity
-            transaction.event.save()
+            # Take the tickets and create the ticket record together
+            try:
+                issue_tickets(
+                    event=transaction.event,
+                    ticket_category=transaction.ticket_category,
+                    quantity=transaction.quantity,
+                    buyer_name=transaction.buyer_name,
+                    buyer_email=transaction.buyer_email,
+                    buyer_phone=transaction.buyer_phone,
+                    per_attendee=transaction.per_attendee,
+                    hold=transaction.hold,
+                    transaction_code=transaction.receipt_number,
+                    buyer=transaction.user
+                )
+            except InsufficientTickets:
+                transaction.description = "Payment received but the ticket category sold out. Refund required."
+                transaction.save()
+                print(f"Transaction {transaction.transaction_id} paid but sold out: {receipt_number}")
+                return False
             
             print(f"Transaction successful: {receipt_number}")
             
-            # Send ticket email
-            # self.send_ticket_email(ticket)
-            
             return True
             
         elif result_code == 1:
@@ -170,6 +211,10 @@ class MpesaService:
             transaction.description = f"Unhandled result code: {result_code}. {result_desc}"
             transaction.save()
             print(f"Unknown transaction status: {result_desc}")
+        
+        # Payment did not go through, give the held tickets back straight away
+        if transaction.hold and transaction.status in ('failed', 'cancelled'):
+            InventoryService().release_hold(transaction.hold)
             
         return False
 
@@ -211,4 +256,135 @@ class MpesaService:
                 'amount': transaction.amount
             }
         except Transaction.DoesNotExist:
-            return None
\ No newline at end of file
+            return None
+
+
+class StripeWebhookService:
+    """
+    Signed Stripe webhooks, recorded on arrival and fulfilled by the
+    fulfillment worker.
+
+    The webhook view only verifies the signature and writes a StripeEvent
+    row with a 'stripe' FulfillmentJob, so Stripe gets its 200 straight
+    away and no request ever waits on ticket issuance. The job queue
+    (events.fulfillment) claims, leases and retries the work.
+    """
+    HANDLED_EVENTS = (
+        'payment_intent.succeeded',
+        'payment_intent.payment_failed',
+        'payment_intent.canceled',
+    )
+
+    def __init__(self):
+        self.webhook_secret = settings.STRIPE_WEBHOOK_SECRET
+
+    def record_event(self, payload, signature):
+        """
+        Verify a webhook delivery and record it once.
+
+        Returns the StripeEvent, or None for event types we do not handle.
+        Raises ValueError or stripe.error.SignatureVerificationError for a
+        payload that did not come from Stripe.
+        """
+        event = stripe.Webhook.construct_event(payload, signature, self.webhook_secret)
+        if event['type'] not in self.HANDLED_EVENTS:
+            return None
+
+        data_object = event['data']['object']
+        with db_transaction.atomic():
+            stripe_event, created = StripeEvent.objects.get_or_create(
+                event_id=event['id'],
+                defaults={
+                    'event_type': event['type'],
+                    'payment_intent_id': data_object.get('id', ''),
+                    'payload': json.loads(payload),
+                }
+            )
+            if created:
+                enqueue_stripe_event(stripe_event)
+        if not created:
+            print(f"Duplicate Stripe event ignored: {event['id']}")
+        return stripe_event
+
+    def process_event(self, stripe_event, final_attempt=True):
+        """
+        Apply one recorded event; run by its FulfillmentJob. Returns True
+        once it is processed, False if the tickets sold out meanwhile.
+        Other errors are recorded and raised, so the job is retried; on
+        the `final_attempt` the event is marked failed.
+        """
+        intent = stripe_event.payload['data']['object']
+        try:
+            with db_transaction.atomic():
+                # Lock every recorded event of this payment intent. A worker
+                # that re-claimed this job after its lease expired, or one
+                # running another event for the same intent, waits here and
+                # then sees the first one's work instead of repeating it.
+                locked = dict(
+                    StripeEvent.objects.select_for_update().filter(
+                        Q(pk=stripe_event.pk) | Q(payment_intent_id=intent['id'])
+                    ).order_by('pk').values_list('pk', 'status')
+                )
+                if locked.get(stripe_event.pk) != 'received':
+                    return locked.get(stripe_event.pk) == 'processed'
+                if stripe_event.event_type == 'payment_intent.succeeded':
+                    # Subscriptions and other payments are recorded and left alone
+                    if self._is_ticket_purchase(intent):
+                        self._fulfill(intent)
+                else:
+                    self._release(intent)
+                StripeEvent.objects.filter(pk=stripe_event.pk).update(
+                    status='processed',
+                    processed_at=timezone.now(),
+                    last_error=''
+                )
+        except InsufficientTickets:
+            StripeEvent.objects.filter(pk=stripe_event.pk).update(
+                status='failed',
+                last_error="Payment received but the ticket category sold out. Refund required."
+            )
+            print(f"Payment intent {intent['id']} paid but sold out")
+            return False
+        except Exception as e:
+            StripeEvent.objects.filter(pk=stripe_event.pk).update(
+                status='failed' if final_attempt else 'received',
+                last_error=str(e)
+            )
+            print(f"Error processing Stripe event {stripe_event.event_id}: {e}")
+            raise
+        return True
+
+    @staticmethod
+    def _is_ticket_purchase(intent):
+        metadata = intent.get('metadata') or {}
+        return bool(
+            metadata.get('event_id') and metadata.get('quantity')
+            and (metadata.get('ticket_category_id') or metadata.get('category_id'))
+        )
+
+    def _fulfill(self, intent):
+        # Safe to check then issue: process_event holds the intent's event rows
+        if Ticket.objects.filter(stripe_payment_intent_id=intent['id']).exists():
+            return
+
+        metadata = intent.get('metadata') or {}
+        hold_id = metadata.get('hold_id')
+        issue_tickets(
+            event=Event.objects.get(id=metadata['event_id']),
+            ticket_category=TicketCategory.objects.get(
+                id=metadata.get('ticket_category_id') or metadata.get('category_id')
+            ),
+            quantity=int(metadata['quantity']),
+            buyer_name=metadata.get('buyer_name', ''),
+            buyer_email=metadata.get('buyer_email', ''),
+            buyer_phone=metadata.get('buyer_phone', ''),
+            per_attendee=metadata.get('per_attendee') == '1',
+            hold=TicketHold.objects.filter(id=hold_id).first() if hold_id else None,
+            stripe_payment_intent_id=intent['id']
+        )
+
+    def _release(self, intent):
+        hold_id = (intent.get('metadata') or {}).get('hold_id')
+        hold = TicketHold.objects.filter(id=hold_id).select_related('ticket_category').first() if hold_id else None
+        if hold:
+            InventoryService().release_hold(hold)
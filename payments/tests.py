@@ -1,3 +1,198 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import json
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from events.fulfillment import process_jobs
+from events.models import Event, FulfillmentJob, Ticket, TicketCategory, User
+
+from .models import MpesaCallback, StripeEvent, Transaction
+from .services import MpesaService, StripeWebhookService
+
+WEBHOOK_SECRET = 'whsec_test'
+
+
+def mpesa_callback(checkout_request_id, result_code=0, receipt_number='QK123ABC'):
+    """An STK push callback body as M-Pesa posts it"""
+    return {'Body': {'stkCallback': {
+        'MerchantRequestID': 'merchant-1',
+        'CheckoutRequestID': checkout_request_id,
+        'ResultCode': result_code,
+        'ResultDesc': 'The service request is processed successfully.',
+        'CallbackMetadata': {'Item': [
+            {'Name': 'Amount', 'Value': 1000},
+            {'Name': 'MpesaReceiptNumber', 'Value': receipt_number},
+        ]},
+    }}}
+
+
+def sign(payload, secret=WEBHOOK_SECRET):
+    """A Stripe-Signature header for `payload`"""
+    timestamp = int(time.time())
+    signature = hmac.new(secret.encode(), f'{timestamp}.{payload}'.encode(), hashlib.sha256).hexdigest()
+    return f't={timestamp},v1={signature}'
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET)
+class StripeWebhookTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = User.objects.create_user(username='organizer', password='password', is_seller=True)
+        now = timezone.now()
+        cls.event = Event.objects.create(
+            organizer=cls.organizer, title='Card Event', description='Stripe test event',
+            date=now + timedelta(days=7), location='Nairobi',
+        )
+        cls.ticket_category = TicketCategory.objects.create(
+            event=cls.event, name='Regular', category_type='regular', price=500,
+            available_tickets=100, max_tickets_per_purchase=5,
+            sales_start=now - timedelta(days=1), sales_end=now + timedelta(days=30),
+        )
+
+    def payload(self, event_id='evt_1', intent_id='pi_1', event_type='payment_intent.succeeded'):
+        return json.dumps({
+            'id': event_id,
+            'object': 'event',
+            'type': event_type,
+            'data': {'object': {
+                'id': intent_id,
+                'object': 'payment_intent',
+                'metadata': {
+                    'event_id': str(self.event.pk),
+                    'ticket_category_id': str(self.ticket_category.pk),
+                    'quantity': '2',
+                    'buyer_name': 'Buyer',
+                    'buyer_email': 'buyer@example.com',
+                },
+            }},
+        })
+
+    def record(self, **kwargs):
+        payload = self.payload(**kwargs)
+        return StripeWebhookService().record_event(payload, sign(payload))
+
+    def test_bad_signature_is_rejected(self):
+        payload = self.payload()
+        response = self.client.post(
+            reverse('stripe_webhook'), payload, content_type='application/json',
+            HTTP_STRIPE_SIGNATURE=sign(payload, 'whsec_other')
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(StripeEvent.objects.exists())
+
+    def test_redelivery_is_recorded_once(self):
+        payload = self.payload()
+        for _ in range(2):
+            response = self.client.post(
+                reverse('stripe_webhook'), payload, content_type='application/json', HTTP_STRIPE_SIGNATURE=sign(payload)
+            )
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(StripeEvent.objects.count(), 1)
+        self.assertEqual(FulfillmentJob.objects.filter(kind='stripe').count(), 1)
+
+    def test_fulfillment_worker_issues_the_tickets(self):
+        stripe_event = self.record()
+        self.assertEqual(process_jobs('worker-1'), (1, 0))
+        stripe_event.refresh_from_db()
+        self.assertEqual(stripe_event.status, 'processed')
+        ticket = Ticket.objects.get(stripe_payment_intent_id='pi_1')
+        self.assertEqual((ticket.quantity, ticket.status), (2, 'confirmed'))
+
+    def test_reprocessing_an_event_issues_nothing(self):
+        stripe_event = self.record()
+        service = StripeWebhookService()
+        self.assertTrue(service.process_event(stripe_event))
+        # A second worker picking the job up after its lease ran out
+        self.assertTrue(service.process_event(StripeEvent.objects.get(pk=stripe_event.pk)))
+        self.assertEqual(Ticket.objects.filter(stripe_payment_intent_id='pi_1').count(), 1)
+
+    def test_second_event_for_the_same_intent_issues_nothing(self):
+        service = StripeWebhookService()
+        service.process_event(self.record(event_id='evt_1'))
+        service.process_event(self.record(event_id='evt_2'))
+        self.assertEqual(Ticket.objects.filter(stripe_payment_intent_id='pi_1').count(), 1)
+        self.ticket_category.refresh_from_db()
+        self.assertEqual(self.ticket_category.available_tickets, 98)
+
+    def test_payments_that_are_not_ticket_purchases_are_left_alone(self):
+        payload = json.dumps({
+            'id': 'evt_sub', 'object': 'event', 'type': 'payment_intent.succeeded',
+            'data': {'object': {'id': 'pi_sub', 'object': 'payment_intent', 'metadata': {'plan': 'premium'}}},
+        })
+        stripe_event = StripeWebhookService().record_event(payload, sign(payload))
+        self.assertEqual(process_jobs('worker-1'), (1, 0))
+        stripe_event.refresh_from_db()
+        self.assertEqual(stripe_event.status, 'processed')
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_errors_are_retried_then_fail_the_event(self):
+        stripe_event = self.record()
+        job = FulfillmentJob.objects.get(stripe_event=stripe_event)
+        with mock.patch.object(StripeWebhookService, '_fulfill', side_effect=RuntimeError('database went away')):
+            self.assertEqual(process_jobs('worker-1'), (0, 1))
+            job.refresh_from_db()
+            stripe_event.refresh_from_db()
+            self.assertEqual((job.status, stripe_event.status), ('queued', 'received'))
+
+            FulfillmentJob.objects.filter(pk=job.pk).update(run_after=timezone.now(), attempts=job.max_attempts - 1)
+            self.assertEqual(process_jobs('worker-1'), (0, 1))
+        job.refresh_from_db()
+        stripe_event.refresh_from_db()
+        self.assertEqual((job.status, stripe_event.status), ('failed', 'failed'))
+        self.assertEqual(stripe_event.last_error, 'database went away')
+        self.assertFalse(Ticket.objects.exists())
+
+
+class MpesaCallbackTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = User.objects.create_user(username='organizer', password='password', is_seller=True)
+        now = timezone.now()
+        cls.event = Event.objects.create(
+            organizer=cls.organizer, title='M-Pesa Event', description='M-Pesa test event',
+            date=now + timedelta(days=7), location='Nairobi',
+        )
+        cls.ticket_category = TicketCategory.objects.create(
+            event=cls.event, name='Regular', category_type='regular', price=500,
+            available_tickets=100, max_tickets_per_purchase=5,
+            sales_start=now - timedelta(days=1), sales_end=now + timedelta(days=30),
+        )
+
+    def setUp(self):
+        self.transaction = Transaction.objects.create(
+            phone_number='254700000000', amount=1000, event=self.event, ticket_category=self.ticket_category,
+            buyer_name='Buyer', buyer_email='buyer@example.com', quantity=2, checkout_request_id='ws_CO_1',
+        )
+
+    def test_successful_callback_issues_the_tickets(self):
+        self.assertTrue(MpesaService().process_callback(mpesa_callback('ws_CO_1')))
+        self.transaction.refresh_from_db()
+        self.assertEqual((self.transaction.status, self.transaction.receipt_number), ('success', 'QK123ABC'))
+        ticket = Ticket.objects.get(event=self.event)
+        self.assertEqual((ticket.quantity, ticket.status), (2, 'confirmed'))
+
+    def test_replayed_callback_writes_nothing(self):
+        service = MpesaService()
+        service.process_callback(mpesa_callback('ws_CO_1'))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(service.process_callback(mpesa_callback('ws_CO_1')))
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(queries[0]['sql'].startswith('SELECT'))
+        self.assertEqual(Ticket.objects.count(), 1)
+        self.assertEqual(MpesaCallback.objects.count(), 1)
+
+    def test_replayed_failure_stays_failed(self):
+        service = MpesaService()
+        self.assertFalse(service.process_callback(mpesa_callback('ws_CO_1', result_code=1032)))
+        self.assertFalse(service.process_callback(mpesa_callback('ws_CO_1')))
+        self.transaction.refresh_from_db()
+        self.assertEqual(self.transaction.status, 'cancelled')
+        self.assertFalse(Ticket.objects.exists())
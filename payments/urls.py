@@ -9,6 +9,7 @@ urlpatterns = [
     
     path('initiate-mpesa-payment/<int:pk>/', views.initiate_mpesa_payment, name='initiate_mpesa_payment'),
     path('mpesa-callback/', views.mpesa_callback, name='mpesa_callback'),
+    path('stripe/webhook/', views.stripe_webhook, name='stripe_webhook'),
     path('check-payment-status/<str:transaction_id>/', views.check_payment_status, name='check_payment_status'),
     path('ticket-confirmation/<str:transaction_id>/', views.ticket_confirmation, name='ticket_confirmation'),
 ]
\ No newline at end of file
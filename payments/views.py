@@ -1,17 +1,21 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
 from django.conf import settings
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 from django.urls import reverse
 from events.models import Event, TicketCategory, Ticket
 from .models import Transaction
 from events.forms import TicketPurchaseForm
-from .services import MpesaService
+from .services import MpesaService, StripeWebhookService
+from events.inventory import InventoryService, InsufficientTickets
+from events.waiting_room import waiting_room_gate
 import json
+import stripe
 
 
+@waiting_room_gate()
 def checkout(request, pk):
     event = get_object_or_404(Event, pk=pk)
     category_id = request.GET.get('category')
@@ -57,6 +61,7 @@ def checkout(request, pk):
 
 
 @require_POST
+@waiting_room_gate(api=True)
 def initiate_mpesa_payment(request, pk):
     """Initiate M-Pesa STK push payment"""
     try:
@@ -105,22 +110,41 @@ def initiate_mpesa_payment(request, pk):
         
         print(f"Callback URL: {callback_url}")
         
+        # Hold the tickets until the callback arrives or the hold expires
+        inventory = InventoryService()
+        try:
+            hold = inventory.place_hold(ticket_category, quantity)
+        except InsufficientTickets:
+            return JsonResponse({
+                'success': False,
+                'error': 'Not enough tickets available for the selected category.'
+            })
+        
         # Initialize M-Pesa service
         mpesa_service = MpesaService()
         
         # Initiate STK push
-        result = mpesa_service.initiate_stk_push(
-            phone=buyer_phone,
-            user=request.user if request.user.is_authenticated else None,
-            amount=total_amount,
-            event_id=event.id,
-            ticket_category_id=ticket_category.id,
-            buyer_name=buyer_name,
-            buyer_email=buyer_email,
-            buyer_phone=buyer_phone,
-            quantity=quantity,
-            callback_url=callback_url
-        )
+        try:
+            result = mpesa_service.initiate_stk_push(
+                phone=buyer_phone,
+                user=request.user if request.user.is_authenticated else None,
+                amount=total_amount,
+                event_id=event.id,
+                ticket_category_id=ticket_category.id,
+                buyer_name=buyer_name,
+                buyer_email=buyer_email,
+                buyer_phone=buyer_phone,
+                quantity=quantity,
+                callback_url=callback_url,
+                hold=hold,
+                per_attendee=bool(request.POST.get('per_attendee'))
+            )
+        except Exception:
+            inventory.release_hold(hold)
+            raise
+        
+        if not result['success']:
+            inventory.release_hold(hold)
         
         if result['success']:
             return JsonResponse({
@@ -166,6 +190,19 @@ def mpesa_callback(request):
         })
 
 
+@csrf_exempt
+@require_POST
+def stripe_webhook(request):
+    """Verify and record a Stripe webhook; the fulfillment worker fulfills it"""
+    try:
+        StripeWebhookService().record_event(request.body, request.META.get('HTTP_STRIPE_SIGNATURE', ''))
+    except (ValueError, stripe.error.SignatureVerificationError) as e:
+        print(f"Rejected Stripe webhook: {str(e)}")
+        return HttpResponse(status=400)
+
+    return HttpResponse(status=200)
+
+
 def check_payment_status(request, transaction_id):
     """Check payment status"""
     try: